@@ -4,17 +4,35 @@ ViDL – Téléchargeur YouTube / YouTube Downloader
 © 2025
 """
 
+import time
+STARTUP_T0 = time.perf_counter()
+# Objectif : fenêtre interactive en moins de 300 ms, même avec 10 000 entrées d'historique
+# (VIDL_STARTUP_TRACE=1 affiche la mesure à chaque lancement)
+STARTUP_TARGET_MS = 300
+
 import os
-import re
 import sys
+
+from vidl_core.instance import SingleInstance
+
+# Second lancement : les URL sont transmises à la fenêtre déjà ouverte et on
+# quitte, avant même de charger Tk et Pillow
+SINGLE_INSTANCE = None
+if __name__ == "__main__":
+    SINGLE_INSTANCE = SingleInstance()
+    if not SINGLE_INSTANCE.acquire():
+        if SINGLE_INSTANCE.forward(sys.argv[1:]):
+            sys.exit(0)
+        SINGLE_INSTANCE = None
+
 import shutil
 import subprocess
 import threading
+import concurrent.futures
 import platform
 import io
-import json
+import sqlite3
 import datetime
-import requests
 from PIL import Image, ImageTk, ImageDraw, ImageFont
 import tkinter as tk
 import tkinter.font as tkFont
@@ -23,36 +41,28 @@ import ttkbootstrap as ttk
 from ttkbootstrap.constants import *
 from tkinter import messagebox
 
-# ---------------------------------------------------------
-# Utility functions
-# ---------------------------------------------------------
-def sanitize_filename(filename):
-    """
-    Supprime les caractères interdits pour les noms de fichiers sur la plupart des OS.
-    """
-    return re.sub(r'[\\/*?:"<>|]', "", filename)
-
-def validate_url(url):
-    """
-    Vérifie que l'URL commence par http:// ou https://.
-    """
-    return url.startswith("http://") or url.startswith("https://")
-
-def format_duration(duration):
-    """
-    Convertit une durée (en secondes) en format mm:ss ou hh:mm:ss.
-    """
-    try:
-        duration = int(float(duration))
-    except Exception:
-        return str(duration)
-    hours = duration // 3600
-    minutes = (duration % 3600) // 60
-    seconds = duration % 60
-    if hours > 0:
-        return f"{hours:02d}:{minutes:02d}:{seconds:02d}"
-    else:
-        return f"{minutes:02d}:{seconds:02d}"
+from vidl_core import events, jobs
+from vidl_core.analysis import AnalysisCache, analyze, default_video_format_index, fetch_bytes, select_format_id
+from vidl_core.batch import ConversionQueue
+from vidl_core.chunked import ChunkedEncodeTask
+from vidl_core.conversion import (REENCODE_AUDIO_ARGS, REENCODE_VIDEO_ARGS, VIDEO_OUTPUT_FORMATS, FFmpegTask,
+                                  MultiOutputTask, TranscodePool, build_reencode_command, plan_reencode,
+                                  probe_media_file, unique_converted_path)
+from vidl_core.download import (DownloadTask, build_download_command, clip_bounds, clip_label, clip_length,
+                                required_space, unique_output_path, with_clip, with_continue)
+from vidl_core.formats import audio_extension, format_size, select_video_formats
+from vidl_core.history import HISTORY_PAGE_SIZE, HistorySearchIndex, HistoryStore
+from vidl_core.jobs import JobStore
+from vidl_core.library import MediaLibrary
+from vidl_core.posters import shared_poster_service
+from vidl_core.predict import shared_prediction_service
+from vidl_core.probe import probe_duration, shared_probe_service
+from vidl_core.tasks import conversion_task
+from vidl_core.urls import canonical_url, media_key, parse_media_url
+from vidl_core.utils import app_support_dir, format_bytes, format_duration, sanitize_filename, validate_url
+
+HISTORY_SEARCH_DEBOUNCE_MS = 200
+HISTORY_HYDRATE_CHUNK = 250
 
 # ---------------------------------------------------------
 # UI strings dictionary generator
@@ -79,7 +89,22 @@ def get_ui_strings(language):
             "no_format_found": "Aucun format exploitable trouvé.",
             "export_mp4": "Exporter en mp4",
             "export_mp3": "Exporter en mp3",
+            "export_audio": "Audio d'origine",
+            "export_audio_tooltip": "Piste audio native (m4a ou opus ; m4a avec les codecs H.264) copiée sans réencodage : instantané, sans perte.",
+            "transcoding": "Conversion MP3 en arrière-plan…",
+            "transcode_done": "MP3 prêt : {path}",
+            "transcode_failed": "Échec de la conversion MP3 : {path}",
             "source_format": "Format d'origine :",
+            "clip": "Extrait :",
+            "clip_tooltip": "Début et fin de l'extrait (ex. 1:30 et 2:00). Vides : vidéo entière. Seules les parties nécessaires sont téléchargées.",
+            "precise_cut": "Coupe précise",
+            "codecs": "Codecs :",
+            "codecs_all": "Tous (plus léger)",
+            "codecs_compat": "H.264 (compatible)",
+            "codecs_tooltip": "Tous : VP9/AV1 quand ils donnent la même qualité pour moins d'octets (remuxé en MP4). H.264 : lisible partout, QuickTime compris.",
+            "precise_cut_tooltip": "Coupe exactement aux temps indiqués (réencodage aux points de coupe, plus lent). Sinon la coupe se fait sur l'image clé la plus proche.",
+            "invalid_clip": "Extrait invalide : utilisez des temps comme 90, 1:30 ou 01:02:03, avec la fin après le début.",
+            "disk_full": "Espace disque insuffisant dans {dir} :\n{needed} nécessaires, {free} disponibles.",
             "choose_folder": "Choisir dossier…",
             "choose_folder_tooltip": "Sélectionnez le dossier de téléchargement",
             "open_folder_after_download": "Ouvrir le dossier à la fin",
@@ -89,12 +114,17 @@ def get_ui_strings(language):
             "cancel_tooltip": "Annuler le téléchargement",
             "reencode_mp4": "Re‑encoder MP4",
             "waiting": "En attente...",
+            "queued_urls": "{n} URL en attente",
+            "resume_title": "Téléchargements interrompus",
+            "resume_prompt": "{n} téléchargement(s) n'ont pas été terminés :\n{titles}\n\nReprendre là où ils se sont arrêtés ?",
             "download_in_progress": "Téléchargement en cours…",
             "download_stopped": "Le téléchargement a été arrêté.",
             "download_failed": "Échec du téléchargement.",
             "mp4_optimize": "Cliquez sur 'Re‑encoder MP4' pour optimiser l'import dans Final Cut Pro.",
             "download_complete": "Téléchargement terminé",
+            "already_downloaded": "Déjà téléchargé (bibliothèque) : {path}",
             "search": "Recherche :",
+            "search_tooltip": "Filtres : channel:nom format:mp3 after:2025-01-01 before:2025-12-31",
             "clear_history": "Effacer l'historique",
             "copy_url": "Copier l'URL",
             "delete": "Supprimer",
@@ -106,6 +136,7 @@ def get_ui_strings(language):
             "english": "Anglais",
             "french": "Français",
             "reencode_in_progress": "Ré‑encodage en cours",
+            "remux_in_progress": "Remux MP4 (sans réencodage)",
             "invalid_url": "URL invalide. Veuillez entrer une URL valide (commençant par http:// ou https://).",
             # Onglet Conversion
             "file_conversion": "Conversion de fichier",
@@ -117,6 +148,35 @@ def get_ui_strings(language):
             "conversion_failed": "La conversion a échoué",
             "estimated_size": "Taille estimée :",
             "advanced_settings": "Paramètres avancés",
+            "chunked_encode": "Encodage parallèle",
+            "chunked_encode_tooltip": "Découpe la vidéo aux images clés et encode les segments sur tous les cœurs, puis les recolle sans perte. Utile pour les préréglages lents et l'AV1.",
+            "target_size": "Taille cible (Mo) :",
+            "target_size_tooltip": "Encode en deux passes pour que le fichier tienne dans cette taille (le débit vidéo est calculé d'après la durée et le débit audio)",
+            "target_size_result": "Conversion terminée : {size} pour {target} visés ({error:+.1f} %)",
+            "estimate": "Estimer",
+            "estimate_tooltip": "Encode quelques secondes à plusieurs endroits du fichier avec les réglages choisis et en déduit la taille finale et la durée de conversion",
+            "estimating": "Estimation en cours…",
+            "estimate_result": "Prévision : ~{size}, ~{time} d'encodage ({speed:.1f}× le temps réel)",
+            "estimate_failed": "Estimation impossible pour ce fichier.",
+            "time_budget": "Budget de temps (min) :",
+            "time_budget_tooltip": "Avec l'encodeur « auto » : l'encodeur et le préréglage les plus efficaces qui finissent dans ce délai (vide : la durée de la vidéo). Les vitesses mesurées sont mémorisées pour cette machine.",
+            "encoder_tuning": "Choix de l'encodeur…",
+            "encoder_tuned": "Encodeur choisi : {encoder} / {preset} (~{time} d'encodage)",
+            "encoder_tuned_over": "Aucun encodeur ne tient dans le budget : {encoder} / {preset} (~{time} d'encodage)",
+            "add_output": "Ajouter cette sortie",
+            "add_output_tooltip": "Garde les options d'export courantes comme sortie supplémentaire : toutes les sorties sont produites en une passe, la source n'est décodée qu'une fois",
+            "clear_outputs": "Effacer les sorties",
+            "output_profiles": "Sorties : {profiles}",
+            "add_files": "Ajouter plusieurs fichiers…",
+            "add_files_tooltip": "Convertit plusieurs fichiers avec les options d'export courantes, plusieurs à la fois selon le nombre de cœurs",
+            "conversion_queue": "File de conversion",
+            "queue_file": "Fichier",
+            "queue_status": "État",
+            "queue_progress": "Progression",
+            "queue_cancel_selected": "Annuler la sélection",
+            "queue_states": {"queued": "En attente", "running": "En cours", "completed": "Terminé",
+                             "failed": "Échec", "cancelled": "Annulé"},
+            "queue_summary": "{completed} fichier(s) converti(s) en {elapsed} – {fpm:.1f} fichiers/min, {rtf:.1f}× le temps réel",
             # Nouveaux textes pour la miniature
             "download_thumbnail": "Télécharger l'image",
             "download_thumbnail_tooltip": "Télécharger la miniature en haute résolution",
@@ -144,7 +204,22 @@ def get_ui_strings(language):
             "no_format_found": "No usable formats found.",
             "export_mp4": "Export as MP4",
             "export_mp3": "Export as MP3",
+            "export_audio": "Original audio",
+            "export_audio_tooltip": "Native audio track (m4a or opus; m4a with H.264 codecs) copied without re-encoding: instant and lossless.",
+            "transcoding": "Converting to MP3 in the background…",
+            "transcode_done": "MP3 ready: {path}",
+            "transcode_failed": "MP3 conversion failed: {path}",
             "source_format": "Source format:",
+            "clip": "Clip:",
+            "clip_tooltip": "Clip start and end (e.g. 1:30 and 2:00). Empty: whole video. Only the needed parts are downloaded.",
+            "precise_cut": "Exact cut",
+            "codecs": "Codecs:",
+            "codecs_all": "All (smallest)",
+            "codecs_compat": "H.264 (compatible)",
+            "codecs_tooltip": "All: VP9/AV1 when they give the same quality in fewer bytes (remuxed to MP4). H.264: plays everywhere, QuickTime included.",
+            "precise_cut_tooltip": "Cuts exactly at the given times (re-encodes around the cuts, slower). Otherwise the cut snaps to the nearest keyframe.",
+            "invalid_clip": "Invalid clip: use times like 90, 1:30 or 01:02:03, with the end after the start.",
+            "disk_full": "Not enough disk space in {dir}:\n{needed} needed, {free} available.",
             "choose_folder": "Choose folder...",
             "choose_folder_tooltip": "Select the download folder",
             "open_folder_after_download": "Open folder after download",
@@ -154,12 +229,17 @@ def get_ui_strings(language):
             "cancel_tooltip": "Cancel the download",
             "reencode_mp4": "Re‑encode MP4",
             "waiting": "Waiting...",
+            "queued_urls": "{n} URL(s) queued",
+            "resume_title": "Interrupted downloads",
+            "resume_prompt": "{n} download(s) did not finish:\n{titles}\n\nResume where they stopped?",
             "download_in_progress": "Downloading…",
             "download_stopped": "Download has been stopped.",
             "download_failed": "Download failed.",
             "mp4_optimize": "Click 'Re‑encode MP4' to optimize for Final Cut Pro.",
             "download_complete": "Download complete",
+            "already_downloaded": "Already downloaded (library): {path}",
             "search": "Search:",
+            "search_tooltip": "Filters: channel:name format:mp3 after:2025-01-01 before:2025-12-31",
             "clear_history": "Clear History",
             "copy_url": "Copy URL",
             "delete": "Delete",
@@ -171,6 +251,7 @@ def get_ui_strings(language):
             "english": "English",
             "french": "French",
             "reencode_in_progress": "Re‑encoding",
+            "remux_in_progress": "Remuxing MP4 (no re‑encode)",
             "invalid_url": "Invalid URL. Please enter a valid URL (starting with http:// or https://).",
             # Conversion tab strings
             "file_conversion": "File Conversion",
@@ -182,6 +263,35 @@ def get_ui_strings(language):
             "conversion_failed": "Conversion failed",
             "estimated_size": "Estimated size:",
             "advanced_settings": "Advanced Settings",
+            "chunked_encode": "Parallel encoding",
+            "chunked_encode_tooltip": "Splits the video at keyframes, encodes the segments on all cores, then joins them losslessly. Useful for slow presets and AV1.",
+            "target_size": "Target size (MB):",
+            "target_size_tooltip": "Encodes in two passes so the file fits in this size (the video bitrate is computed from the duration and audio bitrate)",
+            "target_size_result": "Conversion complete: {size} for a {target} target ({error:+.1f}%)",
+            "estimate": "Estimate",
+            "estimate_tooltip": "Encodes a few seconds at several points of the file with the selected settings and extrapolates the final size and conversion time",
+            "estimating": "Estimating…",
+            "estimate_result": "Prediction: ~{size}, ~{time} to encode ({speed:.1f}× realtime)",
+            "estimate_failed": "Unable to estimate this file.",
+            "time_budget": "Time budget (min):",
+            "time_budget_tooltip": "With the \"auto\" encoder: the most efficient encoder and preset that finish within this time (empty: the video duration). Measured speeds are remembered for this machine.",
+            "encoder_tuning": "Choosing encoder…",
+            "encoder_tuned": "Encoder chosen: {encoder} / {preset} (~{time} to encode)",
+            "encoder_tuned_over": "No encoder fits the budget: {encoder} / {preset} (~{time} to encode)",
+            "add_output": "Add this output",
+            "add_output_tooltip": "Keeps the current export options as an extra output: all outputs are written in one pass, decoding the source only once",
+            "clear_outputs": "Clear outputs",
+            "output_profiles": "Outputs: {profiles}",
+            "add_files": "Add files…",
+            "add_files_tooltip": "Converts several files with the current export options, several at once depending on the number of cores",
+            "conversion_queue": "Conversion queue",
+            "queue_file": "File",
+            "queue_status": "Status",
+            "queue_progress": "Progress",
+            "queue_cancel_selected": "Cancel selected",
+            "queue_states": {"queued": "Queued", "running": "Running", "completed": "Done",
+                             "failed": "Failed", "cancelled": "Cancelled"},
+            "queue_summary": "{completed} file(s) converted in {elapsed} – {fpm:.1f} files/min, {rtf:.1f}× realtime",
             # Nouveaux textes pour la miniature
             "download_thumbnail": "Download Thumbnail",
             "download_thumbnail_tooltip": "Download the thumbnail in high resolution",
@@ -240,271 +350,11 @@ class CreateToolTip(object):
         if tw:
             tw.destroy()
 
-# ---------------------------------------------------------
-# Functions for video analysis and information retrieval
-# ---------------------------------------------------------
-def parse_available_formats(video_url):
-    try:
-        cmd = ["yt-dlp", "-F", video_url]
-        output = run_info_command_with_age_retry(cmd, video_url)
-        if output is None:
-            return [], []
-    except subprocess.CalledProcessError:
-        return [], []
-
-    lines = output.splitlines()
-    resolution_regex = re.compile(r"(\d+)x(\d+)")
-    tbr_regex = re.compile(r"(\d+)k")
-    fps_regex = re.compile(r"(\d+)x(\d+)\s+(\d+)\s")
-
-    best_audio_any = (None, None, -1)
-    best_audio_mp4 = (None, None, -1)
-    mux_dict = {}
-    video_only_dict = {}
-    audio_only_list = []
-    skip_keywords = ["storyboard", "mhtml"]
-
-    for line in lines:
-        match = re.match(r"^(\S+)\s+(.*)$", line)
-        if not match:
-            continue
-        fmt_id = match.group(1).strip()
-        rest   = match.group(2).strip()
-
-        if fmt_id.lower() in ["id", "format"]:
-            continue
-
-        lower_rest = rest.lower()
-        if any(sk in lower_rest for sk in skip_keywords):
-            continue
-
-        tokens = rest.split()
-        if len(tokens) < 2:
-            continue
-        ext = tokens[0]
-        tbr_matches = tbr_regex.findall(rest)
-        tbr_kbps = max(int(x) for x in tbr_matches) if tbr_matches else 0
-
-        if "audio only" in lower_rest:
-            audio_only_list.append((fmt_id, f"{fmt_id} | {rest}"))
-            if ext in ["mp4", "m4a"] and tbr_kbps > best_audio_mp4[2]:
-                best_audio_mp4 = (fmt_id, rest, tbr_kbps)
-            if tbr_kbps > best_audio_any[2]:
-                best_audio_any = (fmt_id, rest, tbr_kbps)
-        else:
-            mres = resolution_regex.search(rest)
-            if not mres:
-                continue
-            w, h = map(int, mres.groups())
-            fps_match = fps_regex.search(line)
-            if fps_match:
-                try:
-                    fps_val = int(fps_match.group(3))
-                except:
-                    fps_val = 0
-            else:
-                if " 60 " in rest or "60fps" in lower_rest:
-                    fps_val = 60
-                else:
-                    fps_val = 30
-            if ext != "mp4":
-                continue
-            if "video only" in lower_rest:
-                current = video_only_dict.get((w, h, fps_val), (None, None, -1))
-                if tbr_kbps > current[2]:
-                    video_only_dict[(w, h, fps_val)] = (fmt_id, rest, tbr_kbps)
-            else:
-                current = mux_dict.get((w, h, fps_val), (None, None, -1))
-                if tbr_kbps > current[2]:
-                    mux_dict[(w, h, fps_val)] = (fmt_id, rest, tbr_kbps)
-
-    if best_audio_mp4[0]:
-        best_audio = best_audio_mp4
-    else:
-        best_audio = best_audio_any
-    best_audio_id, best_audio_desc, best_audio_abr = best_audio
-
-    video_format_list = []
-    def sort_key(k):
-        w, h, f = k
-        return (min(w, h), f)
-    all_keys = set(video_only_dict.keys()) | set(mux_dict.keys())
-    for whf in sorted(all_keys, key=sort_key):
-        w, h, fps_val = whf
-        mux_fid, mux_desc, mux_tbr = mux_dict.get(whf, (None, None, 0))
-        vid_fid, vid_desc, vid_tbr = video_only_dict.get(whf, (None, None, 0))
-        combo_tbr = 0
-        combo_id = None
-        if vid_fid and best_audio_id:
-            combo_tbr = vid_tbr + best_audio_abr
-            combo_id = f"{vid_fid}+{best_audio_id}"
-        if combo_tbr > mux_tbr:
-            chosen_id = combo_id
-            chosen_tbr = combo_tbr
-        else:
-            chosen_id = mux_fid
-            chosen_tbr = mux_tbr
-        if chosen_id:
-            video_format_list.append({
-                "id": chosen_id,
-                "width": w,
-                "height": h,
-                "fps": fps_val,
-                "tbr": chosen_tbr
-            })
-    return video_format_list, audio_only_list
-
-def get_thumbnail_url(video_url):
-    try:
-        cmd = ["yt-dlp", "--get-thumbnail", video_url]
-        stdout = run_info_command_with_age_retry(cmd, video_url)
-        if not stdout:
-            return None
-        thumb_url = stdout.strip()
-        return thumb_url if thumb_url else None
-    except subprocess.CalledProcessError:
-        return None
-
-def get_video_info(video_url):
-    try:
-        cmd = ["yt-dlp", "-j", video_url]
-        stdout = run_info_command_with_age_retry(cmd, video_url)
-        if stdout is None:
-            return None, None, None, None, None, None, None
-        data = json.loads(stdout)
-        title = data.get("title")
-        uploader = data.get("uploader")
-        upload_date = data.get("upload_date")
-        if upload_date and len(upload_date) == 8:
-            upload_date = f"{upload_date[:4]}-{upload_date[4:6]}-{upload_date[6:]}"
-        view_count = data.get("view_count")
-        like_count = data.get("like_count")
-        comment_count = data.get("comment_count")
-        duration = data.get("duration")
-        return title, uploader, upload_date, view_count, like_count, comment_count, duration
-    except Exception as e:
-        print("Error retrieving video info:", e)
-        return None, None, None, None, None, None, None
-
-# ---------------------------------------------------------
-# Shared helper to retry yt-dlp info commands with cookies
-# ---------------------------------------------------------
-def run_info_command_with_age_retry(cmd, url):
-    """
-    Runs a lightweight yt-dlp info command and retries with Firefox cookies
-    if age restriction is detected.
-    """
-    def needs_age_retry(output_text):
-        if not output_text:
-            return False
-        lower = output_text.lower()
-        return "sign in to confirm your age" in lower or "age-restricted" in lower
-
-    try:
-        result = subprocess.run(cmd, capture_output=True, text=True)
-        if result.returncode == 0:
-            return result.stdout
-        combined = f"{result.stdout}\n{result.stderr}"
-        if needs_age_retry(combined):
-            cmd_with_cookies = cmd.copy()
-            if "--cookies-from-browser" not in cmd_with_cookies:
-                cmd_with_cookies.insert(1, "--cookies-from-browser")
-                cmd_with_cookies.insert(2, "firefox")
-            retry = subprocess.run(cmd_with_cookies, capture_output=True, text=True)
-            if retry.returncode == 0:
-                return retry.stdout
-        return None
-    except Exception as e:
-        print("Error running info command:", e)
-        return None
-
-# =========================================================
-# Intelligent yt-dlp execution with age restriction support
-# =========================================================
-def run_yt_dlp_command(app, cmd, url):
-    """
-    Run yt-dlp once, detect age-restriction errors, then retry automatically
-    with Firefox cookies if needed.
-    """
-    download_regex = re.compile(r'^\[download\].*?([\d\.]+)%')
-    destination_regex = re.compile(r'^\[download\]\s+Destination:\s+(.+)$')
-    merger_regex = re.compile(r'^\[Merger\]\s+Merging formats into\s+"(.+)"$')
-    age_restricted = False
-
-    def stream_process(process):
-        nonlocal age_restricted
-        for line in process.stdout:
-            line = line.strip()
-            print(line)
-            if "Sign in to confirm your age" in line or "age-restricted" in line.lower():
-                age_restricted = True
-            match = download_regex.search(line)
-            if match:
-                try:
-                    val_float = float(match.group(1))
-                except ValueError:
-                    val_float = 0.0
-                if app.skip_first_progress_value:
-                    app.skip_first_progress_value = False
-                    continue
-                app.after(0, app.set_smooth_target, val_float)
-            dest_match = destination_regex.match(line)
-            if dest_match:
-                app.downloaded_file_path = dest_match.group(1).strip()
-            merger_match = merger_regex.match(line)
-            if merger_match:
-                app.downloaded_file_path = merger_match.group(1).strip()
-        process.wait()
-        return process.returncode
-
-    process = subprocess.Popen(
-        cmd,
-        stdout=subprocess.PIPE,
-        stderr=subprocess.STDOUT,
-        text=True,
-        universal_newlines=True
-    )
-    app.download_process = process
-    retcode = stream_process(process)
-
-    if app.cancelled:
-        return retcode
-
-    if retcode != 0 and age_restricted:
-        def show_age_notice():
-            app.status_var.set("Vidéo restreinte par âge → utilisation des cookies Firefox…")
-            if not getattr(app, "age_restriction_notice_shown", False):
-                app.age_restriction_notice_shown = True
-                messagebox.showinfo(
-                    "Vidéo restreinte",
-                    "Cette vidéo nécessite une connexion pour confirmer l'âge.\n"
-                    "Vos cookies Firefox seront utilisés. Assurez-vous d'être connecté à YouTube dans Firefox.",
-                    parent=app
-                )
-
-        app.after(0, show_age_notice)
-        app.skip_first_progress_value = True
-        cmd_with_cookies = cmd.copy()
-        if "--cookies-from-browser" not in cmd_with_cookies:
-            cmd_with_cookies.insert(1, "--cookies-from-browser")
-            cmd_with_cookies.insert(2, "firefox")
-        process2 = subprocess.Popen(
-            cmd_with_cookies,
-            stdout=subprocess.PIPE,
-            stderr=subprocess.STDOUT,
-            text=True,
-            universal_newlines=True
-        )
-        app.download_process = process2
-        retcode = stream_process(process2)
-
-    return retcode
-
 # ---------------------------------------------------------
 # Main application class for ViDL
 # ---------------------------------------------------------
 class YoutubeDownloaderApp(ttk.Window):
-    def __init__(self, *args, **kwargs):
+    def __init__(self, *args, initial_urls=None, **kwargs):
         kwargs["themename"] = kwargs.get("themename", "darkly")
         super().__init__(*args, **kwargs)
         self.language = "fr"
@@ -543,6 +393,8 @@ class YoutubeDownloaderApp(ttk.Window):
         self.video_format_list = []
         self.audio_format_list = []
         self.video_format_options = []
+        self.analysis_formats = []
+        self.codec_preference = "all"
 
         self.url_var = ttk.StringVar()
         self.export_type_var = ttk.StringVar(value="mp4")
@@ -552,17 +404,18 @@ class YoutubeDownloaderApp(ttk.Window):
         self.progress_val = ttk.DoubleVar(value=0.0)
         self.download_target = 0.0
         self.animation_in_progress = False
-        self.skip_first_progress_value = True
         self.cancelled = False
         self.age_restriction_notice_shown = False
         self.open_folder_var = ttk.BooleanVar(value=True)
+        self.clip_start_var = ttk.StringVar()
+        self.clip_end_var = ttk.StringVar()
+        self.precise_cut_var = ttk.BooleanVar(value=False)
         self.output_dir = os.path.join(os.path.expanduser("~"), "Downloads")
         self.downloaded_file_path = None
-        self.download_process = None
+        self.download_task = None
 
         self.encoding = False
-        self.reencode_process = None
-        self.cancel_reencode = False
+        self.reencode_task = None
 
         self.placeholder_tk = self.create_placeholder_image()
         self.placeholder_history_tk = self.create_placeholder_image(60, 34)
@@ -572,22 +425,56 @@ class YoutubeDownloaderApp(ttk.Window):
 
         self.current_video_info = {}
         self.video_duration = None
-
-        self.history = []
+        self.analysis_cache = AnalysisCache()
+        self.analysis_running = False
+        self.current_video_done = True
+
+        # URL reçues en argument ou d'un second lancement, analysées une à une
+        self.url_queue = []
+        self.url_queue_keys = set()
+
+        self.history_index = HistorySearchIndex()
+        self.history_search_job = None
+        self.history_last_query = None
+        self.history_results = None
+        self.history_rendered = 0
+        self.history_exhausted = False
+        self.history_load_pending = False
         self.history_images = {}
-        app_support_dir = os.path.join(os.path.expanduser("~"), "Library", "Application Support", "ViDL")
-        os.makedirs(app_support_dir, exist_ok=True)
-        self.history_file = os.path.join(app_support_dir, "history.json")
+        self.thumbnail_pool = concurrent.futures.ThreadPoolExecutor(max_workers=4)
+        support_dir = app_support_dir()
+        self.history_file = os.path.join(support_dir, "history.json")
         # Migration : déplace l'ancien historique stocké dans le dossier du projet
         legacy_history = os.path.join(os.path.dirname(os.path.abspath(__file__)), "history.json")
         if not os.path.exists(self.history_file) and os.path.exists(legacy_history):
             shutil.move(legacy_history, self.history_file)
+        self.history_db = os.path.join(support_dir, "history.db")
         self.load_history()
+        # Journal des téléchargements : un téléchargement interrompu (crash,
+        # fermeture) est proposé à la reprise au lancement suivant
+        try:
+            self.job_journal = JobStore(os.path.join(support_dir, "downloads.db"))
+        except sqlite3.Error as e:
+            print("Error opening download journal:", e)
+            self.job_journal = None
+        self.current_job_id = None
+        self.current_download = None
+        self.resume_queue = []
+        # Bibliothèque : fichiers déjà téléchargés (même vidéo, même format)
+        try:
+            self.media_library = MediaLibrary(os.path.join(support_dir, "library.db"))
+        except sqlite3.Error as e:
+            print("Error opening media library:", e)
+            self.media_library = None
+        # MP3 : la piste native est téléchargée puis transcodée en arrière-plan,
+        # sans bloquer le téléchargement suivant
+        self.transcoder = TranscodePool()
+        self.transcode_paths = set()
 
         # Variables pour les options d'export et avancées
         self.video_encoder_var = ttk.StringVar(value="libx264")
         self.video_resolution_var = ttk.StringVar(value="Original")
-        self.video_bitrate_var = ttk.StringVar(value="1000k")
+        self.video_bitrate_var = ttk.StringVar(value="Auto")
         self.video_framerate_var = ttk.StringVar(value="Original")
         # Nouvelle variable pour le préréglage vidéo
         self.video_preset_var = ttk.StringVar(value="medium")
@@ -596,17 +483,36 @@ class YoutubeDownloaderApp(ttk.Window):
         self.audio_channels_var = ttk.StringVar(value="Stereo")
         self.audio_bitrate_var = ttk.StringVar(value="128k")
         self.optimize_var = tk.BooleanVar(value=False)
+        self.chunked_var = tk.BooleanVar(value=False)
+        self.target_size_enabled_var = tk.BooleanVar(value=False)
+        self.target_size_var = ttk.StringVar(value="25")
+        self.time_budget_var = ttk.StringVar(value="")
 
         self.conversion_file_path = None
         self.conversion_duration = None
-        self.conversion_process = None
-        self.conversion_cancelled = False
+        self.conversion_task = None
         self.conversion_progress_val = tk.DoubleVar(value=0.0)
         self.conversion_output_file = None
-        self.conversion_cmd = None
+        self.conversion_queue = None
+        self.probes = shared_probe_service()
+        self.posters = shared_poster_service()
+        self.predictions = shared_prediction_service()
+        self.conversion_profiles = []
 
         self.build_menu()
         self.build_ui()
+        self.after_idle(self.on_first_idle)
+        if initial_urls:
+            self.after_idle(self.enqueue_urls, initial_urls)
+
+    def on_first_idle(self):
+        """Fenêtre affichée et interactive : mesure du démarrage puis tâches différées."""
+        startup_ms = (time.perf_counter() - STARTUP_T0) * 1000
+        if os.environ.get("VIDL_STARTUP_TRACE") or startup_ms > STARTUP_TARGET_MS:
+            print(f"Startup: {startup_ms:.0f} ms (target {STARTUP_TARGET_MS} ms, "
+                  f"{self.history_store.count()} history entries)")
+        self.after(1, self.hydrate_history_index)
+        self.after(1, self.offer_resume)
 
     def create_placeholder_image(self, width=240, height=135):
         placeholder_img = Image.new("RGB", (width, height), (50, 50, 50))
@@ -682,6 +588,7 @@ class YoutubeDownloaderApp(ttk.Window):
         self.btn_analyze.config(text=self.ui_strings["analyze"])
         self.radio_mp4.config(text=self.ui_strings["export_mp4"])
         self.radio_mp3.config(text=self.ui_strings["export_mp3"])
+        self.radio_audio.config(text=self.ui_strings["export_audio"])
         self.lbl_format.config(text=self.ui_strings["source_format"])
         self.btn_choose_folder.config(text=self.ui_strings["choose_folder"])
         self.chk_open_folder.config(text=self.ui_strings["open_folder_after_download"])
@@ -689,12 +596,20 @@ class YoutubeDownloaderApp(ttk.Window):
         self.btn_download.config(text=self.ui_strings["download_button"])
         self.btn_reencode.config(text=self.ui_strings["reencode_mp4"])
         self.lbl_audio_lang.config(text=self.ui_strings["audio_language"])
+        self.lbl_clip.config(text=self.ui_strings["clip"])
+        self.chk_precise_cut.config(text=self.ui_strings["precise_cut"])
+        self.lbl_codecs.config(text=self.ui_strings["codecs"])
+        self.combo_codecs.config(values=[self.ui_strings["codecs_all"], self.ui_strings["codecs_compat"]])
+        self.combo_codecs.current(["all", "compat"].index(self.codec_preference))
         # Remet "Auto" localisé si nécessaire
         if self.audio_language_var.get().lower() in ["auto", self.ui_strings.get("auto", "Auto").lower()]:
             self.audio_language_var.set(self.ui_strings.get("auto", "Auto"))
-        self.lbl_search.config(text=self.ui_strings["search"])
-        self.btn_clear_history.config(text=self.ui_strings["clear_history"])
+        if self.is_tab_built(self.tab_history):
+            self.lbl_search.config(text=self.ui_strings["search"])
+            self.btn_clear_history.config(text=self.ui_strings["clear_history"])
 
+        if not self.is_tab_built(self.tab_convert):
+            return
         self.lbl_conversion_title.config(text=self.ui_strings["file_conversion"])
         self.btn_choose_file.config(text=self.ui_strings["choose_file"])
         self.lbl_select_format.config(text=self.ui_strings["select_format"])
@@ -703,6 +618,21 @@ class YoutubeDownloaderApp(ttk.Window):
         self.lbl_conversion_status.config(text="")
         self.lbl_estimated_size.config(text=self.ui_strings["estimated_size"] + " N/A")
         self.btn_advanced.config(text=self.ui_strings.get("advanced_settings", "Advanced Settings"))
+        self.chk_chunked.config(text=self.ui_strings["chunked_encode"])
+        self.btn_add_files.config(text=self.ui_strings["add_files"])
+        self.btn_add_output.config(text=self.ui_strings["add_output"])
+        self.btn_estimate.config(text=self.ui_strings["estimate"])
+        self.chk_target_size.config(text=self.ui_strings["target_size"])
+        self.lbl_prediction.config(text="")
+        self.btn_clear_outputs.config(text=self.ui_strings["clear_outputs"])
+        self.refresh_output_profiles()
+        self.queue_frame.config(text=self.ui_strings["conversion_queue"])
+        for column in ("file", "status", "progress"):
+            self.queue_tree.heading(column, text=self.ui_strings["queue_" + column])
+        self.btn_queue_cancel.config(text=self.ui_strings["queue_cancel_selected"])
+        if self.conversion_queue is not None:
+            for item_id, item in list(self.conversion_queue.items.items()):
+                self.queue_tree.set(str(item_id), "status", self.ui_strings["queue_states"][item["state"]])
 
     def build_ui(self):
         container = ttk.Frame(self, padding=15)
@@ -715,9 +645,28 @@ class YoutubeDownloaderApp(ttk.Window):
         self.notebook.add(self.tab_download, text=self.ui_strings["download_tab"])
         self.notebook.add(self.tab_history, text=self.ui_strings["history_tab"])
         self.notebook.add(self.tab_convert, text=self.ui_strings["conversion_tab"])
-        self.build_download_tab()
-        self.build_history_tab()
-        self.build_conversion_tab()
+        # Seul l'onglet Téléchargement est construit au démarrage, les autres à la première sélection
+        self.built_tabs = set()
+        self.ensure_tab_built(self.tab_download)
+        self.notebook.bind("<<NotebookTabChanged>>", self.on_tab_changed)
+
+    def ensure_tab_built(self, tab):
+        name = str(tab)
+        if name in self.built_tabs:
+            return
+        self.built_tabs.add(name)
+        if tab is self.tab_download:
+            self.build_download_tab()
+        elif tab is self.tab_history:
+            self.build_history_tab()
+        elif tab is self.tab_convert:
+            self.build_conversion_tab()
+
+    def is_tab_built(self, tab):
+        return str(tab) in self.built_tabs
+
+    def on_tab_changed(self, event=None):
+        self.ensure_tab_built(self.notebook.nametowidget(self.notebook.select()))
 
     def build_download_tab(self):
         # (Code inchangé pour l'onglet Téléchargement)
@@ -783,22 +732,33 @@ class YoutubeDownloaderApp(ttk.Window):
         self.frm_download.grid(row=2, column=0, padx=10, pady=10, sticky="ew")
         for col_index in range(4):
             self.frm_download.columnconfigure(col_index, weight=1)
+        export_frame = ttk.Frame(self.frm_download)
+        export_frame.grid(row=0, column=0, columnspan=2, sticky=tk.W)
         self.radio_mp4 = ttk.Radiobutton(
-            self.frm_download,
+            export_frame,
             text=self.ui_strings["export_mp4"],
             variable=self.export_type_var,
             value="mp4",
             command=self.update_format_list
         )
-        self.radio_mp4.grid(row=0, column=0, padx=5, pady=5, sticky=tk.W)
+        self.radio_mp4.pack(side=tk.LEFT, padx=5, pady=5)
         self.radio_mp3 = ttk.Radiobutton(
-            self.frm_download,
+            export_frame,
             text=self.ui_strings["export_mp3"],
             variable=self.export_type_var,
             value="mp3",
             command=self.update_format_list
         )
-        self.radio_mp3.grid(row=0, column=1, padx=5, pady=5, sticky=tk.W)
+        self.radio_mp3.pack(side=tk.LEFT, padx=5, pady=5)
+        self.radio_audio = ttk.Radiobutton(
+            export_frame,
+            text=self.ui_strings["export_audio"],
+            variable=self.export_type_var,
+            value="audio",
+            command=self.update_format_list
+        )
+        self.radio_audio.pack(side=tk.LEFT, padx=5, pady=5)
+        CreateToolTip(self.radio_audio, self.ui_strings["export_audio_tooltip"])
         self.lbl_format = ttk.Label(self.frm_download, text=self.ui_strings["source_format"])
         self.lbl_format.grid(row=0, column=2, sticky=tk.E, padx=5, pady=5)
         self.combo_format = ttk.Combobox(self.frm_download, textvariable=self.selected_format, width=40, state="readonly")
@@ -844,13 +804,47 @@ class YoutubeDownloaderApp(ttk.Window):
         )
         self.btn_download.pack(side=tk.LEFT)
         CreateToolTip(self.btn_download, self.ui_strings["download_button_tooltip"])
+
+        # --- Extrait (début / fin) ---
+        clip_frame = ttk.Frame(self.frm_download)
+        clip_frame.grid(row=2, column=0, columnspan=4, sticky=tk.W, padx=5, pady=5)
+        self.lbl_clip = ttk.Label(clip_frame, text=self.ui_strings["clip"])
+        self.lbl_clip.pack(side=tk.LEFT, padx=(0,5))
+        CreateToolTip(self.lbl_clip, self.ui_strings["clip_tooltip"])
+        ent_clip_start = ttk.Entry(clip_frame, textvariable=self.clip_start_var, width=10)
+        ent_clip_start.pack(side=tk.LEFT)
+        ttk.Label(clip_frame, text="→").pack(side=tk.LEFT, padx=5)
+        ent_clip_end = ttk.Entry(clip_frame, textvariable=self.clip_end_var, width=10)
+        ent_clip_end.pack(side=tk.LEFT)
+        for ent in (ent_clip_start, ent_clip_end):
+            CreateToolTip(ent, self.ui_strings["clip_tooltip"])
+            ent.bind("<FocusOut>", lambda e: self.update_format_list(keep_selection=True))
+            ent.bind("<Return>", lambda e: self.update_format_list(keep_selection=True))
+        self.chk_precise_cut = ttk.Checkbutton(
+            clip_frame,
+            text=self.ui_strings["precise_cut"],
+            variable=self.precise_cut_var,
+            bootstyle="round-toggle"
+        )
+        self.chk_precise_cut.pack(side=tk.LEFT, padx=(15,0))
+        CreateToolTip(self.chk_precise_cut, self.ui_strings["precise_cut_tooltip"])
+        self.lbl_codecs = ttk.Label(clip_frame, text=self.ui_strings["codecs"])
+        self.lbl_codecs.pack(side=tk.LEFT, padx=(25,5))
+        self.combo_codecs = ttk.Combobox(
+            clip_frame, state="readonly", width=18,
+            values=[self.ui_strings["codecs_all"], self.ui_strings["codecs_compat"]]
+        )
+        self.combo_codecs.current(0)
+        self.combo_codecs.pack(side=tk.LEFT)
+        self.combo_codecs.bind("<<ComboboxSelected>>", self.on_codec_preference_changed)
+        CreateToolTip(self.combo_codecs, self.ui_strings["codecs_tooltip"])
         self.chk_open_folder = ttk.Checkbutton(
             self.frm_download,
             text=self.ui_strings["open_folder_after_download"],
             variable=self.open_folder_var,
             bootstyle="round-toggle"
         )
-        self.chk_open_folder.grid(row=2, column=0, columnspan=4, sticky=tk.W, padx=5, pady=5)
+        self.chk_open_folder.grid(row=3, column=0, columnspan=4, sticky=tk.W, padx=5, pady=5)
         self.progress_bar = ttk.Progressbar(
             self.frm_download,
             style=self.progress_style_name,
@@ -858,9 +852,9 @@ class YoutubeDownloaderApp(ttk.Window):
             mode='determinate',
             variable=self.progress_val
         )
-        self.progress_bar.grid(row=3, column=0, columnspan=4, pady=10, sticky="we")
+        self.progress_bar.grid(row=4, column=0, columnspan=4, pady=10, sticky="we")
         status_frame = ttk.Frame(self.frm_download)
-        status_frame.grid(row=4, column=0, columnspan=4, sticky="we", pady=5)
+        status_frame.grid(row=5, column=0, columnspan=4, sticky="we", pady=5)
         self.lbl_status = ttk.Label(status_frame, textvariable=self.status_var, foreground="#aaa")
         self.lbl_status.pack(side=tk.LEFT, fill=tk.X, expand=True)
         self.btn_reencode = ttk.Button(
@@ -880,14 +874,17 @@ class YoutubeDownloaderApp(ttk.Window):
         self.search_var = ttk.StringVar()
         self.ent_search = ttk.Entry(search_frame, textvariable=self.search_var)
         self.ent_search.pack(side=tk.LEFT, fill=tk.X, expand=True, padx=5)
-        self.ent_search.bind("<KeyRelease>", self.update_history_view)
+        self.ent_search.bind("<KeyRelease>", self.on_history_search_key)
+        CreateToolTip(self.ent_search, self.ui_strings["search_tooltip"])
         self.lbl_copy_feedback = ttk.Label(search_frame, text="", foreground="#28a745")
         self.lbl_copy_feedback.pack(side=tk.RIGHT, padx=5)
         container_frame = ttk.Frame(self.tab_history)
         container_frame.pack(fill=tk.BOTH, expand=True, padx=5, pady=5)
         canvas = tk.Canvas(container_frame)
         scrollbar = ttk.Scrollbar(container_frame, orient="vertical", command=canvas.yview)
-        canvas.configure(yscrollcommand=scrollbar.set)
+        canvas.configure(yscrollcommand=self._on_history_scroll)
+        self.history_canvas = canvas
+        self.history_scrollbar = scrollbar
         canvas.pack(side="left", fill="both", expand=True)
         scrollbar.pack(side="right", fill="y")
         self.history_frame = ttk.Frame(canvas)
@@ -896,6 +893,8 @@ class YoutubeDownloaderApp(ttk.Window):
             canvas.configure(scrollregion=canvas.bbox("all"))
             canvas.itemconfig(self.history_window, width=canvas.winfo_width())
         canvas.bind("<Configure>", on_configure)
+        # Les pages ajoutées par load_more_history agrandissent le cadre : zone de défilement à recalculer
+        self.history_frame.bind("<Configure>", lambda e: canvas.configure(scrollregion=canvas.bbox("all")))
         def _on_mousewheel(event):
             if sys.platform == 'darwin':
                 canvas.yview_scroll(-1 * event.delta, "units")
@@ -948,6 +947,14 @@ class YoutubeDownloaderApp(ttk.Window):
             foreground=self.style.colors.get("secondary")
         )
         self.lbl_selected_file.grid(row=0, column=1, sticky="w", pady=5)
+        self.btn_add_files = ttk.Button(
+            file_import_frame,
+            text=self.ui_strings["add_files"],
+            bootstyle="secondary-outline",
+            command=self.add_conversion_files
+        )
+        self.btn_add_files.grid(row=0, column=2, sticky="e", padx=(10,0), pady=5)
+        CreateToolTip(self.btn_add_files, self.ui_strings["add_files_tooltip"])
         info_frame = ttk.Frame(file_import_frame)
         info_frame.grid(row=1, column=0, columnspan=2, sticky="ew", pady=5)
         # Affichage de la miniature avec lecture (modification : on utilise un simple clic)
@@ -1000,6 +1007,13 @@ class YoutubeDownloaderApp(ttk.Window):
         self.combo_quality = ttk.Combobox(left_frame, textvariable=self.quality_var, state="readonly",
                                           values=["Low", "Standard", "High", "Very High"])
         self.combo_quality.grid(row=1, column=1, sticky="w", pady=5)
+        # Taille visée : encodage en deux passes
+        self.chk_target_size = ttk.Checkbutton(left_frame, text=self.ui_strings["target_size"],
+                                               variable=self.target_size_enabled_var)
+        self.chk_target_size.grid(row=2, column=0, sticky="w", padx=(0,10), pady=5)
+        CreateToolTip(self.chk_target_size, self.ui_strings["target_size_tooltip"])
+        self.entry_target_size = ttk.Entry(left_frame, textvariable=self.target_size_var, width=8)
+        self.entry_target_size.grid(row=2, column=1, sticky="w", pady=5)
 
         # Droite : Résolution et Échantillonnage
         lbl_resolution = ttk.Label(right_frame, text="Résolution:" if self.language=="fr" else "Resolution:")
@@ -1025,6 +1039,22 @@ class YoutubeDownloaderApp(ttk.Window):
                                             text="Optimiser pour le streaming" if self.language=="fr" else "Optimize for streaming",
                                             variable=self.optimize_var)
         self.chk_optimize.grid(row=0, column=1, sticky="e", padx=5, pady=5)
+        self.chk_chunked = ttk.Checkbutton(bottom_frame, text=self.ui_strings["chunked_encode"],
+                                           variable=self.chunked_var)
+        self.chk_chunked.grid(row=1, column=1, sticky="e", padx=5, pady=5)
+        CreateToolTip(self.chk_chunked, self.ui_strings["chunked_encode_tooltip"])
+        # Plusieurs sorties pour un même fichier (un seul décodage)
+        outputs_frame = ttk.Frame(bottom_frame)
+        outputs_frame.grid(row=1, column=0, sticky="w", padx=5, pady=5)
+        self.btn_add_output = ttk.Button(outputs_frame, text=self.ui_strings["add_output"],
+                                         bootstyle="secondary-outline", command=self.add_output_profile)
+        self.btn_add_output.pack(side=tk.LEFT)
+        CreateToolTip(self.btn_add_output, self.ui_strings["add_output_tooltip"])
+        self.btn_clear_outputs = ttk.Button(outputs_frame, text=self.ui_strings["clear_outputs"],
+                                            bootstyle="link", command=self.clear_output_profiles)
+        self.btn_clear_outputs.pack(side=tk.LEFT, padx=(5,0))
+        self.lbl_output_profiles = ttk.Label(bottom_frame, text="", foreground=self.style.colors.get("secondary"))
+        self.lbl_output_profiles.grid(row=2, column=0, columnspan=2, sticky="w", padx=5)
 
         # Progression de la conversion
         progress_frame = ttk.Frame(export_frame)
@@ -1040,6 +1070,8 @@ class YoutubeDownloaderApp(ttk.Window):
         self.lbl_conversion_status.grid(row=1, column=0, sticky="w", padx=5)
         self.lbl_estimated_size = ttk.Label(progress_frame, text=self.ui_strings["estimated_size"] + " N/A", foreground=self.style.colors.get("info"))
         self.lbl_estimated_size.grid(row=2, column=0, sticky="w", padx=5)
+        self.lbl_prediction = ttk.Label(progress_frame, text="", foreground=self.style.colors.get("secondary"))
+        self.lbl_prediction.grid(row=3, column=0, sticky="w", padx=5)
         # Boutons de contrôle de conversion (inversion de l'ordre)
         control_frame = ttk.Frame(export_frame)
         control_frame.grid(row=3, column=0, columnspan=2, sticky="e", pady=5)
@@ -1056,6 +1088,31 @@ class YoutubeDownloaderApp(ttk.Window):
                                                   command=self.cancel_conversion,
                                                   state="disabled")
         self.btn_cancel_conversion.pack(side=tk.RIGHT, padx=5, pady=5)
+        # Prévision taille / durée à partir d'extraits encodés
+        self.btn_estimate = ttk.Button(control_frame,
+                                       text=self.ui_strings["estimate"],
+                                       bootstyle="info-outline",
+                                       command=self.estimate_conversion)
+        self.btn_estimate.pack(side=tk.RIGHT, padx=5, pady=5)
+        CreateToolTip(self.btn_estimate, self.ui_strings["estimate_tooltip"])
+
+        # --- Section 3 : File de conversion (plusieurs fichiers) ---
+        self.queue_frame = ttk.Labelframe(conversion_frame, text=self.ui_strings["conversion_queue"], padding=10)
+        self.queue_frame.grid(row=2, column=0, sticky="nsew", padx=5, pady=5)
+        self.queue_frame.columnconfigure(0, weight=1)
+        self.queue_tree = ttk.Treeview(self.queue_frame, columns=("file", "status", "progress"), show="headings",
+                                       height=4)
+        for column, width in (("file", 320), ("status", 100), ("progress", 90)):
+            self.queue_tree.heading(column, text=self.ui_strings["queue_" + column])
+            self.queue_tree.column(column, width=width, stretch=(column == "file"))
+        self.queue_tree.grid(row=0, column=0, columnspan=2, sticky="nsew")
+        self.lbl_queue_summary = ttk.Label(self.queue_frame, text="", foreground=self.style.colors.get("info"))
+        self.lbl_queue_summary.grid(row=1, column=0, sticky="w", padx=5, pady=(5,0))
+        self.btn_queue_cancel = ttk.Button(self.queue_frame, text=self.ui_strings["queue_cancel_selected"],
+                                           bootstyle="danger-outline", command=self.cancel_queue_selection)
+        self.btn_queue_cancel.grid(row=1, column=1, sticky="e", padx=5, pady=(5,0))
+        # La file n'apparaît qu'une fois des fichiers ajoutés
+        self.queue_frame.grid_remove()
 
     def clear_url_placeholder(self, event):
         if self.url_var.get() == self.url_placeholder:
@@ -1109,27 +1166,36 @@ class YoutubeDownloaderApp(ttk.Window):
             lbl.grid_forget()
         self.analyze_progress.pack(side=tk.LEFT, fill=tk.X, expand=True, padx=5, pady=5)
         self.analyze_progress.start(10)
+        self.analysis_running = True
         threading.Thread(target=self.run_analysis_thread, args=(url,), daemon=True).start()
 
     def run_analysis_thread(self, url):
-        v_list, a_list = parse_available_formats(url)
-        thumb_url = get_thumbnail_url(url)
-        (video_title, video_channel, video_pubdate, view_count,
-         like_count, comment_count, duration) = get_video_info(url)
+        # Même vidéo sous une autre forme d'URL (youtu.be, shorts, &t=...) : on réutilise l'analyse
+        result = analyze(url, cache=self.analysis_cache)
+        v_list = result["video_formats"]
+        a_list = result["audio_formats"]
+        formats = result["formats"]
+        thumb_url = result["thumbnail_url"]
+        video_title = result["title"]
+        video_channel = result["channel"]
+        video_pubdate = result["upload_date"]
+        view_count = result["view_count"]
+        like_count = result["like_count"]
+        comment_count = result["comment_count"]
+        duration = result["duration"]
+        video_id = result["video_id"]
         self.video_duration = duration
         thumb_image = None
-        if thumb_url:
+        if result["thumbnail_data"]:
             try:
-                r = requests.get(thumb_url, timeout=5)
-                r.raise_for_status()
-                img_data = r.content
-                pil_img = Image.open(io.BytesIO(img_data))
+                pil_img = Image.open(io.BytesIO(result["thumbnail_data"]))
                 pil_img = pil_img.resize((240, 135), Image.Resampling.LANCZOS)
                 thumb_image = ImageTk.PhotoImage(pil_img)
-            except:
+            except Exception:
                 pass
 
         def on_finish():
+            self.analysis_running = False
             self.analyze_progress.stop()
             self.analyze_progress.pack_forget()
             if not v_list and not a_list:
@@ -1138,10 +1204,14 @@ class YoutubeDownloaderApp(ttk.Window):
                     self.ui_strings["no_format_found"]
                 )
                 self.lbl_analyze_info.config(text=self.ui_strings["no_format_found"])
+                self.current_video_done = True
+                self.process_url_queue()
                 return
+            self.current_video_done = False
 
-            self.video_format_list = v_list
-            self.audio_format_list = a_list
+            self.video_format_list = list(v_list)
+            self.audio_format_list = list(a_list)
+            self.analysis_formats = formats
             self.update_format_list()
 
             info_txt = (
@@ -1203,49 +1273,76 @@ class YoutubeDownloaderApp(ttk.Window):
             self.current_video_info = {
                 "title": video_title,
                 "url": url,
-                "thumbnail_url": thumb_url
+                "thumbnail_url": thumb_url,
+                "channel": video_channel,
+                "video_id": video_id
             }
 
         self.after(0, on_finish)
 
-    def update_format_list(self):
+    def on_codec_preference_changed(self, event=None):
+        self.codec_preference = ["all", "compat"][max(self.combo_codecs.current(), 0)]
+        self.update_format_list()
+
+    def current_clip(self):
+        """(début, fin) de l'extrait saisi, None pour la vidéo entière ; ValueError si invalide."""
+        return clip_bounds(self.clip_start_var.get(), self.clip_end_var.get(), self.video_duration)
+
+    def update_format_list(self, keep_selection=False):
         chosen_export = self.export_type_var.get()
+        previous = self.combo_format.current() if keep_selection else -1
+        # Taille estimée sur la durée de l'extrait s'il y en a un
+        try:
+            length = clip_length(self.current_clip(), self.video_duration)
+        except ValueError:
+            length = self.video_duration
         if chosen_export == "mp4":
             options = []
             display_values = []
-            for fmt in self.video_format_list:
+            video_formats = self.video_format_list
+            if self.codec_preference != "all" and self.analysis_formats:
+                video_formats = select_video_formats(self.analysis_formats, self.video_duration, self.codec_preference)
+            for fmt in video_formats:
                 w = fmt["width"]
                 h = fmt["height"]
                 fps = fmt["fps"]
                 tbr = fmt["tbr"]
                 res_str = f"{w}x{h}"
                 fps_str = f"{fps}fps"
+                codec_str = (fmt.get("vcodec") or "").upper()
                 bitrate_str = f"{tbr} kbps"
                 file_format = "MP4"
-                display = f"{res_str}, {fps_str}, {bitrate_str}, {file_format}"
-                if self.video_duration:
-                    est_size = (tbr * self.video_duration) / 8192
+                display = f"{res_str}, {fps_str}, {codec_str}, {bitrate_str}, {file_format}"
+                if fmt.get("filesize") and self.video_duration and length:
+                    # Taille annoncée par le site (exacte ou approchée), au prorata de l'extrait
+                    est_size = fmt["filesize"] / (1024 * 1024) * length / self.video_duration
+                    exact = fmt.get("filesize_exact") and length == self.video_duration
+                    display += f", {'' if exact else '~'}{est_size:.1f} MB"
+                elif length:
+                    est_size = (tbr * length) / 8192
                     display += f", ~{est_size:.1f} MB"
                 options.append(fmt)
                 display_values.append(display)
             self.video_format_options = options
             self.combo_format['values'] = display_values
-            if display_values:
+            if display_values and 0 <= previous < len(display_values):
+                self.combo_format.current(previous)
+            elif display_values:
                 # Sélectionner par défaut 1080p, sinon 720p, sinon le dernier (meilleure qualité)
-                default_idx = len(options) - 1  # Par défaut la meilleure qualité
-                for i, fmt in enumerate(options):
-                    h = min(fmt["height"], fmt["width"])  # Hauteur effective
-                    if h == 1080:
-                        default_idx = i
-                        break
-                    elif h == 720:
-                        default_idx = i  # Continue à chercher 1080p
-                self.combo_format.current(default_idx)
+                self.combo_format.current(default_video_format_index(options))
         else:
             combo_values = [item[1] for item in self.audio_format_list]
             self.combo_format['values'] = combo_values
-            if combo_values:
-                self.combo_format.current(0)
+            if combo_values and 0 <= previous < len(combo_values):
+                self.combo_format.current(previous)
+            elif combo_values:
+                # Audio d'origine en mode compatible : la meilleure piste AAC (.m4a)
+                preferred = select_format_id({"audio_formats": self.audio_format_list,
+                                              "formats": self.analysis_formats or [],
+                                              "duration": self.video_duration},
+                                             chosen_export, self.codec_preference)
+                ids = [item[0] for item in self.audio_format_list]
+                self.combo_format.current(ids.index(preferred) if preferred in ids else 0)
 
     def download_video(self):
         url = self.url_var.get().strip()
@@ -1258,6 +1355,9 @@ class YoutubeDownloaderApp(ttk.Window):
         if not validate_url(url):
             messagebox.showwarning(self.ui_strings["about"], self.ui_strings["invalid_url"])
             return
+        if parse_media_url(url):
+            # Forme canonique : sans &list=..., yt-dlp ne déroule pas toute la playlist
+            url = canonical_url(url)
 
         chosen_export = self.export_type_var.get()
         if chosen_export == "mp4":
@@ -1293,113 +1393,323 @@ class YoutubeDownloaderApp(ttk.Window):
                 return
             combo_id = current_val.split("|")[0].strip()
 
+        try:
+            clip = self.current_clip()
+        except ValueError:
+            messagebox.showwarning(self.ui_strings["about"], self.ui_strings["invalid_clip"])
+            return
+        precise_cut = bool(clip) and self.precise_cut_var.get()
+
         self.downloaded_file_path = None
-        title_in_info = self.current_video_info.get("title", "")
-        if title_in_info:
-            base = sanitize_filename(title_in_info)
-        else:
-            base = "video"
-        ext = "mp4" if chosen_export == "mp4" else "mp3"
-        candidate = os.path.join(self.output_dir, f"{base}.{ext}")
-        i = 1
-        while os.path.exists(candidate):
-            candidate = os.path.join(self.output_dir, f"{base} ({i}).{ext}")
-            i += 1
-        output_template = candidate
-
-        # --- Nouvelle construction de la commande avec préférence de langue ---
+        # MP3 : la piste native est téléchargée telle quelle, puis transcodée à part
+        download_type = "audio" if chosen_export == "mp3" else chosen_export
+        ext = "mp4" if chosen_export == "mp4" else audio_extension(self.analysis_formats or [], combo_id)
         selected_lang = self.audio_language_var.get().strip()
-        is_auto_lang = (selected_lang.lower() in ["auto", self.ui_strings.get("auto", "auto").lower()])
+        if selected_lang.lower() in ["auto", self.ui_strings.get("auto", "auto").lower()]:
+            selected_lang = "Auto"
+
+        title = self.current_video_info.get("title", "")
+        library_format = combo_id
+        if clip:
+            # Un extrait est un autre fichier que la vidéo entière
+            title = f"{title or 'video'} {clip_label(clip)}"
+            library_format = f"{combo_id}*{clip_label(clip)}{'!' if precise_cut else ''}"
+        if self.reuse_library_file(url, library_format, chosen_export, selected_lang, title):
+            return
+        if not self.check_disk_space(combo_id, chosen_export, clip):
+            return
+        output_template = unique_output_path(self.output_dir, title, ext)
+        mp3_path = unique_output_path(self.output_dir, title, "mp3", reserved=self.transcode_paths) \
+            if chosen_export == "mp3" else None
+
+        # --- Construction de la commande avec préférence de langue ---
+        cmd = build_download_command(url, download_type, combo_id, output_template, selected_lang)
+        if clip:
+            cmd = with_clip(cmd, clip, force_keyframes=precise_cut)
+        self.current_download = {"url": url, "format_id": library_format, "export_type": chosen_export,
+                                 "lang": selected_lang, "output_path": output_template, "mp3_path": mp3_path}
+        self.current_job_id = self.journal_start({
+            "url": url,
+            "export_type": chosen_export,
+            "format_id": library_format,
+            "lang": selected_lang,
+            "output_path": output_template,
+            "mp3_path": mp3_path,
+            "cmd": cmd,
+            "title": self.current_video_info.get("title"),
+            "thumbnail_url": self.current_video_info.get("thumbnail_url"),
+            "channel": self.current_video_info.get("channel"),
+            "video_id": self.current_video_info.get("video_id"),
+        })
+        self.start_download_task(cmd)
+
+    def reuse_library_file(self, url, format_id, export_type, lang, title):
+        """
+        Même vidéo, même format déjà téléchargés et intacts : pas de nouveau
+        téléchargement, le fichier est lié dans le dossier de sortie.
+        """
+        if self.media_library is None:
+            return False
+        try:
+            existing = self.media_library.find(url, format_id, export_type, lang)
+            if not existing:
+                return False
+            ext = os.path.splitext(existing)[1].lstrip(".") or export_type
+            self.downloaded_file_path = self.media_library.place(existing, self.output_dir, title, ext)
+        except (OSError, sqlite3.Error) as e:
+            print("Error reusing library file:", e)
+            return False
+        self.finish_progress(True)
+        self.status_var.set(self.ui_strings["already_downloaded"].format(path=self.downloaded_file_path))
+        self.current_video_done = True
+        self.process_url_queue()
+        return True
+
+    def check_disk_space(self, format_id, export_type, clip):
+        """Refuse le téléchargement avant le moindre octet si le volume ne peut pas le contenir."""
+        size, _ = format_size(self.analysis_formats, format_id, self.video_duration)
+        if not size:
+            return True  # taille inconnue : on tente
+        fraction = clip_length(clip, self.video_duration) / self.video_duration if clip and self.video_duration else 1.0
+        needed = required_space(size, format_id, export_type, fraction)
+        try:
+            free = shutil.disk_usage(self.output_dir).free
+        except OSError as e:
+            print("Error checking disk space:", e)
+            return True
+        if needed <= free:
+            return True
+        messagebox.showerror(
+            "Error" if self.language=="en" else "Erreur",
+            self.ui_strings["disk_full"].format(dir=self.output_dir, needed=format_bytes(needed),
+                                                free=format_bytes(free))
+        )
+        return False
 
-        if chosen_export == "mp4":
-            if is_auto_lang:
-                # Comportement inchangé
-                cmd = [
-                    "yt-dlp",
-                    "-f", combo_id,
-                    "--merge-output-format", "mp4",
-                    "--newline",
-                    "-o", output_template,
-                    url
-                ]
-            else:
-                # On tente de garder la vidéo choisie + audio filtré par langue
-                if "+" in combo_id:
-                    # combo_id = "VID+AUD" -> on remplace juste l'audio
-                    vid_id = combo_id.split("+", 1)[0].strip()
-                    fmt_expr = f"{vid_id}+ba[language^={selected_lang}]/(bestvideo+bestaudio/b)"
-                    cmd = [
-                        "yt-dlp",
-                        "-f", fmt_expr,
-                        "--merge-output-format", "mp4",
-                        "-S", f"lang:{selected_lang}",
-                        "--newline",
-                        "-o", output_template,
-                        url
-                    ]
-                else:
-                    # combo_id = un seul id (format muxé par YouTube)
-                    # On ne peut pas remplacer l'audio directement : on ajoute au moins une préférence de tri
-                    cmd = [
-                        "yt-dlp",
-                        "-f", combo_id,
-                        "--merge-output-format", "mp4",
-                        "-S", f"lang:{selected_lang}",
-                        "--newline",
-                        "-o", output_template,
-                        url
-                    ]
-        else:
-            # Extraction audio (MP3)
-            if is_auto_lang:
-                cmd = [
-                    "yt-dlp",
-                    "-f", combo_id,
-                    "--extract-audio",
-                    "--audio-format", "mp3",
-                    "--newline",
-                    "-o", output_template,
-                    url
-                ]
-            else:
-                # Forcer une piste audio dans la langue souhaitée, fallback sur bestaudio
-                fmt_expr = f"ba[language^={selected_lang}]/bestaudio"
-                cmd = [
-                    "yt-dlp",
-                    "-f", fmt_expr,
-                    "--extract-audio",
-                    "--audio-format", "mp3",
-                    "-S", f"lang:{selected_lang}",
-                    "--newline",
-                    "-o", output_template,
-                    url
-                ]
+    def library_record(self, download, path):
+        """Indexe le fichier terminé (empreinte calculée hors du thread Tk)."""
+        if self.media_library is None or not download:
+            return
+        if not path or not os.path.exists(path):
+            # Extraction MP3 : le fichier suivi par yt-dlp a été remplacé par le .mp3
+            path = download.get("output_path")
+        if not path or not os.path.exists(path):
+            return
+        threading.Thread(
+            target=self.media_library.record,
+            args=(download["url"], download["format_id"], download["export_type"], path, download["lang"]),
+            daemon=True
+        ).start()
 
+    def start_download_task(self, cmd):
         self.progress_val.set(0.0)
         self.download_target = 0.0
         self.progress_bar.configure(style=self.progress_style_name)
         self.status_var.set(self.ui_strings["download_in_progress"] + " 0.0%")
-        self.skip_first_progress_value = True
         self.btn_reencode.pack_forget()
         self.cancelled = False
         self.btn_cancel.config(state="normal")
 
-        threading.Thread(target=self.run_download_thread, args=(cmd,), daemon=True).start()
+        self.download_task = DownloadTask(cmd, on_event=self.on_download_event)
+        threading.Thread(target=self.download_task.run, daemon=True).start()
+
+    def on_download_event(self, kind, data):
+        """Reçoit les événements du téléchargement (thread du moteur) et les traite sur la boucle Tk."""
+        if kind == events.LOG:
+            print(data["line"])
+        elif kind == events.PROGRESS:
+            self.after(0, self.set_smooth_target, data["percent"])
+        elif kind == events.OUTPUT:
+            self.downloaded_file_path = data["path"]
+        elif kind == events.AGE_RESTRICTED:
+            self.after(0, self.show_age_notice)
+        elif kind == events.FINISHED:
+            self.after(0, self.on_download_finished, data)
+
+    def show_age_notice(self):
+        self.status_var.set("Vidéo restreinte par âge → utilisation des cookies Firefox…")
+        if not self.age_restriction_notice_shown:
+            self.age_restriction_notice_shown = True
+            messagebox.showinfo(
+                "Vidéo restreinte",
+                "Cette vidéo nécessite une connexion pour confirmer l'âge.\n"
+                "Vos cookies Firefox seront utilisés. Assurez-vous d'être connecté à YouTube dans Firefox.",
+                parent=self
+            )
+
+    def on_download_finished(self, data):
+        self.btn_cancel.config(state="disabled")
+        self.download_task = None
+        download, self.current_download = self.current_download, None
+        if data["returncode"] == 0 and download and download.get("mp3_path"):
+            # Le journal reste « en cours » jusqu'à la fin du transcodage
+            job_id, self.current_job_id = self.current_job_id, None
+            self.start_transcode(download, self.downloaded_file_path or data["path"], job_id)
+        else:
+            self.journal_finish(data)
+            if data["returncode"] == 0:
+                self.library_record(download, self.downloaded_file_path or data["path"])
+            elif download and download.get("mp3_path"):
+                self.transcode_paths.discard(download["mp3_path"])
+        self.finish_progress(data["returncode"] == 0)
+        if data["returncode"] == 0 and download and download.get("mp3_path"):
+            self.status_var.set(self.ui_strings["transcoding"])
+        self.current_video_done = True
+        if not self.resume_next_job():
+            self.process_url_queue()
+
+    def start_transcode(self, download, source, job_id):
+        """Transcodage MP3 de la piste native dans le pool à part ; la file d'URL continue."""
+        if not source or not os.path.exists(source):
+            source = download["output_path"]
+        def on_event(kind, data):
+            if kind == events.FINISHED:
+                self.after(0, self.on_transcode_finished, download, job_id, data)
+        self.transcoder.submit(source, download["mp3_path"], on_event=on_event)
+
+    def on_transcode_finished(self, download, job_id, data):
+        mp3_path = download["mp3_path"]
+        self.transcode_paths.discard(mp3_path)
+        self.journal_finish(data, job_id)
+        if data["returncode"] == 0:
+            self.library_record(download, mp3_path)
+            message = self.ui_strings["transcode_done"].format(path=os.path.basename(mp3_path))
+        else:
+            message = self.ui_strings["transcode_failed"].format(path=os.path.basename(mp3_path))
+        print(message)
+        # Ne pas masquer la progression d'un autre téléchargement
+        if self.download_task is None and not self.analysis_running:
+            self.status_var.set(message)
+
+    # ----- Journal des téléchargements -----
+    def journal_start(self, params):
+        if self.job_journal is None:
+            return None
+        try:
+            job = self.job_journal.submit("download", params, key=media_key(params["url"]), state=jobs.RUNNING)
+            return job["id"]
+        except sqlite3.Error as e:
+            print("Error writing download journal:", e)
+            return None
 
-    def run_download_thread(self, cmd):
-        clean_cmd = [arg for arg in cmd if arg not in ["--cookies-from-browser", "firefox"]]
-        retcode = run_yt_dlp_command(self, clean_cmd, self.url_var.get().strip())
-        self.after(0, lambda: self.btn_cancel.config(state="disabled"))
-        self.download_process = None
-        if retcode == 0:
-            self.after(0, lambda: self.finish_progress(True))
+    def journal_finish(self, data, job_id=None):
+        if job_id is None:
+            job_id, self.current_job_id = self.current_job_id, None
+        if self.job_journal is None or job_id is None:
+            return
+        if data["cancelled"]:
+            state = jobs.CANCELLED
+        elif data["returncode"] == 0:
+            state = jobs.COMPLETED
         else:
-            self.after(0, lambda: self.finish_progress(False))
+            state = jobs.FAILED
+        try:
+            self.job_journal.update(job_id, state=state,
+                                    result={"path": data["path"]} if data["path"] else None,
+                                    error=f"returncode {data['returncode']}" if state == jobs.FAILED else None)
+        except sqlite3.Error as e:
+            print("Error writing download journal:", e)
+
+    def offer_resume(self):
+        """Au lancement : propose de reprendre les téléchargements interrompus."""
+        if self.job_journal is None:
+            return
+        try:
+            pending = self.job_journal.incomplete("download")
+        except sqlite3.Error as e:
+            print("Error reading download journal:", e)
+            return
+        pending = [job for job in pending if job["params"].get("cmd")]
+        if not pending:
+            return
+        titles = "\n".join(f"• {job['params'].get('title') or job['params']['url']}" for job in pending[:5])
+        if len(pending) > 5:
+            titles += "\n…"
+        if messagebox.askyesno(self.ui_strings["resume_title"],
+                               self.ui_strings["resume_prompt"].format(n=len(pending), titles=titles),
+                               parent=self):
+            self.resume_queue = pending
+            self.resume_next_job()
+        else:
+            for job in pending:
+                self.job_journal.update(job["id"], state=jobs.CANCELLED)
+
+    def resume_next_job(self):
+        """
+        Relance le prochain téléchargement interrompu avec la commande et le
+        chemin de sortie enregistrés (--continue : reprise du fichier .part).
+        Retourne False s'il n'y en a plus.
+        """
+        if not self.resume_queue or self.download_task is not None:
+            return False
+        job = self.resume_queue.pop(0)
+        params = job["params"]
+        self.current_video_info = {
+            "title": params.get("title"),
+            "url": params["url"],
+            "thumbnail_url": params.get("thumbnail_url"),
+            "channel": params.get("channel"),
+            "video_id": params.get("video_id"),
+        }
+        self.current_video_done = False
+        self.url_var.set(params["url"])
+        self.export_type_var.set(params.get("export_type", "mp4"))
+        self.downloaded_file_path = None
+        self.current_download = {"url": params["url"], "format_id": params.get("format_id"),
+                                 "export_type": params.get("export_type", "mp4"), "lang": params.get("lang", "Auto"),
+                                 "output_path": params.get("output_path"), "mp3_path": params.get("mp3_path")}
+        self.current_job_id = job["id"]
+        self.job_journal.update(job["id"], state=jobs.RUNNING)
+        self.start_download_task(with_continue(params["cmd"]))
+        return True
+
+    def receive_urls(self, urls):
+        """URL transmises par un second lancement : fenêtre au premier plan, puis file d'attente."""
+        self.deiconify()
+        self.lift()
+        self.attributes("-topmost", True)
+        self.after(10, lambda: self.attributes("-topmost", False))
+        self.focus_force()
+        self.enqueue_urls(urls)
+
+    def enqueue_urls(self, urls):
+        """Ajoute les URL valides à la file (une même vidéo n'y figure qu'une fois)."""
+        current_key = media_key(self.current_video_info.get("url") or "") if not self.current_video_done else None
+        for url in urls:
+            url = url.strip()
+            if not validate_url(url):
+                continue
+            key = media_key(url)
+            if key in self.url_queue_keys or key == current_key:
+                continue
+            self.url_queue.append(url)
+            self.url_queue_keys.add(key)
+        if self.url_queue:
+            self.notebook.select(self.tab_download)
+        self.process_url_queue()
+
+    def process_url_queue(self):
+        """
+        Analyse l'URL suivante quand l'application est libre : pas d'analyse
+        ni de téléchargement en cours, et la vidéo affichée a été téléchargée.
+        """
+        if not self.url_queue:
+            return
+        if self.analysis_running or self.download_task is not None or not self.current_video_done:
+            self.status_var.set(self.ui_strings["queued_urls"].format(n=len(self.url_queue)))
+            return
+        url = self.url_queue.pop(0)
+        self.url_queue_keys.discard(media_key(url))
+        self.url_var.set(url)
+        self.analyze_video()
+        if self.url_queue:
+            self.status_var.set(self.ui_strings["queued_urls"].format(n=len(self.url_queue)))
 
     def cancel_download(self):
-        if self.download_process and self.download_process.poll() is None:
+        task = self.download_task
+        if task and task.process and task.process.poll() is None:
             try:
-                self.download_process.terminate()
+                task.cancel()
                 self.cancelled = True
                 self.status_var.set(self.ui_strings["download_stopped"])
             except Exception as e:
@@ -1451,6 +1761,7 @@ class YoutubeDownloaderApp(ttk.Window):
             if self.current_video_info and self.current_video_info.get("title"):
                 entry = self.current_video_info.copy()
                 entry["download_date"] = datetime.datetime.now().strftime("%Y-%m-%d %H:%M")
+                entry["export_type"] = self.export_type_var.get()
                 self.add_to_history(entry)
             if self.open_folder_var.get():
                 self.open_downloads_folder()
@@ -1473,71 +1784,76 @@ class YoutubeDownloaderApp(ttk.Window):
                 self.status_var.set(self.ui_strings["reencode_in_progress"])
                 self.progress_val.set(0)
                 self.encoding = True
-                self.cancel_reencode = False
                 self.btn_reencode.config(text="Arrêter" if self.language=="fr" else "Stop")
-                def reencode_task():
-                    reencoded_file = self.downloaded_file_path.replace(".mp4", "_reencoded.mp4")
-                    cmd = [
-                        "ffmpeg", "-i", self.downloaded_file_path,
-                        "-c:v", "libx264", "-preset", "slow", "-crf", "18",
-                        "-c:a", "copy",
-                        "-movflags", "faststart",
-                        reencoded_file
-                    ]
-                    try:
-                        self.reencode_process = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, universal_newlines=True)
-                        while True:
-                            line = self.reencode_process.stdout.readline()
-                            if not line:
-                                break
-                            line = line.strip()
-                            match = re.search(r"time=(\d+):(\d+):(\d+\.\d+)", line)
-                            if match and self.video_duration:
-                                hours = int(match.group(1))
-                                minutes = int(match.group(2))
-                                seconds = float(match.group(3))
-                                current_time = hours * 3600 + minutes * 60 + seconds
-                                progress_percentage = (current_time / self.video_duration) * 100
-                                if progress_percentage > 100:
-                                    progress_percentage = 100
-                                self.after(0, self.progress_val.set, progress_percentage)
-                                self.after(0, self.status_var.set,
-                                           f"{self.ui_strings['reencode_in_progress']} {progress_percentage:.1f}%")
-                            if self.cancel_reencode:
-                                self.reencode_process.terminate()
-                                break
-                        self.reencode_process.wait()
-                        if self.cancel_reencode:
-                            if os.path.exists(reencoded_file):
-                                os.remove(reencoded_file)
-                            self.after(0, self.status_var.set,
-                                       "Re‑encoding cancelled." if self.language=="en" else "Ré‑encodage annulé.")
-                        else:
-                            os.replace(reencoded_file, self.downloaded_file_path)
-                            self.after(0, self.status_var.set,
-                                       "MP4 file re‑encoded and optimized." if self.language=="en"
-                                       else "Fichier MP4 ré‑encodé et optimisé.")
-                            self.after(0, self.progress_val.set, 100)
-                    except Exception as e:
-                        print("Error during MP4 re‑encoding:", e)
-                        self.after(0, self.status_var.set,
-                                   "Error during re‑encoding." if self.language=="en" else "Erreur lors du ré‑encodage.")
-                    finally:
-                        self.encoding = False
-                        self.reencode_process = None
-                        self.after(0, self.btn_reencode.config, {"text": self.ui_strings["reencode_mp4"]})
-                threading.Thread(target=reencode_task, daemon=True).start()
+                source_file = self.downloaded_file_path
+                threading.Thread(target=self.run_reencode, args=(source_file,), daemon=True).start()
         else:
-            self.cancel_reencode = True
-            if self.reencode_process and self.reencode_process.poll() is None:
+            if not self.reencode_task:
+                # Analyse ffprobe en cours : run_reencode s'arrêtera avant ffmpeg
+                self.encoding = False
+                self.btn_reencode.config(text=self.ui_strings["reencode_mp4"])
+                self.status_var.set("Re‑encoding cancelled." if self.language=="en" else "Ré‑encodage annulé.")
+            else:
                 try:
-                    self.reencode_process.terminate()
+                    self.reencode_task.cancel()
                     self.status_var.set(
                         "Stopping re‑encoding..." if self.language=="en" else "Arrêt du ré‑encodage en cours..."
                     )
                 except Exception as e:
                     print("Error terminating re‑encoding process:", e)
 
+    def run_reencode(self, source_file):
+        """
+        Thread de travail : ffprobe décide des flux à réencoder (souvent aucun,
+        simple remux faststart), puis ffmpeg.
+        """
+        plan = plan_reencode(source_file)
+        if not self.encoding:
+            return
+        label = self.ui_strings["remux_in_progress"] if "encode" not in plan.values() \
+            else self.ui_strings["reencode_in_progress"]
+        reencoded_file = source_file.replace(".mp4", "_reencoded.mp4")
+        on_event = lambda kind, data: self.after(0, self.on_reencode_event, kind, data, source_file, label)
+        if plan["video"] == "encode":
+            # x264 « slow » : segments encodés en parallèle sur tous les cœurs
+            task = ChunkedEncodeTask(
+                source_file, reencoded_file, REENCODE_VIDEO_ARGS,
+                REENCODE_AUDIO_ARGS if plan["audio"] == "encode" else None,
+                ["-movflags", "+faststart"], duration=self.video_duration, on_event=on_event
+            )
+        else:
+            task = FFmpegTask(build_reencode_command(source_file, reencoded_file, plan),
+                              duration=self.video_duration, output_path=reencoded_file, on_event=on_event)
+        self.reencode_task = task
+        self.after(0, self.status_var.set, label)
+        task.run()
+
+    def on_reencode_event(self, kind, data, source_file, label=None):
+        label = label or self.ui_strings["reencode_in_progress"]
+        if kind == events.PROGRESS and "percent" in data:
+            self.progress_val.set(data["percent"])
+            speed = f" ({data['speed']:.1f}×)" if data.get("speed") else ""
+            self.status_var.set(f"{label} {data['percent']:.1f}%{speed}")
+        elif kind == events.LOG:
+            print(data["line"])
+        elif kind == events.FINISHED:
+            if data["cancelled"]:
+                self.status_var.set("Re‑encoding cancelled." if self.language=="en" else "Ré‑encodage annulé.")
+            elif data["returncode"] == 0:
+                try:
+                    os.replace(data["path"], source_file)
+                    self.status_var.set("MP4 file re‑encoded and optimized." if self.language=="en"
+                                        else "Fichier MP4 ré‑encodé et optimisé.")
+                    self.progress_val.set(100)
+                except OSError as e:
+                    print("Error during MP4 re‑encoding:", e)
+                    self.status_var.set("Error during re‑encoding." if self.language=="en" else "Erreur lors du ré‑encodage.")
+            else:
+                self.status_var.set("Error during re‑encoding." if self.language=="en" else "Erreur lors du ré‑encodage.")
+            self.encoding = False
+            self.reencode_task = None
+            self.btn_reencode.config(text=self.ui_strings["reencode_mp4"])
+
     def open_downloads_folder(self):
         system = platform.system()
         if system == "Darwin":
@@ -1548,92 +1864,146 @@ class YoutubeDownloaderApp(ttk.Window):
             subprocess.run(["xdg-open", self.output_dir])
 
     def load_history(self):
-        if os.path.exists(self.history_file):
-            try:
-                with open(self.history_file, "r", encoding="utf-8") as f:
-                    self.history = json.load(f)
-            except Exception as e:
-                print("Error loading history:", e)
-                self.history = []
-        else:
-            self.history = []
+        try:
+            self.history_store = HistoryStore(self.history_db, legacy_json_path=self.history_file)
+        except sqlite3.Error as e:
+            print("Error loading history:", e)
+            self.history_store = HistoryStore(":memory:")
+        self.history_hydrated_id = 0
+        self.history_index_ready = False
+
+    def hydrate_history_index(self):
+        """
+        Construit l'index de recherche par lots de HISTORY_HYDRATE_CHUNK entrées,
+        sur la boucle Tk après le premier affichage, pour ne pas retarder
+        l'ouverture de la fenêtre.
+        """
+        entries = self.history_store.rows_after(self.history_hydrated_id, HISTORY_HYDRATE_CHUNK)
+        for entry in entries:
+            self.history_index.add(entry["id"], entry)
+        if entries:
+            self.history_hydrated_id = entries[-1]["id"]
+        if len(entries) == HISTORY_HYDRATE_CHUNK:
+            self.after(1, self.hydrate_history_index)
+            return
+        self.history_index_ready = True
+        # Une recherche lancée pendant l'hydratation n'a vu qu'une partie de l'historique
+        if self.is_tab_built(self.tab_history) and self.history_last_query:
+            self.update_history_view()
 
-    def save_history(self):
+    def add_to_history(self, entry):
+        self.add_many_to_history([entry])
+
+    def add_many_to_history(self, entries):
         try:
-            with open(self.history_file, "w", encoding="utf-8") as f:
-                json.dump(self.history, f, ensure_ascii=False, indent=2)
-        except Exception as e:
+            added = self.history_store.add_many(entries)
+        except sqlite3.Error as e:
             print("Error saving history:", e)
+            return
+        if not added:
+            return
+        for doc_id, entry in added:
+            self.history_index.add(doc_id, entry)
+        if self.is_tab_built(self.tab_history):
+            self.update_history_view()
 
-    def add_to_history(self, entry):
-        new_date = entry.get("download_date", "")
-        new_title = entry.get("title", "")
-        new_url = entry.get("url", "")
-        new_date_part = new_date.split()[0] if new_date else ""
-        for existing in self.history:
-            existing_date = existing.get("download_date", "")
-            existing_date_part = existing_date.split()[0] if existing_date else ""
-            if (existing.get("title") == new_title or existing.get("url") == new_url) and existing_date_part == new_date_part:
-                return
-        self.history.append(entry)
-        self.save_history()
-        self.update_history_view()
+    def on_history_search_key(self, event=None):
+        """Relance la recherche après HISTORY_SEARCH_DEBOUNCE_MS sans frappe."""
+        if self.history_search_job is not None:
+            self.after_cancel(self.history_search_job)
+        self.history_search_job = self.after(HISTORY_SEARCH_DEBOUNCE_MS, self._run_history_search)
+
+    def _run_history_search(self):
+        self.history_search_job = None
+        if self.search_var.get().strip() != self.history_last_query:
+            self.update_history_view()
 
     def update_history_view(self, event=None):
+        """Réinitialise la liste et affiche la première page de résultats."""
         for widget in self.history_frame.winfo_children():
             widget.destroy()
-        query = self.search_var.get().lower() if hasattr(self, "search_var") else ""
-        for idx, entry in enumerate(reversed(self.history)):
-            title = entry.get("title", "")
-            url = entry.get("url", "")
-            date = entry.get("download_date", "")
-            if query and (query not in title.lower() and query not in url.lower()):
-                continue
-            item_frame = ttk.Frame(self.history_frame)
-            item_frame.pack(fill=tk.X, padx=10, pady=(5,0))
-            thumb_url = entry.get("thumbnail_url")
-            if thumb_url in self.history_images:
-                photo = self.history_images[thumb_url]
-                lbl_thumbnail = ttk.Label(item_frame, image=photo)
-            else:
-                lbl_thumbnail = ttk.Label(item_frame, image=self.placeholder_history_tk)
-                self._load_thumbnail_async(thumb_url, lbl_thumbnail)
-            lbl_thumbnail.pack(side=tk.LEFT, padx=(0,10))
-            text_frame = ttk.Frame(item_frame)
-            text_frame.pack(side=tk.LEFT, fill=tk.X, expand=True)
-            lbl_title = ttk.Label(text_frame, text=f"{title}", font=("Helvetica", 12, "bold"))
-            lbl_title.pack(anchor=tk.W)
-            lbl_url = ttk.Label(text_frame, text=f"{url}", font=("Helvetica", 10), foreground="#555")
-            lbl_url.pack(anchor=tk.W)
-            lbl_date = ttk.Label(text_frame, text=f"{date}", font=("Helvetica", 10), foreground="#888")
-            lbl_date.pack(anchor=tk.W)
-            item_frame.bind("<Double-1>", lambda event, url=url: self.on_history_item_double_click(url))
-            for child in item_frame.winfo_children():
-                child.bind("<Double-1>", lambda event, url=url: self.on_history_item_double_click(url))
-            btn_frame = ttk.Frame(item_frame)
-            btn_frame.pack(side=tk.RIGHT, padx=5)
-            btn_copy = ttk.Button(
-                btn_frame,
-                text="📋",
-                bootstyle="flat",
-                style="History.TButton",
-                padding=2,
-                command=lambda url=url: self.copy_history_url(url)
-            )
-            CreateToolTip(btn_copy, self.ui_strings["copy_url"])
-            btn_copy.pack(side=tk.LEFT, padx=2, pady=2)
-            btn_delete = ttk.Button(
-                btn_frame,
-                text="🗑",
-                bootstyle="flat",
-                style="History.TButton",
-                padding=2,
-                command=lambda u=url: self.delete_history_item(u)
-            )
-            CreateToolTip(btn_delete, self.ui_strings["delete"])
-            btn_delete.pack(side=tk.LEFT, padx=2, pady=2)
-            sep = ttk.Separator(self.history_frame, orient="horizontal")
-            sep.pack(fill=tk.X, padx=10, pady=5)
+        query = self.search_var.get().strip() if hasattr(self, "search_var") else ""
+        self.history_last_query = query
+        # Sans recherche on pagine directement dans SQLite, sinon dans les ids classés par l'index
+        self.history_results = self.history_index.search(query) if query else None
+        self.history_rendered = 0
+        self.history_exhausted = False
+        self.load_more_history()
+        self.history_canvas.yview_moveto(0)
+
+    def load_more_history(self):
+        """Ajoute la page suivante de l'historique à la vue."""
+        if self.history_exhausted:
+            return
+        start = self.history_rendered
+        if self.history_results is None:
+            entries = self.history_store.page(start, HISTORY_PAGE_SIZE)
+        else:
+            entries = self.history_store.get_many(self.history_results[start:start + HISTORY_PAGE_SIZE])
+        if len(entries) < HISTORY_PAGE_SIZE:
+            self.history_exhausted = True
+        self.history_rendered += len(entries)
+        for entry in entries:
+            self._render_history_entry(entry)
+
+    def _on_history_scroll(self, first, last):
+        self.history_scrollbar.set(first, last)
+        if float(last) > 0.9 and not self.history_exhausted and not self.history_load_pending:
+            self.history_load_pending = True
+            def load():
+                self.history_load_pending = False
+                self.load_more_history()
+            self.after_idle(load)
+
+    def _render_history_entry(self, entry):
+        title = entry.get("title", "")
+        url = entry.get("url", "")
+        date = entry.get("download_date", "")
+        item_frame = ttk.Frame(self.history_frame)
+        item_frame.pack(fill=tk.X, padx=10, pady=(5,0))
+        thumb_url = entry.get("thumbnail_url")
+        if thumb_url in self.history_images:
+            photo = self.history_images[thumb_url]
+            lbl_thumbnail = ttk.Label(item_frame, image=photo)
+        else:
+            lbl_thumbnail = ttk.Label(item_frame, image=self.placeholder_history_tk)
+            self._load_thumbnail_async(thumb_url, lbl_thumbnail)
+        lbl_thumbnail.pack(side=tk.LEFT, padx=(0,10))
+        text_frame = ttk.Frame(item_frame)
+        text_frame.pack(side=tk.LEFT, fill=tk.X, expand=True)
+        lbl_title = ttk.Label(text_frame, text=f"{title}", font=("Helvetica", 12, "bold"))
+        lbl_title.pack(anchor=tk.W)
+        lbl_url = ttk.Label(text_frame, text=f"{url}", font=("Helvetica", 10), foreground="#555")
+        lbl_url.pack(anchor=tk.W)
+        lbl_date = ttk.Label(text_frame, text=f"{date}", font=("Helvetica", 10), foreground="#888")
+        lbl_date.pack(anchor=tk.W)
+        item_frame.bind("<Double-1>", lambda event, url=url: self.on_history_item_double_click(url))
+        for child in item_frame.winfo_children():
+            child.bind("<Double-1>", lambda event, url=url: self.on_history_item_double_click(url))
+        btn_frame = ttk.Frame(item_frame)
+        btn_frame.pack(side=tk.RIGHT, padx=5)
+        btn_copy = ttk.Button(
+            btn_frame,
+            text="📋",
+            bootstyle="flat",
+            style="History.TButton",
+            padding=2,
+            command=lambda url=url: self.copy_history_url(url)
+        )
+        CreateToolTip(btn_copy, self.ui_strings["copy_url"])
+        btn_copy.pack(side=tk.LEFT, padx=2, pady=2)
+        btn_delete = ttk.Button(
+            btn_frame,
+            text="🗑",
+            bootstyle="flat",
+            style="History.TButton",
+            padding=2,
+            command=lambda u=url: self.delete_history_item(u)
+        )
+        CreateToolTip(btn_delete, self.ui_strings["delete"])
+        btn_delete.pack(side=tk.LEFT, padx=2, pady=2)
+        sep = ttk.Separator(self.history_frame, orient="horizontal")
+        sep.pack(fill=tk.X, padx=10, pady=5)
 
     def on_history_item_double_click(self, url):
         self.url_var.set(url)
@@ -1648,24 +2018,24 @@ class YoutubeDownloaderApp(ttk.Window):
     def delete_history_item(self, url):
         confirm = messagebox.askyesno(self.ui_strings["delete"], self.ui_strings["confirm_delete"])
         if confirm:
-            self.history = [e for e in self.history if e.get("url") != url]
-            self.save_history()
+            for doc_id in self.history_store.delete_url(url):
+                self.history_index.remove(doc_id)
             self.update_history_view()
 
     def clear_history(self):
         confirm = messagebox.askyesno(self.ui_strings["clear_history"], self.ui_strings["confirm_clear_history"])
         if confirm:
-            self.history = []
-            self.save_history()
+            self.history_store.clear()
+            self.history_index.clear()
             self.update_history_view()
 
     def _load_thumbnail_async(self, thumb_url, label):
         """Charge une miniature en arrière-plan et met à jour le label."""
+        if not thumb_url:
+            return
         def load():
             try:
-                r = requests.get(thumb_url, timeout=5)
-                r.raise_for_status()
-                img_data = r.content
+                img_data = fetch_bytes(thumb_url)
                 pil_img = Image.open(io.BytesIO(img_data))
                 pil_img = pil_img.resize((60, 34), Image.Resampling.LANCZOS)
                 photo = ImageTk.PhotoImage(pil_img)
@@ -1677,7 +2047,7 @@ class YoutubeDownloaderApp(ttk.Window):
                 self.after(0, update_label)
             except Exception:
                 pass
-        threading.Thread(target=load, daemon=True).start()
+        self.thumbnail_pool.submit(load)
 
     # --- Nouvelle fonction pour télécharger la miniature ---
     def download_thumbnail(self):
@@ -1686,8 +2056,7 @@ class YoutubeDownloaderApp(ttk.Window):
             messagebox.showerror("Error", "Aucune miniature disponible." if self.language=="fr" else "No thumbnail available.")
             return
         try:
-            response = requests.get(thumb_url, timeout=10)
-            response.raise_for_status()
+            img_data = fetch_bytes(thumb_url, timeout=10)
             ext = os.path.splitext(thumb_url.split("?")[0])[1]
             if not ext:
                 ext = ".jpg"
@@ -1698,7 +2067,7 @@ class YoutubeDownloaderApp(ttk.Window):
                                                      filetypes=[("Image files", "*.jpg *.jpeg *.png *.gif"), ("All files", "*.*")])
             if file_path:
                 with open(file_path, "wb") as f:
-                    f.write(response.content)
+                    f.write(img_data)
                 messagebox.showinfo("Info", "Image téléchargée avec succès." if self.language=="fr" else "Thumbnail downloaded successfully.")
         except Exception as e:
             messagebox.showerror("Error", ("Erreur lors du téléchargement de l'image : " if self.language=="fr" else "Error downloading thumbnail: ") + str(e))
@@ -1706,6 +2075,7 @@ class YoutubeDownloaderApp(ttk.Window):
     # --- Fonctions pour l'onglet Conversion ---
 
     def choose_conversion_file(self):
+        self.ensure_tab_built(self.tab_convert)
         file_path = filedialog.askopenfilename(title=self.ui_strings["choose_file"])
         if file_path:
             self.conversion_file_path = file_path
@@ -1724,100 +2094,58 @@ class YoutubeDownloaderApp(ttk.Window):
             if self.combo_sample_rate['values']:
                 index = self.combo_sample_rate['values'].index("44100") if "44100" in self.combo_sample_rate['values'] else 0
                 self.combo_sample_rate.current(index)
-            info = self.get_conversion_file_info(file_path)
-            if info:
-                self.lbl_conv_file_name.config(text=f"Nom du fichier : {info.get('file_name', 'N/A')}")
-                self.lbl_conv_duration.config(text=f"Durée : {format_duration(info.get('duration', 0))}")
-                self.lbl_conv_codec.config(text=f"Format : {info.get('format_name', 'N/A')}")
-                self.lbl_conv_resolution.config(text=f"Résolution : {info.get('video_resolution', 'N/A')}")
-                self.lbl_conv_format.config(text=f"Débit global : {info.get('format_bit_rate', 'N/A')}")
-                # Affichage des infos obtenues
-                self.lbl_conv_file_name.grid()
-                self.lbl_conv_duration.grid()
-                self.lbl_conv_codec.grid()
-                self.lbl_conv_resolution.grid()
-                self.lbl_conv_format.grid()
-            thumb = self.extract_thumbnail(file_path)
-            if thumb:
-                self.lbl_conv_thumbnail.config(image=thumb)
-                self.lbl_conv_thumbnail.image = thumb
-                self.add_play_overlay()  # Ajout de l'overlay play sur le thumbnail
-            else:
-                self.lbl_conv_thumbnail.config(image=self.placeholder_tk)
-                self.remove_play_overlay()
+            self.clear_output_profiles()
+            self.lbl_prediction.config(text="")
+            # Analyse ffprobe hors du thread Tk ; start_conversion la retrouve en cache
+            self.probes.submit(file_path).add_done_callback(
+                lambda future: self.after(0, self.show_conversion_file_info, file_path)
+            )
+            # Image d'aperçu extraite (ou lue en cache) en arrière-plan
+            self.lbl_conv_thumbnail.config(image=self.placeholder_tk)
+            self.remove_play_overlay()
+            self.posters.submit(file_path).add_done_callback(
+                lambda future: self.after(0, self.show_conversion_poster, file_path, future.result())
+            )
         else:
             self.remove_play_overlay()
 
-    def get_conversion_file_info(self, file_path):
-        """Utilise ffprobe pour extraire des informations techniques supplémentaires."""
-        try:
-            cmd = [
-                "ffprobe", "-v", "error",
-                "-show_entries", "format=duration,format_name,bit_rate",
-                "-show_streams",
-                "-of", "json", file_path
-            ]
-            result = subprocess.run(cmd, capture_output=True, text=True, check=True)
-            info = json.loads(result.stdout)
-            duration = float(info.get("format", {}).get("duration", 0))
-            format_name = info.get("format", {}).get("format_name", "N/A")
-            format_bit_rate = info.get("format", {}).get("bit_rate", "N/A")
-            video_info = {}
-            audio_info = {}
-            for stream in info.get("streams", []):
-                if stream.get("codec_type") == "video" and not video_info:
-                    video_info = {
-                        "codec": stream.get("codec_name", "N/A"),
-                        "width": stream.get("width", "N/A"),
-                        "height": stream.get("height", "N/A"),
-                        "bit_rate": stream.get("bit_rate", "N/A"),
-                        "frame_rate": stream.get("avg_frame_rate", "N/A")
-                    }
-                elif stream.get("codec_type") == "audio" and not audio_info:
-                    audio_info = {
-                        "codec": stream.get("codec_name", "N/A"),
-                        "sample_rate": stream.get("sample_rate", "N/A"),
-                        "channels": stream.get("channels", "N/A"),
-                        "bit_rate": stream.get("bit_rate", "N/A")
-                    }
-            if video_info.get("frame_rate") and video_info.get("frame_rate") != "N/A":
-                try:
-                    num, den = video_info["frame_rate"].split('/')
-                    video_frame_rate = round(float(num)/float(den), 2)
-                except Exception:
-                    video_frame_rate = "N/A"
-            else:
-                video_frame_rate = "N/A"
-            video_resolution = f"{video_info.get('width')}x{video_info.get('height')}"
-            return {
-                "file_name": os.path.basename(file_path),
-                "duration": duration,
-                "format_name": format_name,
-                "format_bit_rate": format_bit_rate,
-                "video_codec": video_info.get("codec", "N/A"),
-                "video_resolution": video_resolution,
-                "video_bit_rate": video_info.get("bit_rate", "N/A"),
-                "video_frame_rate": video_frame_rate,
-                "audio_codec": audio_info.get("codec", "N/A"),
-                "audio_sample_rate": audio_info.get("sample_rate", "N/A"),
-                "audio_channels": audio_info.get("channels", "N/A"),
-                "audio_bit_rate": audio_info.get("bit_rate", "N/A")
-            }
-        except Exception as e:
-            print("Error getting file info:", e)
-            return {}
+    def show_conversion_file_info(self, file_path):
+        if file_path != self.conversion_file_path:
+            return
+        info = probe_media_file(file_path)
+        if info:
+            self.lbl_conv_file_name.config(text=f"Nom du fichier : {info.get('file_name', 'N/A')}")
+            self.lbl_conv_duration.config(text=f"Durée : {format_duration(info.get('duration', 0))}")
+            self.lbl_conv_codec.config(text=f"Format : {info.get('format_name', 'N/A')}")
+            self.lbl_conv_resolution.config(text=f"Résolution : {info.get('video_resolution', 'N/A')}")
+            self.lbl_conv_format.config(text=f"Débit global : {info.get('format_bit_rate', 'N/A')}")
+            # Affichage des infos obtenues
+            self.lbl_conv_file_name.grid()
+            self.lbl_conv_duration.grid()
+            self.lbl_conv_codec.grid()
+            self.lbl_conv_resolution.grid()
+            self.lbl_conv_format.grid()
+
+    def show_conversion_poster(self, file_path, data):
+        if file_path != self.conversion_file_path:
+            return
+        thumb = self.poster_image(data)
+        if thumb:
+            self.lbl_conv_thumbnail.config(image=thumb)
+            self.lbl_conv_thumbnail.image = thumb
+            self.add_play_overlay()  # Ajout de l'overlay play sur le thumbnail
+        else:
+            self.lbl_conv_thumbnail.config(image=self.placeholder_tk)
+            self.remove_play_overlay()
 
-    def extract_thumbnail(self, file_path):
-        """Extrait une miniature de la vidéo à 1 seconde."""
+    def poster_image(self, data):
+        """Miniature 240×135 à partir des octets JPEG de l'image d'aperçu."""
+        if not data:
+            return None
         try:
-            temp_thumb = file_path + "_thumb.jpg"
-            cmd = ["ffmpeg", "-y", "-i", file_path, "-ss", "00:00:01.000", "-vframes", "1", temp_thumb]
-            subprocess.run(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, check=True)
-            pil_img = Image.open(temp_thumb)
+            pil_img = Image.open(io.BytesIO(data))
             pil_img = pil_img.resize((240, 135), Image.Resampling.LANCZOS)
-            thumb_tk = ImageTk.PhotoImage(pil_img)
-            os.remove(temp_thumb)
-            return thumb_tk
+            return ImageTk.PhotoImage(pil_img)
         except Exception as e:
             print("Error extracting thumbnail:", e)
             return None
@@ -1858,6 +2186,93 @@ class YoutubeDownloaderApp(ttk.Window):
             self.lbl_play_overlay.destroy()
             self.lbl_play_overlay = None
 
+    def conversion_options(self):
+        """Options d'export courantes (onglet Conversion + paramètres avancés)."""
+        return {
+            "format": self.conversion_format_var.get(),
+            "quality": self.quality_var.get(),
+            "video_encoder": self.video_encoder_var.get(),
+            "video_resolution": self.video_resolution_var.get(),
+            "video_bitrate": self.video_bitrate_var.get(),
+            "video_framerate": self.video_framerate_var.get(),
+            "video_preset": self.video_preset_var.get(),
+            "audio_encoder": self.audio_encoder_var.get(),
+            "audio_sample_rate": self.audio_sample_rate_var.get(),
+            "audio_channels": self.audio_channels_var.get(),
+            "audio_bitrate": self.audio_bitrate_var.get(),
+            "optimize": self.chk_optimize.instate(["selected"]),
+            "chunked": self.chunked_var.get(),
+            "target_size_mb": self.target_size_mb(),
+            "time_budget_s": self.time_budget_s(),
+        }
+
+    def target_size_mb(self):
+        """Taille visée en Mo, ou None (case décochée ou valeur invalide)."""
+        if not self.target_size_enabled_var.get():
+            return None
+        try:
+            value = float(self.target_size_var.get().replace(",", "."))
+        except ValueError:
+            return None
+        return value if value > 0 else None
+
+    def time_budget_s(self):
+        """Budget de l'encodeur « auto » en secondes, ou None (vide ou invalide : durée de la vidéo)."""
+        try:
+            value = float(self.time_budget_var.get().replace(",", "."))
+        except ValueError:
+            return None
+        return value * 60 if value > 0 else None
+
+    def add_output_profile(self):
+        """Ajoute les options d'export courantes aux sorties du fichier sélectionné."""
+        options = self.conversion_options()
+        if options not in self.conversion_profiles:
+            self.conversion_profiles.append(options)
+        self.refresh_output_profiles()
+
+    def clear_output_profiles(self):
+        self.conversion_profiles = []
+        self.refresh_output_profiles()
+
+    def refresh_output_profiles(self):
+        if not self.conversion_profiles:
+            self.lbl_output_profiles.config(text="")
+            return
+        labels = []
+        for options in self.conversion_profiles:
+            video = options["format"] in VIDEO_OUTPUT_FORMATS and options["video_resolution"] != "Original"
+            labels.append(f"{options['format']} {options['video_resolution']}" if video else options["format"])
+        self.lbl_output_profiles.config(text=self.ui_strings["output_profiles"].format(profiles=", ".join(labels)))
+
+    def estimate_conversion(self):
+        """Prévision de taille et de durée pour le fichier et les réglages courants (en arrière-plan)."""
+        if not self.conversion_file_path or not os.path.exists(self.conversion_file_path):
+            messagebox.showerror(
+                "Error",
+                "Veuillez choisir un fichier valide." if self.language=="fr" else "Please choose a valid file."
+            )
+            return
+        file_path, options = self.conversion_file_path, self.conversion_options()
+        self.lbl_prediction.config(text=self.ui_strings["estimating"])
+        self.btn_estimate.config(state="disabled")
+        self.predictions.submit_estimate(file_path, options).add_done_callback(
+            lambda future: self.after(0, self.show_conversion_estimate, file_path, future.result())
+        )
+
+    def show_conversion_estimate(self, file_path, estimate):
+        self.btn_estimate.config(state="normal")
+        if file_path != self.conversion_file_path:
+            self.lbl_prediction.config(text="")
+            return
+        if not estimate:
+            self.lbl_prediction.config(text=self.ui_strings["estimate_failed"])
+            return
+        self.lbl_prediction.config(text=self.ui_strings["estimate_result"].format(
+            size=format_bytes(estimate["size"]), time=format_duration(estimate["seconds"]),
+            speed=estimate["speed"] or 0.0
+        ))
+
     def start_conversion(self):
         if not self.conversion_file_path or not os.path.exists(self.conversion_file_path):
             messagebox.showerror(
@@ -1865,175 +2280,147 @@ class YoutubeDownloaderApp(ttk.Window):
                 "Veuillez choisir un fichier valide." if self.language=="fr" else "Please choose a valid file."
             )
             return
-        duration = self.get_file_duration(self.conversion_file_path)
+        # Durée lue dans le cache d'analyse (ffprobe hors du thread Tk si besoin)
+        self.btn_start_conversion.config(state="disabled")
+        file_path = self.conversion_file_path
+        self.probes.submit(file_path).add_done_callback(
+            lambda future: self.after(0, self.start_conversion_probed, file_path, probe_duration(future.result()))
+        )
+
+    def start_conversion_probed(self, file_path, duration):
+        if file_path != self.conversion_file_path:
+            self.btn_start_conversion.config(state="normal")
+            return
         if duration is None:
+            self.btn_start_conversion.config(state="normal")
             messagebox.showerror(
                 "Error",
                 "Impossible d'obtenir la durée du fichier." if self.language=="fr" else "Unable to get file duration."
             )
             return
         self.conversion_duration = duration
-        output_format = self.conversion_format_var.get()
-        base, ext = os.path.splitext(self.conversion_file_path)
-        output_file = f"{base}_converted.{output_format}"
-        i = 1
-        while os.path.exists(output_file):
-            output_file = f"{base}_converted({i}).{output_format}"
-            i += 1
-        self.conversion_output_file = output_file
-
-        # Construction de la commande ffmpeg avec les options d'export
-        cmd = ["ffmpeg", "-i", self.conversion_file_path]
-        if output_format.lower() in ["mp4", "mkv", "avi", "mov", "flv", "wmv"]:
-            # Vidéo
-            cmd.extend(["-c:v", self.video_encoder_var.get()])
-            if self.video_resolution_var.get() != "Original":
-                res_value = self.video_resolution_var.get()[:-1]
-                cmd.extend(["-vf", f"scale=-2:{res_value}"])
-            quality_map = {"Low": "28", "Standard": "23", "High": "18", "Very High": "15"}
-            cmd.extend(["-crf", quality_map.get(self.quality_var.get(), "23")])
-            cmd.extend(["-b:v", self.video_bitrate_var.get()])
-            # Ajout du préréglage vidéo
-            cmd.extend(["-preset", self.video_preset_var.get()])
-            if self.video_framerate_var.get() != "Original":
-                cmd.extend(["-r", self.video_framerate_var.get()])
-            # Audio
-            cmd.extend(["-c:a", self.audio_encoder_var.get()])
-            channels = self.audio_channels_var.get()
-            if channels == "Mono":
-                cmd.extend(["-ac", "1"])
-            elif channels == "Stereo":
-                cmd.extend(["-ac", "2"])
-            cmd.extend(["-b:a", self.audio_bitrate_var.get()])
-            if self.audio_sample_rate_var.get() != "44100":
-                cmd.extend(["-ar", self.audio_sample_rate_var.get()])
-            if self.chk_optimize.instate(["selected"]) and output_format.lower() == "mp4":
-                cmd.extend(["-movflags", "faststart"])
-        elif output_format.lower() in ["mp3", "ogg", "wav"]:
-            cmd.append("-vn")
-            # Sélection automatique du codec audio compatible avec le format de sortie
-            audio_codec_map = {
-                "mp3": "libmp3lame",
-                "ogg": "libvorbis",
-                "wav": "pcm_s16le"
-            }
-            audio_codec = audio_codec_map.get(output_format.lower(), self.audio_encoder_var.get())
-            cmd.extend(["-c:a", audio_codec])
-            channels = self.audio_channels_var.get()
-            if channels == "Mono":
-                cmd.extend(["-ac", "1"])
-            elif channels == "Stereo":
-                cmd.extend(["-ac", "2"])
-            if output_format.lower() != "wav":
-                cmd.extend(["-b:a", self.audio_bitrate_var.get()])
-            if self.audio_sample_rate_var.get() != "44100":
-                cmd.extend(["-ar", self.audio_sample_rate_var.get()])
-        cmd.append(self.conversion_output_file)
-        self.conversion_cmd = cmd
+        options = self.conversion_options()
+        on_event = lambda kind, data: self.after(0, self.on_conversion_event, kind, data)
+        profiles = list(self.conversion_profiles)
+        if options not in profiles:
+            profiles.append(options)
+        if len(profiles) > 1:
+            # Toutes les sorties en une passe : la source n'est décodée qu'une fois
+            reserved = set()
+            outputs = [(unique_converted_path(self.conversion_file_path, opts["format"], reserved=reserved), opts)
+                       for opts in profiles]
+            self.conversion_output_file = outputs[0][0]
+            self.conversion_task = MultiOutputTask(self.conversion_file_path, outputs, duration=duration,
+                                                   on_event=on_event)
+        else:
+            self.conversion_output_file = unique_converted_path(self.conversion_file_path, options["format"])
+            self.conversion_task = conversion_task(self.conversion_file_path, self.conversion_output_file, options,
+                                                   duration=duration, on_event=on_event)
         self.conversion_progress_val.set(0)
         self.lbl_conversion_status.config(text=self.ui_strings["conversion_in_progress"])
+        if options["video_encoder"] == "auto" and len(profiles) == 1:
+            self.lbl_prediction.config(text=self.ui_strings["encoder_tuning"])
         self.btn_start_conversion.config(state="disabled")
         self.btn_cancel_conversion.config(state="normal")
-        self.conversion_cancelled = False
-        threading.Thread(target=self.run_conversion_thread, daemon=True).start()
+        threading.Thread(target=self.conversion_task.run, daemon=True).start()
 
-    def run_conversion_thread(self):
-        cmd = self.conversion_cmd
-        try:
-            self.conversion_process = subprocess.Popen(
-                cmd,
-                stdout=subprocess.PIPE,
-                stderr=subprocess.STDOUT,
-                universal_newlines=True
-            )
-            while True:
-                line = self.conversion_process.stdout.readline()
-                if not line:
-                    break
-                line = line.strip()
-                match = re.search(r"time=(\d+):(\d+):(\d+\.\d+)", line)
-                if match and self.conversion_duration:
-                    hours = int(match.group(1))
-                    minutes = int(match.group(2))
-                    seconds = float(match.group(3))
-                    current_time = hours * 3600 + minutes * 60 + seconds
-                    progress_percentage = (current_time / self.conversion_duration) * 100
-                    if progress_percentage > 100:
-                        progress_percentage = 100
-                    self.after(0, self.conversion_progress_val.set, progress_percentage)
-                    self.after(0, self.lbl_conversion_status.config, {
-                        "text": f"{self.ui_strings['conversion_in_progress']} {progress_percentage:.1f}%"
-                    })
-                size_match = re.search(r"size=\s*([\d\.]+)(\w+)", line)
-                if size_match:
-                    size_val = float(size_match.group(1))
-                    unit = size_match.group(2)
-                    if unit.lower().startswith("k"):
-                        size_mb = size_val / 1024
-                    elif unit.lower().startswith("m"):
-                        size_mb = size_val
-                    elif unit.lower().startswith("g"):
-                        size_mb = size_val * 1024
-                    else:
-                        size_mb = size_val
-                    self.after(0, self.lbl_estimated_size.config, {
-                        "text": f"{self.ui_strings['estimated_size']} ~{size_mb:.1f} MB"
-                    })
-                if self.conversion_cancelled:
-                    self.conversion_process.terminate()
-                    break
-            self.conversion_process.wait()
-            retcode = self.conversion_process.returncode
-            if self.conversion_cancelled:
-                if os.path.exists(self.conversion_output_file):
-                    os.remove(self.conversion_output_file)
-                self.after(0, self.lbl_conversion_status.config, {
-                    "text": "Conversion annulée." if self.language=="fr" else "Conversion cancelled."
-                })
-            elif retcode == 0:
-                self.after(0, self.lbl_conversion_status.config, {"text": self.ui_strings["conversion_complete"]})
-                if os.path.exists(self.conversion_output_file):
-                    size_bytes = os.path.getsize(self.conversion_output_file)
-                    size_mb = size_bytes / (1024*1024)
-                    self.after(0, self.lbl_estimated_size.config, {
-                        "text": f"{self.ui_strings['estimated_size']} {size_mb:.1f} MB"
-                    })
+    def on_conversion_event(self, kind, data):
+        if kind == events.PROGRESS:
+            if "percent" in data:
+                self.conversion_progress_val.set(data["percent"])
+                speed = f" ({data['speed']:.1f}×)" if data.get("speed") else ""
+                self.lbl_conversion_status.config(
+                    text=f"{self.ui_strings['conversion_in_progress']} {data['percent']:.1f}%{speed}"
+                )
+            if "outputs" in data:
+                sizes = " | ".join(f"{os.path.basename(out['path'])} ~{out['size_mb']:.1f} MB"
+                                   for out in data["outputs"])
+                self.lbl_estimated_size.config(text=f"{self.ui_strings['estimated_size']} {sizes}")
+            elif "size_mb" in data:
+                self.lbl_estimated_size.config(text=f"{self.ui_strings['estimated_size']} ~{data['size_mb']:.1f} MB")
+        elif kind == events.TUNED:
+            key = "encoder_tuned" if data["fits"] else "encoder_tuned_over"
+            self.lbl_prediction.config(text=self.ui_strings[key].format(
+                encoder=data["encoder"], preset=data["preset"], time=format_duration(data["seconds"])
+            ))
+        elif kind == events.LOG:
+            print(data["line"])
+        elif kind == events.FINISHED:
+            if data["cancelled"]:
+                self.lbl_conversion_status.config(
+                    text="Conversion annulée." if self.language=="fr" else "Conversion cancelled."
+                )
+            elif data["returncode"] == 0:
+                self.lbl_conversion_status.config(text=self.ui_strings["conversion_complete"])
+                if data.get("target_size") and data.get("size"):
+                    self.lbl_conversion_status.config(text=self.ui_strings["target_size_result"].format(
+                        size=format_bytes(data["size"]), target=format_bytes(data["target_size"]),
+                        error=(data["size"] - data["target_size"]) / data["target_size"] * 100
+                    ))
+                paths = [path for path in data.get("paths", [data["path"]]) if os.path.exists(path)]
+                if paths:
+                    sizes = " | ".join(f"{os.path.getsize(path) / (1024*1024):.1f} MB" for path in paths)
+                    self.lbl_estimated_size.config(text=f"{self.ui_strings['estimated_size']} {sizes}")
             else:
-                self.after(0, self.lbl_conversion_status.config, {"text": self.ui_strings["conversion_failed"]})
-        except Exception as e:
-            print("Error during conversion:", e)
-            self.after(0, self.lbl_conversion_status.config, {"text": self.ui_strings["conversion_failed"]})
-        finally:
-            self.conversion_process = None
-            self.after(0, self.btn_start_conversion.config, {"state": "normal"})
-            self.after(0, self.btn_cancel_conversion.config, {"state": "disabled"})
+                self.lbl_conversion_status.config(text=self.ui_strings["conversion_failed"])
+            self.conversion_task = None
+            self.btn_start_conversion.config(state="normal")
+            self.btn_cancel_conversion.config(state="disabled")
 
     def cancel_conversion(self):
-        self.conversion_cancelled = True
-        if self.conversion_process and self.conversion_process.poll() is None:
+        if self.conversion_task:
             try:
-                self.conversion_process.terminate()
+                self.conversion_task.cancel()
                 self.lbl_conversion_status.config(
                     text="Annulation en cours..." if self.language=="fr" else "Cancelling conversion..."
                 )
             except Exception as e:
                 print("Error terminating conversion process:", e)
 
-    def get_file_duration(self, file_path):
-        try:
-            cmd = [
-                "ffprobe",
-                "-v", "error",
-                "-show_entries", "format=duration",
-                "-of", "default=noprint_wrappers=1:nokey=1",
-                file_path
-            ]
-            result = subprocess.run(cmd, capture_output=True, text=True, check=True)
-            duration = float(result.stdout.strip())
-            return duration
-        except Exception as e:
-            print("Error getting file duration:", e)
-            return None
+    def add_conversion_files(self):
+        """Ajoute plusieurs fichiers à la file de conversion, avec les options d'export courantes."""
+        self.ensure_tab_built(self.tab_convert)
+        paths = filedialog.askopenfilenames(title=self.ui_strings["add_files"])
+        if not paths:
+            return
+        if self.conversion_queue is None:
+            self.conversion_queue = ConversionQueue(
+                on_event=lambda kind, data: self.after(0, self.on_queue_event, kind, data)
+            )
+        options = self.conversion_options()
+        self.queue_frame.grid()
+        self.lbl_queue_summary.config(text="")
+        self.conversion_queue.add_many(paths, options)
+
+    def on_queue_event(self, kind, data):
+        states = self.ui_strings["queue_states"]
+        if kind == events.QUEUED:
+            self.queue_tree.insert("", tk.END, iid=str(data["item"]),
+                                   values=(os.path.basename(data["input"]), states[jobs.QUEUED], ""))
+        elif kind == events.PROGRESS:
+            if "percent" in data and self.queue_tree.exists(str(data["item"])):
+                self.queue_tree.set(str(data["item"]), "status", states[jobs.RUNNING])
+                self.queue_tree.set(str(data["item"]), "progress", f"{data['percent']:.1f}%")
+        elif kind == events.LOG:
+            print(data["line"])
+        elif kind == events.FINISHED:
+            if self.queue_tree.exists(str(data["item"])):
+                self.queue_tree.set(str(data["item"]), "status", states[data["state"]])
+                if data["state"] == jobs.COMPLETED:
+                    self.queue_tree.set(str(data["item"]), "progress", "100%")
+        elif kind == events.SUMMARY:
+            if data["files_per_minute"] is None:
+                return
+            self.lbl_queue_summary.config(text=self.ui_strings["queue_summary"].format(
+                completed=data["completed"], elapsed=format_duration(data["elapsed"]),
+                fpm=data["files_per_minute"], rtf=data["realtime_factor"]
+            ))
+
+    def cancel_queue_selection(self):
+        if self.conversion_queue is None:
+            return
+        for iid in self.queue_tree.selection():
+            self.conversion_queue.cancel(int(iid))
 
     def open_advanced_settings(self):
         adv_win = tk.Toplevel(self)
@@ -2048,14 +2435,14 @@ class YoutubeDownloaderApp(ttk.Window):
         video_params_frame.grid(row=0, column=0, padx=5, pady=5, sticky="nsew")
         lbl_video_encoder = ttk.Label(video_params_frame, text="Encodeur vidéo:" if self.language=="fr" else "Video Encoder:")
         lbl_video_encoder.grid(row=0, column=0, sticky="w", padx=5, pady=2)
-        combo_video_encoder = ttk.Combobox(video_params_frame, textvariable=self.video_encoder_var, state="readonly", values=["libx264", "libx265", "mpeg4", "libvpx-vp9", "libaom-av1"])
+        combo_video_encoder = ttk.Combobox(video_params_frame, textvariable=self.video_encoder_var, state="readonly", values=["auto", "libx264", "libx265", "mpeg4", "libvpx-vp9", "libaom-av1"])
         combo_video_encoder.grid(row=0, column=1, sticky="w", padx=5, pady=2)
         CreateToolTip(combo_video_encoder, "Sélectionner l'encodeur vidéo à utiliser" if self.language=="fr" else "Select the video encoder")
         lbl_video_bitrate = ttk.Label(video_params_frame, text="Bitrate vidéo:" if self.language=="fr" else "Video Bitrate:")
         lbl_video_bitrate.grid(row=1, column=0, sticky="w", padx=5, pady=2)
-        combo_video_bitrate = ttk.Combobox(video_params_frame, textvariable=self.video_bitrate_var, state="readonly", values=["500k", "1000k", "2000k", "3000k"])
+        combo_video_bitrate = ttk.Combobox(video_params_frame, textvariable=self.video_bitrate_var, state="readonly", values=["Auto", "500k", "1000k", "2000k", "3000k"])
         combo_video_bitrate.grid(row=1, column=1, sticky="w", padx=5, pady=2)
-        CreateToolTip(combo_video_bitrate, "Définit le débit binaire vidéo" if self.language=="fr" else "Sets the video bitrate")
+        CreateToolTip(combo_video_bitrate, "Définit le débit binaire vidéo (Auto : qualité constante)" if self.language=="fr" else "Sets the video bitrate (Auto: constant quality)")
         lbl_video_framerate = ttk.Label(video_params_frame, text="Cadence:" if self.language=="fr" else "Frame Rate:")
         lbl_video_framerate.grid(row=2, column=0, sticky="w", padx=5, pady=2)
         combo_video_framerate = ttk.Combobox(video_params_frame, textvariable=self.video_framerate_var, state="readonly", values=["Original", "24", "30", "60"])
@@ -2067,6 +2454,11 @@ class YoutubeDownloaderApp(ttk.Window):
         combo_video_preset = ttk.Combobox(video_params_frame, textvariable=self.video_preset_var, state="readonly", values=["ultrafast", "superfast", "veryfast", "faster", "fast", "medium", "slow", "slower", "veryslow"])
         combo_video_preset.grid(row=3, column=1, sticky="w", padx=5, pady=2)
         CreateToolTip(combo_video_preset, "Sélectionner le préréglage pour l'encodage vidéo" if self.language=="fr" else "Select the preset for video encoding")
+        lbl_time_budget = ttk.Label(video_params_frame, text=self.ui_strings["time_budget"])
+        lbl_time_budget.grid(row=4, column=0, sticky="w", padx=5, pady=2)
+        entry_time_budget = ttk.Entry(video_params_frame, textvariable=self.time_budget_var, width=8)
+        entry_time_budget.grid(row=4, column=1, sticky="w", padx=5, pady=2)
+        CreateToolTip(entry_time_budget, self.ui_strings["time_budget_tooltip"])
         # Paramètres audio
         audio_params_frame = ttk.Labelframe(container, text="Paramètres audio" if self.language=="fr" else "Audio Parameters", padding=10)
         audio_params_frame.grid(row=0, column=1, padx=5, pady=5, sticky="nsew")
@@ -2095,5 +2487,12 @@ class YoutubeDownloaderApp(ttk.Window):
         btn_close.pack(pady=5)
 
 if __name__ == "__main__":
-    app = YoutubeDownloaderApp()
+    app = YoutubeDownloaderApp(initial_urls=sys.argv[1:])
+    if SINGLE_INSTANCE is not None:
+        try:
+            SINGLE_INSTANCE.serve(lambda urls: app.after(0, app.receive_urls, urls))
+        except OSError as e:
+            print("Error starting single-instance listener:", e)
     app.mainloop()
+    if SINGLE_INSTANCE is not None:
+        SINGLE_INSTANCE.close()
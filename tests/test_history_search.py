@@ -0,0 +1,43 @@
+"""
+Index de recherche de l'historique (history.py) : il trouve toujours au
+moins ce que trouvait l'ancienne recherche `query in title.lower()`,
+termes courts et milieux de mots compris.
+"""
+
+import unittest
+
+from vidl_core.history import HistorySearchIndex
+
+TITLES = ["Top 10 4k videos", "Stop motion tutorial", "Live concert", "Kayak trip"]
+
+class HistorySearchIndexTest(unittest.TestCase):
+    def setUp(self):
+        self.index = HistorySearchIndex()
+        for doc_id, title in enumerate(TITLES):
+            self.index.add(doc_id, {"title": title, "url": f"https://example.com/{doc_id}",
+                                    "download_date": f"2025-01-0{doc_id + 1} 12:00:00"})
+
+    def old_search(self, query):
+        return {doc_id for doc_id, title in enumerate(TITLES) if query in title.lower()}
+
+    def test_short_and_mid_word_terms(self):
+        for query in ("k", "4k", "op", "op 1", "o", "p 1", "10", "0 4", "ide", "deos", "top 10 4k"):
+            with self.subTest(query=query):
+                found = set(self.index.search(query))
+                self.assertLessEqual(self.old_search(query), found)
+        self.assertIn(0, self.index.search("k"))
+        self.assertIn(0, self.index.search("op 1"))
+
+    def test_remove_updates_index(self):
+        self.index.remove(0)
+        self.assertEqual(self.index.search("4k"), [])
+        self.assertEqual(set(self.index.search("op")), {1})
+        self.index.add(0, {"title": TITLES[0]})
+        self.assertIn(0, self.index.search("k"))
+
+    def test_no_match(self):
+        self.assertEqual(self.index.search("zz"), [])
+        self.assertEqual(self.index.search("top zebra"), [])
+
+if __name__ == "__main__":
+    unittest.main()
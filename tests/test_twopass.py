@@ -0,0 +1,66 @@
+"""
+Encodage à taille visée (twopass.py) sur des clips de synthèse : la taille
+obtenue reste dans la tolérance, et -crf n'accompagne jamais -b:v.
+Les tests d'encodage sont ignorés si ffmpeg est absent.
+"""
+
+import os
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+
+from vidl_core.bench import make_test_clip
+from vidl_core.conversion import DEFAULT_CONVERSION_OPTIONS, video_encode_args
+from vidl_core.probe import ProbeService
+from vidl_core.twopass import TARGET_SIZE_TOLERANCE_PCT, TwoPassEncodeTask
+
+HAS_FFMPEG = shutil.which("ffmpeg") is not None and shutil.which("ffprobe") is not None
+
+class VideoEncodeArgsTest(unittest.TestCase):
+    def test_crf_and_bitrate_are_exclusive(self):
+        for encoder in ("libx264", "libx265", "mpeg4", "libvpx-vp9", "libaom-av1", "auto"):
+            for bitrate in ("Auto", "", None, "500k", "2000k"):
+                opts = dict(DEFAULT_CONVERSION_OPTIONS, video_encoder=encoder, video_bitrate=bitrate)
+                args = video_encode_args(opts)
+                bv = args[args.index("-b:v") + 1] if "-b:v" in args else None
+                with self.subTest(encoder=encoder, bitrate=bitrate):
+                    # Seul -b:v admis avec -crf : 0 (qualité constante non plafonnée de VP9 / AV1)
+                    self.assertFalse("-crf" in args and bv not in (None, "0"), args)
+                    if bitrate not in ("Auto", "", None):
+                        self.assertNotIn("-crf", args)
+                        self.assertEqual(bv, bitrate)
+
+@unittest.skipUnless(HAS_FFMPEG, "ffmpeg introuvable")
+class TwoPassEncodeTest(unittest.TestCase):
+    def setUp(self):
+        self.work_dir = tempfile.mkdtemp(prefix="vidl-test-")
+        # Cache d'analyse en mémoire : rien n'est écrit dans le dossier de l'application
+        patcher = mock.patch("vidl_core.probe._shared", ProbeService())
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.addCleanup(shutil.rmtree, self.work_dir, ignore_errors=True)
+
+    def encode(self, noise, target_mb):
+        source = os.path.join(self.work_dir, f"source{noise}.mp4")
+        make_test_clip(source, 6, "320x240", noise=noise)
+        output = os.path.join(self.work_dir, f"out{noise}.mp4")
+        options = dict(DEFAULT_CONVERSION_OPTIONS, target_size_mb=target_mb, video_preset="veryfast")
+        finished = []
+        task = TwoPassEncodeTask(source, output, options,
+                                 on_event=lambda kind, data: finished.append(data) if kind == "finished" else None)
+        self.assertEqual(task.run(), 0)
+        self.assertEqual(finished[-1]["size"], os.path.getsize(output))
+        return (os.path.getsize(output) - task.target_size) / task.target_size * 100
+
+    def test_noisy_clip_within_tolerance(self):
+        error_pct = self.encode(noise=25, target_mb=0.5)
+        self.assertLessEqual(abs(error_pct), TARGET_SIZE_TOLERANCE_PCT)
+
+    def test_clean_clip_does_not_overshoot(self):
+        # Mire nette : l'encodeur peut rester sous la cible, jamais la dépasser au-delà de la tolérance
+        error_pct = self.encode(noise=0, target_mb=0.25)
+        self.assertLessEqual(error_pct, TARGET_SIZE_TOLERANCE_PCT)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,27 @@
+"""
+vidl_core – moteur de ViDL sans interface graphique.
+
+Analyse (yt-dlp), téléchargement, conversion (ffmpeg), historique et
+événements. Ne dépend ni de tkinter ni de Pillow ; requests n'est importé
+qu'au premier téléchargement de miniature. L'application Tk
+(gui_downloader.py) n'est qu'un client de ce moteur.
+"""
+
+from .analysis import AnalysisCache, analyze, default_video_format_index, select_format_id
+from .autotune import AutoEncodeTask, EncoderTuner, SpeedStore
+from .batch import ConversionQueue
+from .chunked import ChunkedEncodeTask
+from .conversion import (DEFAULT_CONVERSION_OPTIONS, FFmpegTask, MultiOutputTask, build_conversion_command,
+                         build_multi_output_command, probe_media_file)
+from .download import DownloadTask, build_download_command, unique_output_path
+from .events import EventBus
+from .formats import select_video_formats
+from .history import HistorySearchIndex, HistoryStore
+from .jobs import JobStore
+from .library import MediaLibrary
+from .posters import PosterService
+from .predict import PredictionService
+from .probe import ProbeService
+from .twopass import TwoPassEncodeTask
+from .urls import canonical_url, media_key, parse_media_url
+from .utils import app_support_dir, format_duration, sanitize_filename, validate_url
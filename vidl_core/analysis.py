@@ -0,0 +1,195 @@
+"""
+Analyse d'une vidéo avec yt-dlp : formats disponibles, informations,
+miniature. Aucun appel à l'interface graphique.
+"""
+
+import collections
+import json
+import subprocess
+import sys
+import threading
+
+from .formats import (CODEC_PREFERENCES, audio_format_list, rank_audio_formats, select_video_formats,
+                      slim_formats)
+from .urls import canonical_url, media_key, parse_media_url
+
+ANALYSIS_CACHE_SIZE = 64
+
+def get_info_json(video_url):
+    """
+    Informations complètes de la vidéo (titre, durée, miniature, liste des
+    formats…) en un seul appel « yt-dlp -j ». Retourne un dict ou None.
+    """
+    try:
+        cmd = ["yt-dlp", "-j", "--no-playlist", video_url]
+        stdout = run_info_command_with_age_retry(cmd, video_url)
+        if not stdout:
+            return None
+        return json.loads(stdout.splitlines()[0])
+    except Exception as e:
+        print("Error retrieving video info:", e, file=sys.stderr)
+        return None
+
+# ---------------------------------------------------------
+# Shared helper to retry yt-dlp info commands with cookies
+# ---------------------------------------------------------
+def run_info_command_with_age_retry(cmd, url):
+    """
+    Runs a lightweight yt-dlp info command and retries with Firefox cookies
+    if age restriction is detected.
+    """
+    def needs_age_retry(output_text):
+        if not output_text:
+            return False
+        lower = output_text.lower()
+        return "sign in to confirm your age" in lower or "age-restricted" in lower
+
+    try:
+        result = subprocess.run(cmd, capture_output=True, text=True)
+        if result.returncode == 0:
+            return result.stdout
+        combined = f"{result.stdout}\n{result.stderr}"
+        if needs_age_retry(combined):
+            cmd_with_cookies = cmd.copy()
+            if "--cookies-from-browser" not in cmd_with_cookies:
+                cmd_with_cookies.insert(1, "--cookies-from-browser")
+                cmd_with_cookies.insert(2, "firefox")
+            retry = subprocess.run(cmd_with_cookies, capture_output=True, text=True)
+            if retry.returncode == 0:
+                return retry.stdout
+        return None
+    except Exception as e:
+        print("Error running info command:", e, file=sys.stderr)
+        return None
+
+# ---------------------------------------------------------
+# Complete analysis with cache
+# ---------------------------------------------------------
+def fetch_bytes(url, timeout=5):
+    """
+    Télécharge une ressource (miniature…) et retourne son contenu.
+    requests n'est importé qu'au premier appel.
+    """
+    import requests
+    r = requests.get(url, timeout=timeout)
+    r.raise_for_status()
+    return r.content
+
+def default_video_format_index(video_formats):
+    """
+    Index du format vidéo proposé par défaut : 1080p, sinon 720p, sinon le
+    dernier de la liste (meilleure qualité).
+    """
+    if not video_formats:
+        return -1
+    default_idx = len(video_formats) - 1
+    for i, fmt in enumerate(video_formats):
+        h = min(fmt["height"], fmt["width"])  # Hauteur effective
+        if h == 1080:
+            return i
+        elif h == 720:
+            default_idx = i  # Continue à chercher 1080p
+    return default_idx
+
+def select_format_id(result, export_type, codecs="all"):
+    """
+    Même choix par défaut que l'interface : 1080p, sinon 720p, sinon la
+    meilleure qualité ; meilleur format audio pour "mp3" et "audio".
+    codecs : "all" (le moins volumineux, tous codecs) ou "compat" (H.264 ;
+    AAC pour l'audio natif, lisible partout en .m4a).
+    """
+    if export_type == "mp4":
+        formats = result["video_formats"]
+        if codecs != "all":
+            formats = select_video_formats(result["formats"], result["duration"], codecs)
+        idx = default_video_format_index(formats)
+        return formats[idx]["id"] if idx >= 0 else None
+    if export_type == "audio" and codecs != "all":
+        _, audio_codecs = CODEC_PREFERENCES.get(codecs, (None, None))
+        ranked = rank_audio_formats(result["formats"], result["duration"], audio_codecs)
+        if ranked:
+            return ranked[0]["format_id"]
+    if result["audio_formats"]:
+        return result["audio_formats"][0][0]
+    return None
+
+class AnalysisCache:
+    """
+    Cache des analyses, indexé par media_key : la même vidéo sous une autre
+    forme d'URL (youtu.be, shorts, &t=...) ne relance pas yt-dlp. LRU :
+    les analyses relues restent en cache.
+    """
+    def __init__(self, max_size=ANALYSIS_CACHE_SIZE):
+        self.max_size = max_size
+        self.items = collections.OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, url):
+        key = media_key(url)
+        with self.lock:
+            result = self.items.get(key)
+            if result is not None:
+                self.items.move_to_end(key)
+            return result
+
+    def put(self, url, result):
+        key = media_key(url)
+        with self.lock:
+            self.items[key] = result
+            self.items.move_to_end(key)
+            # Une clé déjà présente est remplacée sans rien évincer
+            while len(self.items) > self.max_size:
+                self.items.popitem(last=False)
+
+def analyze(url, cache=None, with_thumbnail=True):
+    """
+    Analyse complète d'une URL (un seul appel à yt-dlp). Retourne un dict :
+    video_formats, audio_formats, formats (liste brute allégée),
+    thumbnail_url, thumbnail_data (octets), title, channel, upload_date,
+    view_count, like_count, comment_count, duration, video_id.
+    Les analyses réussies sont mises en cache.
+    """
+    if cache is not None:
+        cached = cache.get(url)
+        if cached is not None:
+            if with_thumbnail and cached["thumbnail_url"] and cached["thumbnail_data"] is None:
+                try:
+                    cached["thumbnail_data"] = fetch_bytes(cached["thumbnail_url"])
+                except Exception:
+                    pass
+            return cached
+    source_url = canonical_url(url) if parse_media_url(url) else url
+    data = get_info_json(source_url) or {}
+    formats = slim_formats(data.get("formats"))
+    duration = data.get("duration")
+    v_list = select_video_formats(formats, duration)
+    a_list = audio_format_list(formats, duration)
+    thumb_url = data.get("thumbnail") or None
+    upload_date = data.get("upload_date")
+    if upload_date and len(upload_date) == 8:
+        upload_date = f"{upload_date[:4]}-{upload_date[4:6]}-{upload_date[6:]}"
+    thumb_data = None
+    if thumb_url and with_thumbnail:
+        try:
+            thumb_data = fetch_bytes(thumb_url)
+        except Exception:
+            pass
+    result = {
+        "url": url,
+        "video_formats": v_list,
+        "audio_formats": a_list,
+        "formats": formats,
+        "thumbnail_url": thumb_url,
+        "thumbnail_data": thumb_data,
+        "title": data.get("title"),
+        "channel": data.get("uploader"),
+        "upload_date": upload_date,
+        "view_count": data.get("view_count"),
+        "like_count": data.get("like_count"),
+        "comment_count": data.get("comment_count"),
+        "duration": duration,
+        "video_id": data.get("id"),
+    }
+    if cache is not None and (v_list or a_list):
+        cache.put(url, result)
+    return result
@@ -0,0 +1,364 @@
+"""
+Choix automatique de l'encodeur et du préréglage (video_encoder "auto") :
+les couples candidats sont essayés du plus efficace (fichier le plus petit
+à qualité égale) au plus rapide, et le premier dont l'encodage tient dans
+le budget de temps est retenu. La vitesse de chaque couple est mesurée sur
+un court extrait du fichier puis enregistrée pour cette machine (SQLite) :
+les décisions suivantes se passent d'échantillonnage.
+"""
+
+import datetime
+import os
+import platform
+import sqlite3
+import sys
+import threading
+import time
+
+from . import events
+from .conversion import AUTO_ENCODER, DEFAULT_CONVERSION_OPTIONS, VIDEO_OUTPUT_FORMATS, FFmpegTask, video_encode_args
+from .formats import VIDEO_CODEC_EFFICIENCY
+from .probe import probe, probe_duration, streams_of
+from .utils import app_support_dir
+
+# Encodeurs candidats et famille de codec (voir formats.VIDEO_CODEC_EFFICIENCY)
+CANDIDATE_ENCODERS = {"libaom-av1": "av1", "libx265": "h265", "libx264": "h264"}
+# Encodeurs acceptés par chaque conteneur ; les autres formats : H.264 seulement
+CONTAINER_ENCODERS = {
+    "mp4": ("libaom-av1", "libx265", "libx264"),
+    "mkv": ("libaom-av1", "libx265", "libx264"),
+    "mov": ("libx265", "libx264"),
+}
+# Taille relative à qualité égale, par rapport à "medium" (x264 / x265 ; libaom : voir conversion.AOM_CPU_USED)
+PRESET_SIZE_FACTOR = {"slow": 0.95, "medium": 1.0, "veryfast": 1.2, "ultrafast": 1.6}
+# Du plus lent au plus rapide
+CANDIDATE_PRESETS = ("slow", "medium", "veryfast", "ultrafast")
+# Sans budget : l'encodage ne doit pas dépasser la durée du média (temps réel)
+DEFAULT_BUDGET_FACTOR = 1.0
+# Part du budget visée : un extrait ne reflète pas toujours tout le fichier
+BUDGET_MARGIN = 0.9
+# Extrait mesuré (secondes de média, au milieu du fichier)
+TUNE_SAMPLE_S = 3.0
+# Démarrage d'ffmpeg et de l'encodeur, toléré en plus du temps alloué à l'extrait
+TUNE_STARTUP_S = 1.0
+# En dessous, la mesure est trop courte pour être enregistrée
+MIN_MEASURED_FRAMES = 10
+
+def machine_id():
+    """Identifie la machine : les vitesses mesurées ne valent que pour elle."""
+    return f"{platform.node()}/{platform.machine()}/{os.cpu_count() or 0}"
+
+def size_class(height):
+    """Classe de définition : la vitesse par pixel varie avec la taille de l'image."""
+    for limit in (480, 720, 1080):
+        if height <= limit:
+            return f"{limit}p"
+    return "2160p"
+
+def ranked_candidates(output_format):
+    """[(encodeur, préréglage)] du plus efficace au moins efficace, pour ce conteneur."""
+    encoders = CONTAINER_ENCODERS.get(output_format.lower(), ("libx264",))
+    pairs = [(encoder, preset) for encoder in encoders for preset in CANDIDATE_PRESETS]
+    return sorted(pairs, key=lambda pair: VIDEO_CODEC_EFFICIENCY[CANDIDATE_ENCODERS[pair[0]]] *
+                  PRESET_SIZE_FACTOR[pair[1]])
+
+def output_geometry(info, options):
+    """(largeur, hauteur, images par seconde) de la vidéo produite, ou None."""
+    videos = streams_of(info, "video")
+    if not videos or not videos[0].get("width") or not videos[0].get("height"):
+        return None
+    width, height = int(videos[0]["width"]), int(videos[0]["height"])
+    if options["video_resolution"] != "Original":
+        target = int(options["video_resolution"][:-1])
+        width, height = round(width * target / height / 2) * 2, target
+    fps = None
+    if options["video_framerate"] != "Original":
+        fps = float(options["video_framerate"])
+    else:
+        try:
+            num, den = videos[0].get("avg_frame_rate", "").split("/")
+            fps = float(num) / float(den)
+        except (ValueError, ZeroDivisionError):
+            pass
+    return width, height, fps or 25.0
+
+class SpeedStore:
+    """
+    Vitesses mesurées (pixels encodés par seconde) par machine, encodeur,
+    préréglage, classe de définition et nombre de threads. Une nouvelle
+    mesure est moyennée avec les précédentes.
+    """
+    SCHEMA_VERSION = 1
+    # Poids maximal de l'historique : une machine plus chargée se voit vite
+    MAX_SAMPLES = 4
+
+    def __init__(self, db_path=None):
+        self.lock = threading.Lock()
+        self.machine = machine_id()
+        self.conn = None
+        try:
+            self.conn = sqlite3.connect(db_path or ":memory:", timeout=10, check_same_thread=False)
+            self.conn.execute("PRAGMA journal_mode=WAL")
+            self.conn.execute("PRAGMA synchronous=NORMAL")
+            self._init_schema()
+        except sqlite3.Error as e:
+            print("Error opening encoder speeds:", e, file=sys.stderr)
+            self.conn = None
+
+    def _init_schema(self):
+        with self.lock, self.conn:
+            version = self.conn.execute("PRAGMA user_version").fetchone()[0]
+            if version >= self.SCHEMA_VERSION:
+                return
+            self.conn.execute(
+                "CREATE TABLE IF NOT EXISTS speeds ("
+                " machine TEXT, encoder TEXT, preset TEXT, size_class TEXT, threads INTEGER,"
+                " pixels_per_second REAL, samples INTEGER, measured TEXT,"
+                " PRIMARY KEY (machine, encoder, preset, size_class, threads))"
+            )
+            self.conn.execute(f"PRAGMA user_version = {self.SCHEMA_VERSION}")
+
+    def get(self, encoder, preset, size, threads=None):
+        if self.conn is None:
+            return None
+        try:
+            with self.lock:
+                row = self.conn.execute(
+                    "SELECT pixels_per_second FROM speeds"
+                    " WHERE machine = ? AND encoder = ? AND preset = ? AND size_class = ? AND threads = ?",
+                    (self.machine, encoder, preset, size, threads or 0)
+                ).fetchone()
+        except sqlite3.Error as e:
+            print("Error reading encoder speeds:", e, file=sys.stderr)
+            return None
+        return row[0] if row else None
+
+    def record(self, encoder, preset, size, threads, pixels_per_second):
+        if self.conn is None:
+            return
+        key = (self.machine, encoder, preset, size, threads or 0)
+        try:
+            with self.lock, self.conn:
+                row = self.conn.execute(
+                    "SELECT pixels_per_second, samples FROM speeds"
+                    " WHERE machine = ? AND encoder = ? AND preset = ? AND size_class = ? AND threads = ?", key
+                ).fetchone()
+                samples = 1
+                if row:
+                    weight = min(row[1], self.MAX_SAMPLES)
+                    pixels_per_second = (row[0] * weight + pixels_per_second) / (weight + 1)
+                    samples = row[1] + 1
+                self.conn.execute(
+                    "INSERT OR REPLACE INTO speeds (machine, encoder, preset, size_class, threads,"
+                    " pixels_per_second, samples, measured) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                    key + (pixels_per_second, samples, datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S"))
+                )
+        except sqlite3.Error as e:
+            print("Error writing encoder speeds:", e, file=sys.stderr)
+
+    def close(self):
+        if self.conn is not None:
+            with self.lock:
+                self.conn.close()
+                self.conn = None
+
+_shared = None
+_shared_lock = threading.Lock()
+
+def shared_speed_store():
+    global _shared
+    with _shared_lock:
+        if _shared is None:
+            _shared = SpeedStore(os.path.join(app_support_dir(), "encoder_speeds.db"))
+        return _shared
+
+class EncoderTuner:
+    """
+    choose(path, options, budget_s) : {"encoder", "preset", "seconds"
+    (temps d'encodage prévu), "fits" (tient dans le budget), "sampled"
+    (couples mesurés pour cette décision)}, ou None si le fichier n'a ni
+    durée ni vidéo. cancel() interrompt la mesure en cours.
+    """
+    def __init__(self, store=None, on_event=None):
+        self.store = store or shared_speed_store()
+        self.on_event = on_event or events.ignore_event
+        self.lock = threading.Lock()
+        self.task = None
+        self.cancelled = False
+
+    def choose(self, input_path, options, budget_s=None):
+        opts = dict(DEFAULT_CONVERSION_OPTIONS, **options)
+        info = probe(input_path)
+        duration = probe_duration(info)
+        geometry = output_geometry(info, opts)
+        if not duration or geometry is None:
+            return None
+        width, height, fps = geometry
+        size = size_class(height)
+        threads = opts.get("threads")
+        budget = budget_s or duration * DEFAULT_BUDGET_FACTOR
+        # Deux passes (taille visée) : au plus deux fois le temps d'une passe
+        passes = 2 if opts.get("target_size_mb") else 1
+        total_pixels = duration * fps * width * height * passes
+        start = max(0.0, duration / 2 - TUNE_SAMPLE_S / 2)
+        span = min(TUNE_SAMPLE_S, duration)
+        # Au-delà, l'extrait encodé montre déjà que le couple ne tient pas dans le budget
+        time_limit = span * budget / (duration * passes) + TUNE_STARTUP_S
+
+        seconds_by_pair, sampled = {}, [0]
+
+        def seconds_for(encoder, preset):
+            if (encoder, preset) not in seconds_by_pair:
+                speed = self.store.get(encoder, preset, size, threads)
+                if speed is None:
+                    speed, frames = self.measure(input_path, dict(opts, video_encoder=encoder, video_preset=preset),
+                                                 start, span, time_limit, width * height)
+                    if self.cancelled:
+                        return float("inf")
+                    sampled[0] += 1
+                    if frames >= MIN_MEASURED_FRAMES:
+                        self.store.record(encoder, preset, size, threads, speed)
+                    self.on_event(events.LOG, {"line": f"Auto encoder: {encoder}/{preset} "
+                                                       f"{speed / 1e6:.2f} Mpx/s ({frames} frames)"})
+                seconds_by_pair[(encoder, preset)] = total_pixels / speed if speed else float("inf")
+            return seconds_by_pair[(encoder, preset)]
+
+        hopeless = set()
+        for encoder, preset in ranked_candidates(opts["format"]):
+            if self.cancelled:
+                return None
+            if encoder in hopeless:
+                continue
+            # Le préréglage le plus rapide d'abord : s'il est trop lent, tout l'encodeur l'est
+            if seconds_for(encoder, CANDIDATE_PRESETS[-1]) > budget * BUDGET_MARGIN:
+                hopeless.add(encoder)
+                continue
+            seconds = seconds_for(encoder, preset)
+            if seconds <= budget * BUDGET_MARGIN:
+                return {"encoder": encoder, "preset": preset, "seconds": seconds, "fits": True,
+                        "sampled": sampled[0]}
+        if not seconds_by_pair or self.cancelled:
+            return None
+        # Rien ne tient dans le budget : le couple le plus rapide
+        (encoder, preset), seconds = min(seconds_by_pair.items(), key=lambda item: item[1])
+        return {"encoder": encoder, "preset": preset, "seconds": seconds, "fits": False, "sampled": sampled[0]}
+
+    def measure(self, input_path, options, start, span, time_limit, pixels_per_frame):
+        """
+        Encode la vidéo de l'extrait (sortie jetée) et retourne (pixels par
+        seconde, images encodées). Arrêté au bout de time_limit : la vitesse
+        est alors celle des images déjà encodées. Le démarrage d'ffmpeg est
+        compté : la vitesse est un peu sous-estimée, jamais surestimée.
+        """
+        cmd = ["ffmpeg", "-y", "-ss", f"{start:.3f}", "-t", f"{span:.3f}", "-i", input_path,
+               "-map", "0:v:0", "-an", "-sn", "-dn"] + video_encode_args(options)
+        if options.get("threads"):
+            cmd += ["-threads", str(options["threads"])]
+        cmd += ["-f", "null", os.devnull]
+        frames = [0]
+
+        def on_event(kind, data):
+            if kind == events.PROGRESS and data.get("frame"):
+                frames[0] = data["frame"]
+
+        task = FFmpegTask(cmd, duration=span, on_event=on_event)
+        task.output_paths = []
+        with self.lock:
+            if self.cancelled:
+                return 0.0, 0
+            self.task = task
+        timer = threading.Timer(time_limit, self.stop_task, args=(task,))
+        started = time.monotonic()
+        timer.start()
+        try:
+            retcode = task.run()
+        finally:
+            timer.cancel()
+            with self.lock:
+                self.task = None
+        elapsed = time.monotonic() - started
+        if self.cancelled or (retcode != 0 and not task.cancelled):
+            return 0.0, 0
+        return frames[0] * pixels_per_frame / max(elapsed, 1e-3), frames[0]
+
+    @staticmethod
+    def stop_task(task):
+        task.cancel()
+        process = task.process
+        if process is not None and process.poll() is None:
+            # Sortie jetée : inutile d'attendre la fin de l'image en cours (libaom : plusieurs secondes)
+            process.kill()
+
+    def cancel(self):
+        with self.lock:
+            self.cancelled = True
+            task = self.task
+        if task is not None:
+            self.stop_task(task)
+
+def resolve_auto_options(input_path, options, tuner=None):
+    """
+    Options avec l'encodeur et le préréglage choisis si video_encoder vaut
+    "auto" (budget : options["time_budget_s"]), et le choix (ou None).
+    Choix impossible : encodeur par défaut (libx264) et préréglage demandé.
+    """
+    opts = dict(DEFAULT_CONVERSION_OPTIONS, **options)
+    if opts["video_encoder"] != AUTO_ENCODER or opts["format"].lower() not in VIDEO_OUTPUT_FORMATS:
+        return opts, None
+    choice = (tuner or EncoderTuner()).choose(input_path, opts, opts.get("time_budget_s"))
+    if choice is None:
+        return dict(opts, video_encoder="libx264"), None
+    return dict(opts, video_encoder=choice["encoder"], video_preset=choice["preset"]), choice
+
+class AutoEncodeTask:
+    """
+    Même interface que FFmpegTask (run, cancel, returncode ; événements
+    PROGRESS, LOG et FINISHED). Choisit d'abord l'encodeur (événement
+    TUNED), puis délègue la conversion à la tâche que retourne
+    task_factory(entrée, sortie, options, duration=..., on_event=...).
+    FINISHED porte en plus "encoder" et "preset".
+    """
+    def __init__(self, input_path, output_path, options, task_factory, duration=None, on_event=None):
+        self.input_path = input_path
+        self.output_path = output_path
+        self.options = options
+        self.task_factory = task_factory
+        self.duration = duration
+        self.on_event = on_event or events.ignore_event
+        self.tuner = EncoderTuner(on_event=self.on_event)
+        self.task = None
+        self.choice = None
+        self.cancelled = False
+        self.returncode = None
+
+    def run(self):
+        """Choisit l'encodeur puis convertit (bloquant) ; retourne le code de retour."""
+        try:
+            opts, self.choice = resolve_auto_options(self.input_path, self.options, self.tuner)
+        except Exception as e:
+            self.on_event(events.LOG, {"line": f"Error choosing encoder: {e}"})
+            opts, self.choice = dict(self.options, video_encoder="libx264"), None
+        if self.cancelled:
+            self.returncode = -1
+            self.on_event(events.FINISHED, {"returncode": -1, "cancelled": True, "path": self.output_path})
+            return self.returncode
+        if self.choice is not None:
+            self.on_event(events.TUNED, dict(self.choice))
+
+        def on_event(kind, data):
+            if kind == events.FINISHED:
+                data = dict(data, encoder=opts["video_encoder"], preset=opts["video_preset"])
+            self.on_event(kind, data)
+
+        self.task = self.task_factory(self.input_path, self.output_path, opts, duration=self.duration,
+                                      on_event=on_event)
+        if self.cancelled:
+            self.task.cancel()
+        self.returncode = self.task.run()
+        return self.returncode
+
+    def cancel(self):
+        self.cancelled = True
+        self.tuner.cancel()
+        if self.task is not None:
+            self.task.cancel()
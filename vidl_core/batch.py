@@ -0,0 +1,200 @@
+"""
+File de conversion de plusieurs fichiers : un pool de workers ffmpeg, les
+cœurs répartis entre les conversions simultanées (-threads), progression
+et annulation par fichier, bilan de débit quand la file se vide.
+"""
+
+import collections
+import os
+import threading
+import time
+
+from . import events
+from .conversion import DEFAULT_CONVERSION_OPTIONS, get_file_duration, unique_converted_path
+from .jobs import CANCELLED, COMPLETED, FAILED, QUEUED, RUNNING
+from .tasks import conversion_task
+
+# Au-delà, x264/x265 gagnent peu par thread supplémentaire : mieux vaut un fichier de plus
+THREADS_PER_CONVERSION = 4
+
+def default_conversion_workers(cpu=None):
+    cpu = cpu or os.cpu_count() or 2
+    return max(1, cpu // THREADS_PER_CONVERSION)
+
+def split_threads(active, cpu=None):
+    """Threads ffmpeg par conversion quand `active` conversions tournent en même temps."""
+    cpu = cpu or os.cpu_count() or 2
+    return max(1, cpu // max(1, active))
+
+def throughput(completed, media_seconds, elapsed):
+    """Fichiers par minute et facteur temps réel (secondes de média par seconde écoulée)."""
+    if elapsed <= 0:
+        return None, None
+    return completed * 60 / elapsed, media_seconds / elapsed
+
+class ConversionQueue:
+    """
+    Conversions en file, au plus `workers` à la fois. Les événements sont
+    envoyés à on_event(kind, data) depuis les threads de la file, avec
+    data["item"] = identifiant du fichier : QUEUED, PROGRESS, LOG, FINISHED
+    (avec "state"), puis SUMMARY quand la file est vide.
+    """
+    def __init__(self, workers=None, on_event=None):
+        self.workers = workers or default_conversion_workers()
+        self.on_event = on_event or events.ignore_event
+        self.lock = threading.Lock()
+        self.items = {}
+        self.pending = collections.deque()
+        self.tasks = {}
+        self.reserved_paths = set()
+        self.next_id = 1
+        self.threads = 0
+        self.running = 0
+        self.batch = None
+
+    def add(self, input_path, options, output_path=None):
+        """Ajoute un fichier à la file et retourne son élément (dict)."""
+        return self._enqueue([(input_path, output_path)], options)[0]
+
+    def add_many(self, input_paths, options):
+        """Ajoute une sélection de fichiers d'un coup et retourne leurs éléments."""
+        return self._enqueue([(path, None) for path in input_paths], options)
+
+    def _enqueue(self, entries, options):
+        opts = dict(DEFAULT_CONVERSION_OPTIONS, **options)
+        items = []
+        with self.lock:
+            for input_path, output_path in entries:
+                item = {
+                    "id": self.next_id,
+                    "input": input_path,
+                    "output": output_path or unique_converted_path(input_path, opts["format"],
+                                                                   reserved=self.reserved_paths),
+                    "options": dict(opts),
+                    "state": QUEUED,
+                    "percent": 0.0,
+                    "duration": None,
+                    "elapsed": None,
+                    "cancelled": False,
+                }
+                self.next_id += 1
+                self.items[item["id"]] = item
+                self.pending.append(item["id"])
+                items.append(item)
+            if self.batch is None:
+                self.batch = {"started": time.monotonic(), "completed": 0, "failed": 0, "cancelled": 0,
+                              "media_seconds": 0.0}
+            new_threads = min(self.workers - self.threads, len(self.pending))
+            self.threads += max(0, new_threads)
+        for item in items:
+            self.on_event(events.QUEUED, {"item": item["id"], "input": item["input"], "output": item["output"]})
+        for _ in range(new_threads):
+            threading.Thread(target=self._worker, daemon=True).start()
+        return items
+
+    def cancel(self, item_id):
+        """Annule un fichier en attente (retiré de la file) ou en cours."""
+        with self.lock:
+            item = self.items.get(item_id)
+            if item is None:
+                return
+            if item["state"] == QUEUED:
+                self.pending.remove(item_id)
+                item["state"] = CANCELLED
+                self.batch["cancelled"] += 1
+                self.reserved_paths.discard(item["output"])
+                task = None
+            elif item["state"] == RUNNING:
+                # Sans tâche encore (analyse en cours) : _convert l'annulera dès sa création
+                item["cancelled"] = True
+                task = self.tasks.get(item_id)
+            else:
+                return
+        if task is not None:
+            task.cancel()
+        elif item["state"] == CANCELLED:
+            self.on_event(events.FINISHED, {"item": item_id, "state": CANCELLED, "returncode": None,
+                                            "cancelled": True, "path": item["output"]})
+
+    def cancel_all(self):
+        with self.lock:
+            ids = [item_id for item_id, item in self.items.items()
+                   if item["state"] in (QUEUED, RUNNING) and not item["cancelled"]]
+        for item_id in ids:
+            self.cancel(item_id)
+
+    def _worker(self):
+        while True:
+            with self.lock:
+                if not self.pending:
+                    self.threads -= 1
+                    summary = self._close_batch() if self.threads == 0 else None
+                    break
+                item = self.items[self.pending.popleft()]
+                item["state"] = RUNNING
+                self.running += 1
+                # Part fixe des cœurs par worker : un fichier lancé seul ne prend pas toute
+                # la machine avant que les suivants n'arrivent
+                threads = split_threads(self.workers)
+            self._convert(item, threads)
+        if summary is not None:
+            self.on_event(events.SUMMARY, summary)
+
+    def _convert(self, item, threads):
+        item_id = item["id"]
+        duration = get_file_duration(item["input"])
+        item["duration"] = duration
+
+        def on_event(kind, data):
+            if kind == events.PROGRESS:
+                if "percent" in data:
+                    item["percent"] = data["percent"]
+                self.on_event(kind, dict(data, item=item_id))
+            elif kind == events.LOG:
+                self.on_event(kind, dict(data, item=item_id))
+
+        task = conversion_task(item["input"], item["output"], dict(item["options"], threads=threads),
+                               duration=duration, on_event=on_event)
+        with self.lock:
+            self.tasks[item_id] = task
+            cancelled = item["cancelled"]
+        if cancelled:
+            task.cancel()
+        started = time.monotonic()
+        retcode = task.run()
+        with self.lock:
+            self.tasks.pop(item_id, None)
+            self.running -= 1
+            self.reserved_paths.discard(item["output"])
+            item["elapsed"] = time.monotonic() - started
+            if task.cancelled:
+                item["state"] = CANCELLED
+                self.batch["cancelled"] += 1
+            elif retcode == 0:
+                item["state"] = COMPLETED
+                item["percent"] = 100.0
+                self.batch["completed"] += 1
+                self.batch["media_seconds"] += duration or 0.0
+            else:
+                item["state"] = FAILED
+                self.batch["failed"] += 1
+        self.on_event(events.FINISHED, {"item": item_id, "state": item["state"], "returncode": retcode,
+                                        "cancelled": task.cancelled, "path": item["output"],
+                                        "elapsed": item["elapsed"]})
+
+    def _close_batch(self):
+        """Bilan du lot terminé (appelé sous self.lock)."""
+        batch, self.batch = self.batch, None
+        if batch is None:
+            return None
+        elapsed = time.monotonic() - batch["started"]
+        files_per_minute, realtime_factor = throughput(batch["completed"], batch["media_seconds"], elapsed)
+        return {
+            "completed": batch["completed"],
+            "failed": batch["failed"],
+            "cancelled": batch["cancelled"],
+            "elapsed": elapsed,
+            "media_seconds": batch["media_seconds"],
+            "files_per_minute": files_per_minute,
+            "realtime_factor": realtime_factor,
+        }
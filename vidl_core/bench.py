@@ -0,0 +1,154 @@
+"""
+Mesures de performance sur un clip de synthèse (lavfi), sans fichier ni
+réseau :
+
+    vidl bench chunked [--duration 120] [--size 1920x1080] [--encoder libx264] [--preset slow]
+    vidl bench target-size [--duration 30] [--targets 2,5] [--encoder libx264] [--tolerance 10]
+
+Chaque résultat est une ligne JSON sur la sortie standard.
+"""
+
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+from .chunked import ChunkedEncodeTask, default_chunk_workers, probe_layout
+from .cli import JsonLinesWriter
+from .conversion import DEFAULT_CONVERSION_OPTIONS, FFmpegTask
+from .twopass import TARGET_SIZE_TOLERANCE_PCT, TwoPassEncodeTask
+
+def make_test_clip(path, duration, size="1920x1080", rate=30, gop_s=2, noise=0):
+    """
+    Clip H.264 + AAC : mire animée (testsrc2) et sinusoïde, une image clé
+    toutes les gop_s secondes (comme les vidéos téléchargées). noise > 0 :
+    grain temporel, difficile à compresser (comme une vidéo filmée).
+    """
+    video = f"testsrc2=size={size}:rate={rate}:duration={duration}"
+    if noise:
+        video += f",noise=alls={noise}:allf=t"
+    cmd = [
+        "ffmpeg", "-y", "-v", "error",
+        "-f", "lavfi", "-i", video,
+        "-f", "lavfi", "-i", f"sine=frequency=440:sample_rate=48000:duration={duration}",
+        "-c:v", "libx264", "-preset", "ultrafast", "-g", str(rate * gop_s), "-pix_fmt", "yuv420p",
+        "-c:a", "aac", "-shortest", path
+    ]
+    subprocess.run(cmd, check=True)
+
+def timed(task):
+    start = time.perf_counter()
+    retcode = task.run()
+    return retcode, time.perf_counter() - start
+
+def bench_chunked(args, writer):
+    """Encodage en un seul processus puis par segments, même source et mêmes réglages."""
+    video_args = ["-c:v", args.encoder, "-preset", args.preset, "-crf", str(args.crf)]
+    if args.encoder == "libaom-av1":
+        video_args = ["-c:v", args.encoder, "-cpu-used", "6", "-crf", str(args.crf), "-b:v", "0"]
+    audio_args = ["-c:a", "aac", "-b:a", "128k"]
+    with tempfile.TemporaryDirectory(prefix="vidl-bench-") as work_dir:
+        source = os.path.join(work_dir, "source.mp4")
+        make_test_clip(source, args.duration, args.size)
+        writer.write("clip", path=source, duration=args.duration, size=args.size)
+
+        single_out = os.path.join(work_dir, "single.mp4")
+        single = FFmpegTask(["ffmpeg", "-y", "-i", source] + video_args + audio_args + [single_out],
+                            duration=args.duration)
+        retcode, single_s = timed(single)
+        if retcode != 0:
+            writer.write("error", mode="single", returncode=retcode)
+            return 1
+        writer.write("result", mode="single", seconds=round(single_s, 2), processes=1)
+
+        chunked_out = os.path.join(work_dir, "chunked.mp4")
+        chunked = ChunkedEncodeTask(source, chunked_out, video_args, audio_args, duration=args.duration,
+                                    workers=args.workers)
+        retcode, chunked_s = timed(chunked)
+        if retcode != 0:
+            writer.write("error", mode="chunked", returncode=retcode)
+            return 1
+        writer.write("result", mode="chunked", seconds=round(chunked_s, 2), processes=chunked.workers,
+                     segments=chunked.segments)
+
+        # Même durée à une image près : aucun segment perdu ni dupliqué
+        single_layout, chunked_layout = probe_layout(single_out), probe_layout(chunked_out)
+        drift = abs(single_layout[1] - chunked_layout[1]) if single_layout and chunked_layout else None
+        writer.write("summary", speedup=round(single_s / chunked_s, 2) if chunked_s else None,
+                     duration_drift=round(drift, 3) if drift is not None else None,
+                     single_bytes=os.path.getsize(single_out), chunked_bytes=os.path.getsize(chunked_out))
+    return 0
+
+def bench_target_size(args, writer):
+    """
+    Contrôle de précision du mode taille visée : chaque clip de synthèse
+    (mire nette, mire bruitée) est encodé en deux passes pour chaque taille ;
+    la taille obtenue doit rester à ±tolerance % de la taille visée.
+    Code de retour 1 si un cas sort de la tolérance.
+    """
+    failures = 0
+    with tempfile.TemporaryDirectory(prefix="vidl-bench-") as work_dir:
+        for clip, noise in (("clean", 0), ("noisy", 25)):
+            source = os.path.join(work_dir, f"{clip}.mp4")
+            make_test_clip(source, args.duration, args.size, noise=noise)
+            writer.write("clip", name=clip, duration=args.duration, size=args.size)
+            for target_mb in args.targets:
+                output = os.path.join(work_dir, f"{clip}_{target_mb:g}.mp4")
+                options = {"target_size_mb": target_mb, "video_encoder": args.encoder, "video_preset": args.preset}
+                task = TwoPassEncodeTask(source, output, dict(DEFAULT_CONVERSION_OPTIONS, **options))
+                retcode, seconds = timed(task)
+                if retcode != 0:
+                    writer.write("error", clip=clip, target_mb=target_mb, returncode=retcode)
+                    failures += 1
+                    continue
+                target, achieved = task.target_size, os.path.getsize(output)
+                error_pct = (achieved - target) / target * 100
+                ok = abs(error_pct) <= args.tolerance
+                failures += not ok
+                writer.write("result", clip=clip, target_bytes=target, achieved_bytes=achieved,
+                             error_pct=round(error_pct, 2), video_kbps=round(task.video_kbps),
+                             seconds=round(seconds, 2), ok=ok)
+    writer.write("summary", failures=failures)
+    return 1 if failures else 0
+
+def parse_targets(text):
+    return [float(part) for part in text.split(",") if part.strip()]
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="vidl bench", description="ViDL – mesures de performance")
+    sub = parser.add_subparsers(dest="bench", required=True)
+    chunked = sub.add_parser("chunked", help="encodage en un processus contre encodage par segments")
+    chunked.add_argument("--duration", type=int, default=120, help="durée du clip de synthèse en secondes (défaut : 120)")
+    chunked.add_argument("--size", default="1920x1080", help="définition du clip (défaut : 1920x1080)")
+    chunked.add_argument("--encoder", default="libx264", help="encodeur vidéo (libx264, libx265, libaom-av1…)")
+    chunked.add_argument("--preset", default="slow", help="préréglage x264/x265 (défaut : slow)")
+    chunked.add_argument("--crf", type=int, default=23, help="qualité constante (défaut : 23)")
+    chunked.add_argument("-j", "--workers", type=int, default=default_chunk_workers(),
+                         help=f"processus ffmpeg simultanés (défaut : {default_chunk_workers()})")
+    target = sub.add_parser("target-size", help="précision de l'encodage en deux passes à taille visée")
+    target.add_argument("--duration", type=int, default=30, help="durée des clips de synthèse en secondes (défaut : 30)")
+    target.add_argument("--size", default="1280x720", help="définition des clips (défaut : 1280x720)")
+    target.add_argument("--targets", type=parse_targets, default=[2.0, 5.0],
+                        help="tailles visées en Mo, séparées par des virgules (défaut : 2,5)")
+    target.add_argument("--encoder", default="libx264", help="encodeur vidéo (libx264, libx265, libvpx-vp9…)")
+    target.add_argument("--preset", default="veryfast", help="préréglage x264/x265 (défaut : veryfast)")
+    target.add_argument("--tolerance", type=float, default=TARGET_SIZE_TOLERANCE_PCT,
+                        help=f"écart admis en %% (défaut : {TARGET_SIZE_TOLERANCE_PCT:g})")
+    return parser
+
+def main(argv=None):
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    writer = JsonLinesWriter(sys.stdout)
+    if args.bench == "chunked":
+        if args.workers < 1:
+            parser.error("--workers must be >= 1")
+        return bench_chunked(args, writer)
+    if args.bench == "target-size":
+        return bench_target_size(args, writer)
+    return 2
+
+if __name__ == "__main__":
+    sys.exit(main())
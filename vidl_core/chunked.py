@@ -0,0 +1,229 @@
+"""
+Encodage parallèle par segments : la vidéo est découpée aux images clés,
+chaque segment est encodé par son propre processus ffmpeg (un pool à la
+taille des cœurs), puis les segments sont recollés sans réencodage
+(démultiplexeur concat). L'audio, peu coûteux, est encodé d'un seul bloc
+en parallèle des segments.
+"""
+
+import concurrent.futures
+import os
+import shutil
+import subprocess
+import tempfile
+import threading
+
+from . import events
+from .conversion import FFmpegTask
+from .probe import probe, probe_duration, streams_of
+
+# En dessous, le démarrage d'ffmpeg et l'assemblage coûtent plus qu'ils ne rapportent
+MIN_SEGMENT_S = 10
+# Plusieurs segments par worker : la charge reste équilibrée si un passage est plus lourd
+SEGMENTS_PER_WORKER = 2
+# Threads ffmpeg par segment (les encodeurs passent mal à l'échelle au-delà)
+THREADS_PER_SEGMENT = 2
+# Part de la progression réservée à l'encodage (le reste : assemblage)
+ENCODE_SHARE = 97.0
+# Poids de l'encodage audio dans la progression, relatif à la vidéo
+AUDIO_WEIGHT = 0.05
+# Marge retirée à la fin d'un segment : l'image clé de coupe n'est encodée qu'une fois
+CUT_EPSILON_S = 0.001
+
+def default_chunk_workers():
+    return max(1, (os.cpu_count() or 2) // THREADS_PER_SEGMENT)
+
+def probe_layout(path):
+    """(start_time, durée, présence d'audio) du fichier, ou None si ffprobe échoue."""
+    info = probe(path)
+    duration = probe_duration(info)
+    if duration is None:
+        return None
+    return float(info["format"].get("start_time") or 0), duration, bool(streams_of(info, "audio"))
+
+def keyframe_times(path, start_time=0.0):
+    """
+    Instants (secondes depuis le début du fichier) des images clés du premier
+    flux vidéo, lus dans les paquets : aucun décodage.
+    """
+    cmd = [
+        "ffprobe", "-v", "error", "-select_streams", "v:0",
+        "-show_entries", "packet=pts_time,flags",
+        "-of", "csv=p=0", path
+    ]
+    result = subprocess.run(cmd, capture_output=True, text=True, check=True)
+    times = []
+    for line in result.stdout.splitlines():
+        pts, _, flags = line.partition(",")
+        if "K" in flags and pts not in ("", "N/A"):
+            times.append(float(pts) - start_time)
+    return sorted(times)
+
+def split_segments(keyframes, duration, segments, min_length=MIN_SEGMENT_S):
+    """
+    [(début, durée)] : `segments` parties à peu près égales, coupées sur
+    l'image clé la plus proche, aucune plus courte que min_length.
+    """
+    segments = max(1, min(segments, int(duration // min_length)))
+    cuts = [0.0]
+    for i in range(1, segments):
+        target = duration * i / segments
+        candidates = [t for t in keyframes if t - cuts[-1] >= min_length and duration - t >= min_length]
+        if candidates:
+            cuts.append(min(candidates, key=lambda t: abs(t - target)))
+    cuts.append(duration)
+    return [(start, end - start) for start, end in zip(cuts, cuts[1:])]
+
+def _concat_line(path):
+    return "file '" + path.replace("'", "'\\''") + "'\n"
+
+class ChunkedEncodeTask:
+    """
+    Même interface que FFmpegTask (run, cancel, returncode ; événements
+    PROGRESS, LOG et FINISHED). La progression est la moyenne des segments
+    pondérée par leur durée. video_args / audio_args : arguments
+    d'encodage (audio_args None : audio copié). threads : cœurs à répartir
+    entre les segments (défaut : tous). Une source trop courte, sans
+    images clés exploitables ou illisible par ffprobe est encodée par un
+    seul ffmpeg.
+    """
+    def __init__(self, input_path, output_path, video_args, audio_args=None, output_args=(), duration=None,
+                 workers=None, threads=None, on_event=None):
+        self.input_path = input_path
+        self.output_path = output_path
+        self.video_args = list(video_args)
+        self.audio_args = list(audio_args) if audio_args is not None else None
+        self.output_args = list(output_args)
+        self.duration = duration
+        self.threads = threads or os.cpu_count() or 2
+        self.workers = workers or max(1, self.threads // THREADS_PER_SEGMENT)
+        self.on_event = on_event or events.ignore_event
+        self.lock = threading.Lock()
+        self.tasks = []
+        self.segments = 0
+        self.failed = False
+        self.cancelled = False
+        self.returncode = None
+
+    def single_command(self):
+        return ["ffmpeg", "-y", "-i", self.input_path, "-map", "0:v:0", "-map", "0:a:0?"] + self.video_args + \
+            (self.audio_args if self.audio_args is not None else ["-c:a", "copy"]) + self.output_args + \
+            [self.output_path]
+
+    def run(self):
+        """Encode (bloquant) et retourne le code de retour."""
+        try:
+            retcode = self._run()
+        except Exception as e:
+            self.on_event(events.LOG, {"line": f"Error in chunked encode: {e}"})
+            retcode = -1
+        if self.cancelled:
+            retcode = retcode or -1
+            if os.path.exists(self.output_path):
+                os.remove(self.output_path)
+        self.returncode = retcode
+        self.on_event(events.FINISHED, {
+            "returncode": retcode,
+            "cancelled": self.cancelled,
+            "path": self.output_path
+        })
+        return retcode
+
+    def _run(self):
+        layout = probe_layout(self.input_path)
+        segments = []
+        if layout is not None:
+            start_time, duration, has_audio = layout
+            self.duration = self.duration or duration
+            try:
+                segments = split_segments(keyframe_times(self.input_path, start_time), duration,
+                                          self.workers * SEGMENTS_PER_WORKER)
+            except (subprocess.CalledProcessError, ValueError) as e:
+                self.on_event(events.LOG, {"line": f"Error reading keyframes: {e}"})
+        self.segments = len(segments) or 1
+        if len(segments) < 2:
+            return self._run_jobs([(self.single_command(), self.duration, 1.0)], 100.0, workers=1)
+
+        work_dir = tempfile.mkdtemp(prefix=".vidl-chunks-", dir=os.path.dirname(os.path.abspath(self.output_path)))
+        try:
+            threads = str(max(1, self.threads // self.workers))
+            jobs, parts = [], []
+            for i, (start, length) in enumerate(segments):
+                part = os.path.join(work_dir, f"part{i:04d}.mkv")
+                if i < len(segments) - 1:
+                    length -= CUT_EPSILON_S
+                cmd = ["ffmpeg", "-y", "-ss", f"{start:.6f}", "-i", self.input_path, "-t", f"{length:.6f}",
+                       "-map", "0:v:0", "-an", "-sn", "-dn"] + self.video_args + ["-threads", threads, part]
+                jobs.append((cmd, length, length))
+                parts.append(part)
+            audio_source = self.input_path if has_audio else None
+            if has_audio and self.audio_args is not None:
+                audio_source = os.path.join(work_dir, "audio.mkv")
+                cmd = ["ffmpeg", "-y", "-i", self.input_path, "-map", "0:a:0", "-vn"] + self.audio_args + \
+                    [audio_source]
+                # En tête de file : l'audio est prêt bien avant le dernier segment
+                jobs.insert(0, (cmd, duration, duration * AUDIO_WEIGHT))
+            retcode = self._run_jobs(jobs, ENCODE_SHARE)
+            if retcode != 0 or self.cancelled:
+                return retcode
+
+            # Assemblage sans réencodage
+            list_path = os.path.join(work_dir, "parts.txt")
+            with open(list_path, "w", encoding="utf-8") as f:
+                f.writelines(_concat_line(part) for part in parts)
+            cmd = ["ffmpeg", "-y", "-f", "concat", "-safe", "0", "-i", list_path]
+            if audio_source:
+                cmd += ["-i", audio_source, "-map", "0:v:0", "-map", "1:a:0"]
+            else:
+                cmd += ["-map", "0:v:0"]
+            cmd += ["-c", "copy"] + self.output_args + [self.output_path]
+            return self._run_jobs([(cmd, duration, 1.0)], 100.0 - ENCODE_SHARE, offset=ENCODE_SHARE, workers=1)
+        finally:
+            shutil.rmtree(work_dir, ignore_errors=True)
+
+    def _run_jobs(self, jobs, share, offset=0.0, workers=None):
+        """
+        Exécute les commandes [(cmd, durée, poids)] sur le pool ; la
+        progression pondérée est ramenée à [offset, offset + share].
+        Retourne le premier code d'erreur, ou 0.
+        """
+        progress = [0.0] * len(jobs)
+        total = sum(weight for _, _, weight in jobs) or 1.0
+
+        def run_job(i):
+            cmd, duration, weight = jobs[i]
+            def on_event(kind, data):
+                if kind == events.PROGRESS and "percent" in data:
+                    with self.lock:
+                        progress[i] = data["percent"] * weight
+                        percent = offset + sum(progress) / total * share / 100
+                    self.on_event(events.PROGRESS, {"percent": percent})
+                elif kind == events.LOG:
+                    self.on_event(kind, data)
+            task = FFmpegTask(cmd, duration=duration, output_path=cmd[-1], on_event=on_event)
+            with self.lock:
+                if self.cancelled or self.failed:
+                    return -1
+                self.tasks.append(task)
+            retcode = task.run()
+            with self.lock:
+                self.tasks.remove(task)
+            if retcode != 0 and not self.cancelled:
+                # Un segment en échec : inutile de poursuivre les autres
+                self.failed = True
+                self.cancel_tasks()
+            return retcode
+
+        with concurrent.futures.ThreadPoolExecutor(max_workers=workers or self.workers) as pool:
+            codes = list(pool.map(run_job, range(len(jobs))))
+        return next((code for code in codes if code != 0), 0)
+
+    def cancel_tasks(self):
+        with self.lock:
+            tasks = list(self.tasks)
+        for task in tasks:
+            task.cancel()
+
+    def cancel(self):
+        self.cancelled = True
+        self.cancel_tasks()
@@ -0,0 +1,334 @@
+"""
+Interface en ligne de commande de ViDL (sans écran).
+
+    vidl URL [URL ...]
+    vidl -a urls.txt -j 4 -x mp3
+    vidl -x audio URL                (piste audio d'origine, sans réencodage)
+    vidl --clip 1:30-2:00 URL        (extrait seulement)
+    cat urls.txt | vidl -o ~/Videos
+    vidl serve --port 8765           (démon, voir daemon.py)
+    vidl bench chunked               (mesures de performance, voir bench.py)
+
+Les URL sont lues au fil de l'eau (arguments, fichier ou entrée standard)
+et téléchargées en parallèle (-j). La progression est écrite sur la sortie
+standard, un objet JSON par ligne.
+"""
+
+import argparse
+import datetime
+import json
+import os
+import sys
+import threading
+import concurrent.futures
+
+from . import events
+from .analysis import AnalysisCache, analyze, select_format_id
+from .conversion import TranscodePool
+from .download import (DiskSpaceGuard, DownloadTask, build_download_command, clip_bounds, clip_label,
+                       clip_length, required_space, unique_output_path, with_clip)
+from .formats import audio_extension, format_size
+from .history import HistoryStore
+from .library import MediaLibrary
+from .urls import canonical_url, media_key, parse_media_url
+from .utils import app_support_dir, validate_url
+
+HISTORY_FLUSH_SIZE = 50
+
+class JsonLinesWriter:
+    """Écrit un objet JSON par ligne sur un flux, depuis plusieurs threads."""
+    def __init__(self, stream):
+        self.stream = stream
+        self.lock = threading.Lock()
+
+    def write(self, event, **data):
+        line = json.dumps(dict(event=event, **data), ensure_ascii=False)
+        with self.lock:
+            self.stream.write(line + "\n")
+            self.stream.flush()
+
+def iter_urls(args, stdin=sys.stdin):
+    """
+    URL à traiter, lues paresseusement : arguments, puis fichier (-a, "-"
+    pour l'entrée standard), puis l'entrée standard si elle n'est pas un
+    terminal et qu'aucune autre source n'est donnée. Lignes vides et
+    commentaires (#) ignorés.
+    """
+    for url in args.urls:
+        yield url.strip()
+    sources = []
+    if args.batch_file == "-" or (not args.urls and not args.batch_file and not stdin.isatty()):
+        sources.append(stdin)
+    elif args.batch_file:
+        sources.append(open(args.batch_file, "r", encoding="utf-8"))
+    for source in sources:
+        try:
+            for line in source:
+                line = line.strip()
+                if line and not line.startswith("#"):
+                    yield line
+        finally:
+            if source is not stdin:
+                source.close()
+
+class BatchDownloader:
+    """
+    Télécharge un flux d'URL avec au plus `jobs` téléchargements simultanés.
+    Le nombre de tâches en attente est borné : une liste de 100 000 URL n'est
+    jamais chargée en mémoire. Les transcodages MP3 tournent dans un pool à
+    part (--transcode-jobs) et ne retiennent pas les téléchargements.
+    """
+    def __init__(self, args, writer):
+        self.args = args
+        self.writer = writer
+        self.cache = AnalysisCache()
+        self.seen = set()
+        self.slots = threading.BoundedSemaphore(args.jobs * 2)
+        self.lock = threading.Lock()
+        self.failed = 0
+        self.succeeded = 0
+        self.history = None if args.no_history else HistoryStore(
+            os.path.join(app_support_dir(), "history.db"),
+            legacy_json_path=os.path.join(app_support_dir(), "history.json")
+        )
+        self.pending_history = []
+        self.reserved_paths = set()
+        self.library = None if args.no_library else MediaLibrary(args.library)
+        self.disk_space = DiskSpaceGuard()
+        self.transcoder = TranscodePool(args.transcode_jobs)
+
+    def run(self, urls):
+        with concurrent.futures.ThreadPoolExecutor(max_workers=self.args.jobs) as pool:
+            for url in urls:
+                if not validate_url(url):
+                    self.writer.write("error", url=url, error="invalid_url")
+                    self.count(False)
+                    continue
+                key = media_key(url)
+                if key in self.seen:
+                    self.writer.write("skipped", url=url, reason="duplicate", key=key)
+                    continue
+                self.seen.add(key)
+                self.slots.acquire()
+                self.writer.write("queued", url=url, key=key)
+                future = pool.submit(self.process, url)
+                future.add_done_callback(lambda f: self.slots.release())
+        self.transcoder.shutdown(wait=True)
+        self.flush_history()
+        self.writer.write("summary", succeeded=self.succeeded, failed=self.failed)
+        return 0 if self.failed == 0 else 1
+
+    def process(self, url):
+        try:
+            ok = self._process(url)
+        except Exception as e:
+            self.writer.write("error", url=url, error=str(e))
+            ok = False
+        if isinstance(ok, concurrent.futures.Future):
+            # Transcodage MP3 en cours : compté quand il se termine
+            ok.add_done_callback(lambda f: self.count(f.exception() is None and f.result() == 0))
+        else:
+            self.count(ok)
+
+    def count(self, ok):
+        with self.lock:
+            if ok:
+                self.succeeded += 1
+            else:
+                self.failed += 1
+
+    def _process(self, url):
+        args = self.args
+        self.writer.write("analyzing", url=url)
+        result = analyze(url, cache=self.cache, with_thumbnail=False)
+        format_id = select_format_id(result, args.export_type, args.codecs)
+        if not format_id:
+            self.writer.write("error", url=url, error="no_format_found")
+            return False
+        title = result.get("title") or ""
+        library_format = format_id
+        clip = None
+        if args.clip:
+            try:
+                clip = clip_bounds(*args.clip.split("-", 1), duration=result.get("duration"))
+            except ValueError as e:
+                self.writer.write("error", url=url, error="invalid_clip", detail=str(e))
+                return False
+            title = f"{title or 'video'} {clip_label(clip)}"
+            library_format = f"{format_id}*{clip_label(clip)}{'!' if args.precise_cuts else ''}"
+        existing = self.library.find(url, library_format, args.export_type, args.lang) if self.library else None
+        if existing:
+            # Déjà dans la bibliothèque : lien dur au lieu d'un nouveau téléchargement
+            ext = os.path.splitext(existing)[1].lstrip(".") or args.export_type
+            with self.lock:
+                path = self.library.place(existing, args.output_dir, title, ext, reserved=self.reserved_paths)
+            self.writer.write("done", url=url, path=path, reused=existing)
+            self.add_result_history(url, result, path)
+            return True
+        # Refusé avant le moindre octet si le volume ne peut pas contenir le fichier
+        size, _ = format_size(result["formats"], format_id, result.get("duration"))
+        needed = 0
+        if size:
+            duration = result.get("duration")
+            fraction = clip_length(clip, duration) / duration if clip and duration else 1.0
+            needed = required_space(size, format_id, args.export_type, fraction)
+            admitted, free = self.disk_space.admit(args.output_dir, needed)
+            if not admitted:
+                self.writer.write("error", url=url, error="insufficient_disk_space", needed=needed, free=free)
+                return False
+        outcome = False
+        try:
+            outcome = self._download(url, result, format_id, library_format, title, clip)
+            return outcome
+        finally:
+            if needed:
+                # La piste native occupe le disque jusqu'à la fin du transcodage
+                if isinstance(outcome, concurrent.futures.Future):
+                    outcome.add_done_callback(lambda f: self.disk_space.release(args.output_dir, needed))
+                else:
+                    self.disk_space.release(args.output_dir, needed)
+
+    def _download(self, url, result, format_id, library_format, title, clip):
+        """
+        Télécharge ; True/False, ou pour un MP3 le future du transcodage (la
+        piste native est téléchargée telle quelle puis transcodée à part).
+        """
+        args = self.args
+        source_url = canonical_url(url) if parse_media_url(url) else url
+        download_type = "audio" if args.export_type == "mp3" else args.export_type
+        ext = audio_extension(result["formats"], format_id) if download_type == "audio" else args.export_type
+        with self.lock:
+            output_path = unique_output_path(args.output_dir, title, ext, reserved=self.reserved_paths)
+            mp3_path = unique_output_path(args.output_dir, title, "mp3", reserved=self.reserved_paths) \
+                if args.export_type == "mp3" else None
+        cmd = build_download_command(source_url, download_type, format_id, output_path, args.lang)
+        if clip:
+            cmd = with_clip(cmd, clip, force_keyframes=args.precise_cuts)
+        self.writer.write("started", url=url, title=result.get("title"), format=format_id,
+                          output=mp3_path or output_path)
+
+        last_percent = [-1]
+        def on_event(kind, data):
+            if kind == events.PROGRESS:
+                percent = int(data["percent"])
+                if percent != last_percent[0]:
+                    last_percent[0] = percent
+                    self.writer.write("progress", url=url, percent=data["percent"])
+            elif kind == events.AGE_RESTRICTED:
+                self.writer.write("age_restricted", url=url)
+            elif kind == events.LOG and args.verbose:
+                print(data["line"], file=sys.stderr)
+
+        task = DownloadTask(cmd, on_event=on_event)
+        retcode = task.run()
+        if retcode != 0:
+            self.writer.write("error", url=url, error="download_failed", returncode=retcode)
+            return False
+        path = task.output_path if task.output_path and os.path.exists(task.output_path) else output_path
+        if mp3_path:
+            return self._transcode(url, result, library_format, path, mp3_path)
+        self._finish(url, result, library_format, path)
+        return True
+
+    def _transcode(self, url, result, library_format, source, mp3_path):
+        """Planifie le transcodage MP3 et retourne son future (code de retour de ffmpeg)."""
+        self.writer.write("transcoding", url=url, source=source, output=mp3_path)
+        def on_event(kind, data):
+            if kind == events.LOG and self.args.verbose:
+                print(data["line"], file=sys.stderr)
+
+        def on_done(future):
+            if future.exception() is not None or future.result() != 0:
+                returncode = None if future.exception() is not None else future.result()
+                self.writer.write("error", url=url, error="transcode_failed", returncode=returncode)
+                return
+            self._finish(url, result, library_format, mp3_path)
+
+        _, future = self.transcoder.submit(source, mp3_path, on_event=on_event)
+        future.add_done_callback(on_done)
+        return future
+
+    def _finish(self, url, result, library_format, path):
+        self.writer.write("done", url=url, path=path)
+        if self.library is not None:
+            self.library.record(url, library_format, self.args.export_type, path, self.args.lang)
+        self.add_result_history(url, result, path)
+
+    def add_result_history(self, url, result, path):
+        if self.history is not None and result.get("title"):
+            self.add_history({
+                "title": result["title"],
+                "url": url,
+                "thumbnail_url": result.get("thumbnail_url"),
+                "channel": result.get("channel"),
+                "video_id": result.get("video_id"),
+                "export_type": self.args.export_type,
+                "file_path": path,
+                "download_date": datetime.datetime.now().strftime("%Y-%m-%d %H:%M"),
+            })
+
+    def add_history(self, entry):
+        with self.lock:
+            self.pending_history.append(entry)
+            if len(self.pending_history) < HISTORY_FLUSH_SIZE:
+                return
+        self.flush_history()
+
+    def flush_history(self):
+        """Enregistre les entrées en attente en une seule transaction."""
+        with self.lock:
+            entries, self.pending_history = self.pending_history, []
+        if entries and self.history is not None:
+            self.history.add_many(entries)
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="vidl", description="ViDL – téléchargeur sans interface graphique")
+    parser.add_argument("urls", nargs="*", help="URL des vidéos")
+    parser.add_argument("-a", "--batch-file", help="fichier d'URL, une par ligne (\"-\" pour l'entrée standard)")
+    parser.add_argument("-o", "--output-dir", default=os.path.join(os.path.expanduser("~"), "Downloads"),
+                        help="dossier de téléchargement (défaut : ~/Downloads)")
+    parser.add_argument("-x", "--export-type", choices=["mp4", "mp3", "audio"], default="mp4",
+                        help="export vidéo MP4, audio MP3 ou audio d'origine sans réencodage "
+                             "(m4a/opus ; m4a avec --codecs compat), défaut : mp4")
+    parser.add_argument("-j", "--jobs", type=int, default=1, help="téléchargements simultanés (défaut : 1)")
+    parser.add_argument("--transcode-jobs", type=int, default=None,
+                        help="transcodages MP3 simultanés, en parallèle des téléchargements "
+                             "(défaut : la moitié des cœurs)")
+    parser.add_argument("--lang", default="Auto", help="langue audio préférée (en, fr…), défaut : Auto")
+    parser.add_argument("--codecs", choices=["all", "compat"], default="all",
+                        help="all : le format le plus léger à qualité égale, VP9/AV1 compris (défaut) ; "
+                             "compat : H.264/AAC uniquement")
+    parser.add_argument("--clip", metavar="DÉBUT-FIN",
+                        help="ne télécharge que cet extrait, ex. 1:30-2:00 ou 90- (jusqu'à la fin)")
+    parser.add_argument("--precise-cuts", action="store_true",
+                        help="coupe exacte de l'extrait (réencodage aux points de coupe)")
+    parser.add_argument("--no-history", action="store_true", help="ne pas enregistrer dans l'historique")
+    parser.add_argument("--library", default=os.path.join(app_support_dir(), "library.db"),
+                        help="index des fichiers déjà téléchargés (peut être partagé, ex. sur un volume commun)")
+    parser.add_argument("--no-library", action="store_true", help="toujours télécharger, sans consulter la bibliothèque")
+    parser.add_argument("-v", "--verbose", action="store_true", help="affiche la sortie de yt-dlp sur stderr")
+    return parser
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    if argv and argv[0] == "serve":
+        from .daemon import main as serve_main
+        return serve_main(argv[1:])
+    if argv and argv[0] == "bench":
+        from .bench import main as bench_main
+        return bench_main(argv[1:])
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    if args.jobs < 1:
+        parser.error("--jobs must be >= 1")
+    if args.transcode_jobs is not None and args.transcode_jobs < 1:
+        parser.error("--transcode-jobs must be >= 1")
+    os.makedirs(args.output_dir, exist_ok=True)
+    writer = JsonLinesWriter(sys.stdout)
+    try:
+        return BatchDownloader(args, writer).run(iter_urls(args))
+    except KeyboardInterrupt:
+        return 130
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,494 @@
+"""
+Conversion de fichiers locaux avec ffmpeg / ffprobe : analyse du fichier,
+construction des commandes et exécution avec progression.
+"""
+
+import collections
+import concurrent.futures
+import os
+import subprocess
+import sys
+import threading
+
+from . import events
+from .probe import probe, probe_duration, streams_of
+
+VIDEO_OUTPUT_FORMATS = ["mp4", "mkv", "avi", "mov", "flv", "wmv"]
+AUDIO_OUTPUT_FORMATS = ["mp3", "ogg", "wav"]
+QUALITY_CRF = {"Low": "28", "Standard": "23", "High": "18", "Very High": "15"}
+AUDIO_CODEC_BY_FORMAT = {
+    "mp3": "libmp3lame",
+    "ogg": "libvorbis",
+    "wav": "pcm_s16le"
+}
+
+# Qualité VBR de l'export MP3 (valeur par défaut de yt-dlp, ~130 kbit/s)
+MP3_QUALITY = "5"
+
+# Options de conversion par défaut (mêmes valeurs que l'interface)
+DEFAULT_CONVERSION_OPTIONS = {
+    "format": "mp4",
+    "quality": "Standard",
+    "video_encoder": "libx264",
+    "video_resolution": "Original",
+    "video_bitrate": "Auto",   # "Auto" : qualité constante (CRF), sinon débit moyen ("1000k")
+    "video_framerate": "Original",
+    "video_preset": "medium",
+    "audio_encoder": "aac",
+    "audio_sample_rate": "44100",
+    "audio_channels": "Stereo",
+    "audio_bitrate": "128k",
+    "optimize": False,
+    "chunked": False,
+    "threads": None,      # threads ffmpeg (None : automatique)
+    "target_size_mb": None,  # taille visée : encodage en deux passes (voir twopass.py)
+    "time_budget_s": None,   # budget de l'encodeur "auto" (None : durée du média, voir autotune.py)
+}
+
+# Encodeur et préréglage choisis à la conversion selon le budget de temps (voir autotune.py)
+AUTO_ENCODER = "auto"
+
+# Encodeurs dont le mode qualité constante exige -b:v 0 (sinon débit plafonné)
+CRF_ZERO_BITRATE_ENCODERS = {"libvpx-vp9", "libaom-av1"}
+# libaom n'a pas de -preset : équivalent -cpu-used (0 : le plus lent, 8 : le plus rapide)
+AOM_CPU_USED = {"ultrafast": "8", "superfast": "8", "veryfast": "7", "faster": "6", "fast": "5",
+                "medium": "4", "slow": "3", "slower": "2", "veryslow": "1"}
+
+def probe_media_file(file_path):
+    """Informations techniques affichées pour un fichier (analyse ffprobe en cache)."""
+    info = probe(file_path)
+    if not info:
+        return {}
+    fmt = info.get("format", {})
+    videos, audios = streams_of(info, "video"), streams_of(info, "audio")
+    video_info = videos[0] if videos else {}
+    audio_info = audios[0] if audios else {}
+    video_frame_rate = "N/A"
+    if video_info.get("avg_frame_rate"):
+        try:
+            num, den = video_info["avg_frame_rate"].split('/')
+            video_frame_rate = round(float(num)/float(den), 2)
+        except Exception:
+            video_frame_rate = "N/A"
+    return {
+        "file_name": os.path.basename(file_path),
+        "duration": probe_duration(info) or 0.0,
+        "format_name": fmt.get("format_name", "N/A"),
+        "format_bit_rate": fmt.get("bit_rate", "N/A"),
+        "video_codec": video_info.get("codec_name", "N/A"),
+        "video_resolution": f"{video_info.get('width')}x{video_info.get('height')}",
+        "video_bit_rate": video_info.get("bit_rate", "N/A"),
+        "video_frame_rate": video_frame_rate,
+        "audio_codec": audio_info.get("codec_name", "N/A"),
+        "audio_sample_rate": audio_info.get("sample_rate", "N/A"),
+        "audio_channels": audio_info.get("channels", "N/A"),
+        "audio_bit_rate": audio_info.get("bit_rate", "N/A")
+    }
+
+def get_file_duration(file_path):
+    return probe_duration(probe(file_path))
+
+# Image d'aperçu : instant et largeur (les miniatures affichées font 240 px)
+POSTER_TIME_S = 1.0
+POSTER_WIDTH = 480
+
+def extract_frame_jpeg(file_path, at=None, width=POSTER_WIDTH):
+    """
+    Image de la vidéo à `at` secondes (défaut : 1 s, ou le milieu d'un
+    fichier plus court), réduite à `width` pixels, en octets JPEG. Recherche
+    côté entrée (-ss avant -i) : seule l'image clé précédente est décodée ;
+    l'image sort par un tube (image2pipe), aucun fichier n'est écrit.
+    """
+    if at is None:
+        duration = get_file_duration(file_path)
+        at = min(POSTER_TIME_S, duration / 2) if duration else 0.0
+    cmd = [
+        "ffmpeg", "-v", "error", "-ss", f"{at:.3f}", "-i", file_path,
+        "-map", "0:v:0", "-frames:v", "1", "-vf", f"scale='min({width},iw)':-2",
+        "-f", "image2pipe", "-c:v", "mjpeg", "-q:v", "3", "pipe:1"
+    ]
+    try:
+        result = subprocess.run(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, check=True)
+        return result.stdout or None
+    except Exception as e:
+        print("Error extracting thumbnail:", e, file=sys.stderr)
+        return None
+
+def unique_converted_path(input_path, output_format, reserved=None):
+    """`reserved` : chemins déjà attribués à des conversions en attente ; le chemin retourné y est ajouté."""
+    base, ext = os.path.splitext(input_path)
+    output_file = f"{base}_converted.{output_format}"
+    i = 1
+    while os.path.exists(output_file) or (reserved is not None and output_file in reserved):
+        output_file = f"{base}_converted({i}).{output_format}"
+        i += 1
+    if reserved is not None:
+        reserved.add(output_file)
+    return output_file
+
+def video_scale_filter(options):
+    """Filtre de mise à l'échelle ("scale=-2:720"), ou None en définition d'origine."""
+    if options["video_resolution"] == "Original":
+        return None
+    return f"scale=-2:{options['video_resolution'][:-1]}"
+
+def video_encode_args(options, scale=True):
+    """
+    Arguments ffmpeg du flux vidéo pour une sortie vidéo (options complètes).
+    scale=False : sans -vf, la mise à l'échelle est faite dans -filter_complex.
+    """
+    encoder = options["video_encoder"]
+    if encoder == AUTO_ENCODER:
+        # "auto" n'est résolu que par tasks.conversion_task ; ailleurs, encodeur par défaut
+        encoder = "libx264"
+    args = ["-c:v", encoder]
+    if scale and video_scale_filter(options):
+        args.extend(["-vf", video_scale_filter(options)])
+    # -crf et -b:v s'excluent : qualité constante, ou débit moyen si un débit est choisi
+    if options["video_bitrate"] in (None, "", "Auto"):
+        args.extend(["-crf", QUALITY_CRF.get(options["quality"], "23")])
+        if encoder in CRF_ZERO_BITRATE_ENCODERS:
+            args.extend(["-b:v", "0"])
+    else:
+        args.extend(["-b:v", options["video_bitrate"]])
+    if encoder == "libaom-av1":
+        args.extend(["-cpu-used", AOM_CPU_USED.get(options["video_preset"], "4"), "-row-mt", "1"])
+    else:
+        args.extend(["-preset", options["video_preset"]])
+    if options["video_framerate"] != "Original":
+        args.extend(["-r", options["video_framerate"]])
+    return args
+
+def audio_encode_args(options):
+    """Arguments ffmpeg du flux audio pour une sortie vidéo (options complètes)."""
+    args = ["-c:a", options["audio_encoder"]]
+    if options["audio_channels"] == "Mono":
+        args.extend(["-ac", "1"])
+    elif options["audio_channels"] == "Stereo":
+        args.extend(["-ac", "2"])
+    args.extend(["-b:a", options["audio_bitrate"]])
+    if options["audio_sample_rate"] != "44100":
+        args.extend(["-ar", options["audio_sample_rate"]])
+    return args
+
+def audio_output_args(options):
+    """Arguments ffmpeg d'une sortie audio seule (mp3, ogg, wav)."""
+    output_format = options["format"].lower()
+    # Sélection automatique du codec audio compatible avec le format de sortie
+    args = ["-vn", "-c:a", AUDIO_CODEC_BY_FORMAT.get(output_format, options["audio_encoder"])]
+    if options["audio_channels"] == "Mono":
+        args.extend(["-ac", "1"])
+    elif options["audio_channels"] == "Stereo":
+        args.extend(["-ac", "2"])
+    if output_format != "wav":
+        args.extend(["-b:a", options["audio_bitrate"]])
+    if options["audio_sample_rate"] != "44100":
+        args.extend(["-ar", options["audio_sample_rate"]])
+    return args
+
+def container_args(options):
+    if options["optimize"] and options["format"].lower() == "mp4":
+        return ["-movflags", "faststart"]
+    return []
+
+def conversion_output_args(options):
+    """
+    Arguments ffmpeg d'une sortie (encodage, conteneur, threads) selon les
+    options, entre les entrées et le chemin de sortie.
+    """
+    opts = dict(DEFAULT_CONVERSION_OPTIONS, **options)
+    output_format = opts["format"].lower()
+    args = []
+    if output_format in VIDEO_OUTPUT_FORMATS:
+        args.extend(video_encode_args(opts))
+        args.extend(audio_encode_args(opts))
+        args.extend(container_args(opts))
+    elif output_format in AUDIO_OUTPUT_FORMATS:
+        args.extend(audio_output_args(opts))
+    if opts.get("threads"):
+        args.extend(["-threads", str(opts["threads"])])
+    return args
+
+def build_conversion_command(input_path, output_path, options):
+    """
+    Commande ffmpeg pour convertir input_path vers output_path selon les
+    options (voir DEFAULT_CONVERSION_OPTIONS). -n : un fichier existant
+    n'est jamais écrasé (ffmpeg échoue au lieu de poser la question).
+    """
+    return ["ffmpeg", "-n", "-i", input_path] + conversion_output_args(options) + [output_path]
+
+def build_multi_output_command(input_path, outputs):
+    """
+    Une seule commande ffmpeg pour plusieurs sorties [(chemin, options)] :
+    la source n'est décodée qu'une fois. La vidéo est dupliquée par un
+    filtre split (une branche par sortie vidéo, avec sa propre mise à
+    l'échelle) ; la piste audio décodée alimente tous les encodeurs audio.
+    """
+    outputs = [(path, dict(DEFAULT_CONVERSION_OPTIONS, **options)) for path, options in outputs]
+    video_outputs = [opts for _, opts in outputs if opts["format"].lower() in VIDEO_OUTPUT_FORMATS]
+    cmd = ["ffmpeg", "-y", "-i", input_path]
+    if video_outputs:
+        labels = [f"[s{i}]" for i in range(len(video_outputs))]
+        graph = [f"[0:v:0]split={len(labels)}" + "".join(labels)]
+        for i, opts in enumerate(video_outputs):
+            graph.append(f"[s{i}]{video_scale_filter(opts) or 'null'}[v{i}]")
+        cmd.extend(["-filter_complex", ";".join(graph)])
+    branch = 0
+    for path, opts in outputs:
+        output_format = opts["format"].lower()
+        if output_format in VIDEO_OUTPUT_FORMATS:
+            cmd.extend(["-map", f"[v{branch}]", "-map", "0:a:0?"])
+            cmd.extend(video_encode_args(opts, scale=False))
+            cmd.extend(audio_encode_args(opts))
+            cmd.extend(container_args(opts))
+            branch += 1
+        elif output_format in AUDIO_OUTPUT_FORMATS:
+            cmd.extend(["-map", "0:a:0"])
+            cmd.extend(audio_output_args(opts))
+        if opts.get("threads"):
+            cmd.extend(["-threads", str(opts["threads"])])
+        cmd.append(path)
+    return cmd
+
+# Flux importables tels quels dans Final Cut Pro depuis un MP4
+FINAL_CUT_VIDEO_CODECS = {"h264"}
+FINAL_CUT_PIXEL_FORMATS = {"yuv420p", "yuvj420p"}
+FINAL_CUT_AUDIO_CODECS = {"aac", "alac", "mp3"}
+REENCODE_VIDEO_ARGS = ["-c:v", "libx264", "-preset", "slow", "-crf", "18", "-pix_fmt", "yuv420p"]
+REENCODE_AUDIO_ARGS = ["-c:a", "aac", "-b:a", "192k"]
+
+def plan_reencode(file_path):
+    """
+    Décide, d'après ffprobe, quels flux doivent être réencodés pour Final Cut
+    Pro : {"video": "copy"|"encode"|None, "audio": "copy"|"encode"|None}
+    (None : pas de flux). En cas d'échec de l'analyse, tout est réencodé.
+    """
+    plan = {"video": "encode", "audio": "encode"}
+    info = probe(file_path)
+    if not info:
+        return plan
+    videos, audios = streams_of(info, "video"), streams_of(info, "audio")
+    if not videos:
+        plan["video"] = None
+    elif videos[0].get("codec_name") in FINAL_CUT_VIDEO_CODECS and \
+            videos[0].get("pix_fmt") in FINAL_CUT_PIXEL_FORMATS:
+        plan["video"] = "copy"
+    if not audios:
+        plan["audio"] = None
+    elif audios[0].get("codec_name") in FINAL_CUT_AUDIO_CODECS:
+        plan["audio"] = "copy"
+    return plan
+
+def build_reencode_command(input_path, output_path, plan=None):
+    """
+    MP4 optimisé pour l'import dans Final Cut Pro (H.264 8 bits, AAC,
+    faststart). Sans `plan` (voir plan_reencode), la vidéo est entièrement
+    réencodée ; sinon seuls les flux incompatibles le sont, les autres sont
+    copiés (un simple remux prend quelques secondes).
+    """
+    plan = plan or {"video": "encode", "audio": "copy"}
+    cmd = ["ffmpeg", "-y", "-i", input_path, "-map", "0:v:0?", "-map", "0:a:0?"]
+    if plan["video"] == "copy":
+        cmd.extend(["-c:v", "copy"])
+    elif plan["video"] == "encode":
+        cmd.extend(REENCODE_VIDEO_ARGS)
+    if plan["audio"] == "copy":
+        cmd.extend(["-c:a", "copy"])
+    elif plan["audio"] == "encode":
+        cmd.extend(REENCODE_AUDIO_ARGS)
+    cmd.extend(["-movflags", "+faststart", output_path])
+    return cmd
+
+def build_mp3_command(input_path, output_path, quality=MP3_QUALITY):
+    """Transcodage MP3 de la première piste audio (sans vidéo ni pochette)."""
+    return [
+        "ffmpeg", "-y", "-i", input_path,
+        "-map", "0:a:0", "-vn",
+        "-c:a", "libmp3lame", "-q:a", quality,
+        output_path
+    ]
+
+def default_transcode_workers():
+    """LAME n'utilise qu'un cœur : la moitié des cœurs, le reste aux téléchargements."""
+    return max(1, (os.cpu_count() or 2) // 2)
+
+def _progress_number(value, suffix="", cast=float):
+    """Valeur numérique d'un champ -progress ("1.5x", "812.3kbits/s", "N/A"…), ou None."""
+    value = (value or "").strip()
+    if suffix and value.endswith(suffix):
+        value = value[:-len(suffix)]
+    try:
+        return cast(value)
+    except ValueError:
+        return None
+
+def parse_progress(fields):
+    """
+    Bloc key=value de `ffmpeg -progress` -> progression typée :
+    out_time (s), frame, fps, speed (×), bitrate (kbit/s), total_size
+    (octets) et done (dernier bloc). Les valeurs inconnues (N/A) sont None.
+    """
+    out_time_us = _progress_number(fields.get("out_time_us"), cast=int)
+    return {
+        "out_time": out_time_us / 1e6 if out_time_us is not None and out_time_us >= 0 else None,
+        "frame": _progress_number(fields.get("frame"), cast=int),
+        "fps": _progress_number(fields.get("fps")),
+        "speed": _progress_number(fields.get("speed"), "x"),
+        "bitrate": _progress_number(fields.get("bitrate"), "kbits/s"),
+        "total_size": _progress_number(fields.get("total_size"), cast=int),
+        "done": fields.get("progress") == "end",
+    }
+
+class FFmpegTask:
+    """
+    Exécute une commande ffmpeg en suivant sa progression : ffmpeg écrit son
+    flux key=value (-progress) sur stdout, un bloc par demi-seconde, et
+    chaque bloc donne un événement PROGRESS (voir parse_progress, plus
+    percent et size_mb). stderr (-nostats) ne sert qu'aux messages d'erreur,
+    relayés en LOG si ffmpeg échoue. En cas d'annulation le fichier de
+    sortie partiel est supprimé.
+    """
+    STDERR_TAIL = 20
+
+    def __init__(self, cmd, duration=None, output_path=None, on_event=None):
+        self.cmd = cmd
+        self.duration = duration
+        self.output_path = output_path or cmd[-1]
+        self.output_paths = [self.output_path]
+        self.on_event = on_event or events.ignore_event
+        self.process = None
+        self.cancelled = False
+        self.returncode = None
+
+    def progress_command(self):
+        # Options globales, juste après l'exécutable
+        return [self.cmd[0], "-hide_banner", "-progress", "pipe:1", "-nostats"] + list(self.cmd[1:])
+
+    def _progress_data(self, fields):
+        data = parse_progress(fields)
+        if data["out_time"] is not None and self.duration:
+            data["percent"] = min(data["out_time"] / self.duration * 100, 100)
+        if data["total_size"] is not None:
+            data["size_mb"] = data["total_size"] / (1024*1024)
+        return data
+
+    def run(self):
+        """Exécute ffmpeg (bloquant) et retourne le code de retour."""
+        stderr_tail = collections.deque(maxlen=self.STDERR_TAIL)
+        try:
+            self.process = subprocess.Popen(
+                self.progress_command(),
+                # Jamais de question sur l'entrée du processus parent (démon, CLI)
+                stdin=subprocess.DEVNULL,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.PIPE,
+                universal_newlines=True
+            )
+            # stderr lu à part : un tube plein bloquerait ffmpeg
+            stderr_reader = threading.Thread(target=lambda: stderr_tail.extend(self.process.stderr), daemon=True)
+            stderr_reader.start()
+            fields = {}
+            for line in self.process.stdout:
+                key, _, value = line.strip().partition("=")
+                fields[key] = value
+                if key != "progress":
+                    continue
+                self.on_event(events.PROGRESS, self._progress_data(fields))
+                fields = {}
+                if self.cancelled:
+                    self.process.terminate()
+                    break
+            self.process.wait()
+            stderr_reader.join(timeout=5)
+            retcode = self.process.returncode
+        except Exception as e:
+            self.on_event(events.LOG, {"line": f"Error running ffmpeg: {e}"})
+            retcode = -1
+        if retcode != 0 and not self.cancelled:
+            for line in stderr_tail:
+                self.on_event(events.LOG, {"line": line.rstrip()})
+        if self.cancelled:
+            for path in self.output_paths:
+                if path and os.path.exists(path):
+                    os.remove(path)
+        self.returncode = retcode
+        self.process = None
+        self.on_event(events.FINISHED, self._finished_data(retcode))
+        return retcode
+
+    def _finished_data(self, retcode):
+        return {
+            "returncode": retcode,
+            "cancelled": self.cancelled,
+            "path": self.output_path
+        }
+
+    def cancel(self):
+        self.cancelled = True
+        process = self.process
+        if process and process.poll() is None:
+            process.terminate()
+
+class MultiOutputTask(FFmpegTask):
+    """
+    Plusieurs sorties en une passe (voir build_multi_output_command).
+    PROGRESS porte en plus "outputs" : [{"path", "percent", "size_mb"}] par
+    sortie ; FINISHED porte "paths". Annulée, toutes les sorties partielles
+    sont supprimées.
+    """
+    def __init__(self, input_path, outputs, duration=None, on_event=None):
+        outputs = list(outputs)
+        super().__init__(build_multi_output_command(input_path, outputs), duration=duration,
+                         output_path=outputs[0][0], on_event=on_event)
+        self.output_paths = [path for path, _ in outputs]
+
+    def _progress_data(self, fields):
+        data = super()._progress_data(fields)
+        if "percent" in data:
+            # Les sorties avancent ensemble (même décodage) ; total_size ne compte que la
+            # première, les tailles des autres sont lues une fois par bloc de progression
+            data["outputs"] = [{
+                "path": path,
+                "percent": data["percent"],
+                "size_mb": os.path.getsize(path) / (1024*1024) if os.path.exists(path) else 0.0,
+            } for path in self.output_paths]
+        return data
+
+    def _finished_data(self, retcode):
+        return dict(super()._finished_data(retcode), paths=list(self.output_paths))
+
+class TranscodePool:
+    """
+    Transcodages MP3 faits après le téléchargement, sur des threads à part :
+    le téléchargement suivant n'attend pas l'encodeur. La piste native
+    téléchargée est supprimée une fois le MP3 écrit.
+    """
+    def __init__(self, workers=None):
+        self.executor = concurrent.futures.ThreadPoolExecutor(max_workers=workers or default_transcode_workers())
+
+    def submit(self, input_path, output_path, on_event=None, duration=None):
+        """
+        Planifie le transcodage. Retourne (tâche, future) : la tâche peut être
+        annulée, le future donne le code de retour.
+        """
+        task = FFmpegTask(build_mp3_command(input_path, output_path), duration=duration,
+                          output_path=output_path, on_event=on_event)
+        return task, self.executor.submit(self._run, task, input_path)
+
+    def _run(self, task, input_path):
+        if task.cancelled:
+            task.returncode = -1
+            task.on_event(events.FINISHED, {"returncode": -1, "cancelled": True, "path": task.output_path})
+            return -1
+        if task.duration is None:
+            task.duration = get_file_duration(input_path)
+        retcode = task.run()
+        if retcode == 0:
+            try:
+                os.remove(input_path)
+            except OSError as e:
+                print("Error removing transcoded source:", e, file=sys.stderr)
+        return retcode
+
+    def shutdown(self, wait=True):
+        self.executor.shutdown(wait=wait, cancel_futures=not wait)
@@ -0,0 +1,690 @@
+"""
+Démon ViDL : API JSON locale (HTTP sur 127.0.0.1 ou socket Unix) au-dessus
+du moteur de téléchargement et de conversion.
+
+    vidl serve [--port 8765 | --socket /tmp/vidl.sock] [-j 2]
+
+    POST   /jobs                {"kind": "download", "url": ..., "export_type": "mp4|mp3|audio", "codecs": "all"}
+                                {"kind": "convert", "input": ..., "options": {..., "chunked": true}}
+                                {"kind": "convert", "input": ..., "outputs": [{options}, ...]}  (un seul décodage)
+    GET    /jobs[?state=&limit=]
+    GET    /jobs/<id>
+    GET    /jobs/<id>/thumbnail
+    POST   /jobs/<id>/cancel    (ou DELETE /jobs/<id>)
+    GET    /events[?job=<id>]   progression (server-sent events)
+    GET    /health
+
+Seuls les clients locaux sont servis : l'en-tête Host doit désigner
+127.0.0.1 / localhost (pas de DNS rebinding), un POST doit être en
+application/json et une requête d'une autre origine (Origin) est refusée,
+ce qui écarte les formulaires d'une page web. Les chemins de sortie fournis
+("output_dir", "output") doivent être dans le dossier de sortie du démon.
+
+Les tâches sont persistées (jobs.db) : un redémarrage reprend celles qui
+étaient en attente ou en cours. Les transcodages MP3 tournent dans un pool
+à part et ne retiennent pas les workers de téléchargement. Les caches (analyses, vidéos nécessitant
+les cookies, miniatures) restent chauds d'une requête à l'autre.
+"""
+
+import argparse
+import concurrent.futures
+import datetime
+import json
+import os
+import queue
+import signal
+import socketserver
+import sys
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+from . import events, jobs
+from .analysis import AnalysisCache, analyze, fetch_bytes, select_format_id
+from .conversion import (DEFAULT_CONVERSION_OPTIONS, MultiOutputTask, TranscodePool, get_file_duration,
+                         unique_converted_path)
+from .download import (DiskSpaceGuard, DownloadTask, build_download_command, required_space, unique_output_path,
+                       with_continue)
+from .formats import audio_extension, format_size
+from .history import HistoryStore
+from .jobs import JobStore
+from .library import MediaLibrary
+from .tasks import conversion_task
+from .urls import canonical_url, media_key, parse_media_url
+from .utils import app_support_dir, validate_url
+
+DEFAULT_PORT = 8765
+SSE_KEEPALIVE_S = 15
+THUMBNAIL_CACHE_SIZE = 128
+LOCAL_HOSTNAMES = {"127.0.0.1", "localhost", "::1"}
+# Chemins fixés par le démon lui-même (reprise) : jamais acceptés d'un client
+INTERNAL_PARAMS = ("output_path", "mp3_path", "output_paths", "started")
+
+class JobRunner:
+    """
+    Exécute les tâches de la file persistante avec `workers` threads.
+    Les événements sont diffusés sur self.bus : {"job": id, ...}.
+    """
+    def __init__(self, store, output_dir, workers=2, history=None, library=None, verbose=False,
+                 transcode_workers=None):
+        self.store = store
+        self.output_dir = output_dir
+        self.workers = workers
+        self.history = history
+        self.library = library
+        self.verbose = verbose
+        self.bus = events.EventBus()
+        self.analysis_cache = AnalysisCache()
+        self.cookie_keys = set()   # vidéos qui ont demandé les cookies Firefox
+        self.thumbnails = {}       # thumbnail_url -> octets
+        self.queue = queue.Queue()
+        self.tasks = {}            # job id -> tâche en cours
+        self.reserved_paths = set()
+        self.disk_space = DiskSpaceGuard()
+        self.transcoder = TranscodePool(transcode_workers)
+        self.lock = threading.Lock()
+        self.threads = []
+        self.stopping = False
+
+    def start(self):
+        for job_id in self.store.pending_ids():
+            self.queue.put(job_id)
+        for _ in range(self.workers):
+            t = threading.Thread(target=self._worker, daemon=True)
+            t.start()
+            self.threads.append(t)
+
+    def stop(self):
+        """
+        Arrête les processus en cours ; leurs tâches restent « running » et
+        seront reprises au prochain démarrage.
+        """
+        self.stopping = True
+        with self.lock:
+            tasks = list(self.tasks.values())
+        for task in tasks:
+            task.cancel()
+        self.transcoder.shutdown(wait=False)
+        for _ in self.threads:
+            self.queue.put(None)
+
+    def emit(self, job_id, event, **data):
+        self.bus.emit(event, dict(job=job_id, **data))
+
+    # ----- API -----
+    def submit(self, kind, params):
+        """
+        Ajoute une tâche. Retourne (tâche, créée) ; un téléchargement de la
+        même vidéo déjà en attente ou en cours est retourné tel quel.
+        Lève ValueError si les paramètres sont invalides.
+        """
+        for key in INTERNAL_PARAMS:
+            if key in params:
+                raise ValueError(f"{key}_not_allowed")
+        if kind == "download":
+            url = (params.get("url") or "").strip()
+            if not validate_url(url):
+                raise ValueError("invalid_url")
+            if params.get("export_type", "mp4") not in ("mp4", "mp3", "audio"):
+                raise ValueError("invalid_export_type")
+            params = dict(params, url=url)
+            if params.get("output_dir"):
+                params["output_dir"] = self.allowed_output_path(params["output_dir"])
+            key = media_key(url)
+            existing = self.store.find_active(key)
+            if existing:
+                return existing, False
+        elif kind == "convert":
+            if not params.get("input") or not os.path.isfile(params["input"]):
+                raise ValueError("input_not_found")
+            if not isinstance(params.get("options", {}), dict):
+                raise ValueError("invalid_options")
+            if params.get("output"):
+                params = dict(params, output=self.allowed_output_path(params["output"]))
+                if os.path.exists(params["output"]):
+                    raise ValueError("output_exists")
+            outputs = params.get("outputs")
+            if outputs is not None and (not isinstance(outputs, list) or not outputs
+                                        or not all(isinstance(o, dict) for o in outputs)):
+                raise ValueError("invalid_outputs")
+            key = None
+        else:
+            raise ValueError("invalid_kind")
+        job = self.store.submit(kind, params, key=key)
+        self.queue.put(job["id"])
+        self.emit(job["id"], "queued", kind=kind)
+        return job, True
+
+    def allowed_output_path(self, path):
+        """Chemin résolu (liens compris) s'il est dans le dossier de sortie ; sinon ValueError."""
+        if not isinstance(path, str):
+            raise ValueError("invalid_path")
+        root = os.path.realpath(self.output_dir)
+        resolved = os.path.realpath(os.path.join(root, os.path.expanduser(path)))
+        if os.path.commonpath([resolved, root]) != root:
+            raise ValueError("path_outside_output_dir")
+        return resolved
+
+    def cancel(self, job_id):
+        """Annule une tâche en attente ou en cours. Retourne la tâche (ou None)."""
+        with self.lock:
+            job = self.store.get(job_id)
+            if job is None:
+                return None
+            if job["state"] == jobs.QUEUED:
+                self.store.update(job_id, state=jobs.CANCELLED)
+                self.emit(job_id, "cancelled")
+            elif job["state"] == jobs.RUNNING:
+                task = self.tasks.get(job_id)
+                if task is not None:
+                    task.cancel()
+                else:
+                    # Analyse ou préparation en cours : _register refusera la tâche
+                    self.store.update(job_id, state=jobs.CANCELLED)
+                    self.emit(job_id, "cancelled")
+        return self.store.get(job_id)
+
+    def thumbnail(self, job_id):
+        """Miniature (octets JPEG) d'un téléchargement, mise en cache."""
+        job = self.store.get(job_id)
+        if job is None or job["kind"] != "download":
+            return None
+        thumb_url = (job["result"] or {}).get("thumbnail_url")
+        if not thumb_url:
+            thumb_url = analyze(job["params"]["url"], cache=self.analysis_cache, with_thumbnail=False).get("thumbnail_url")
+        if not thumb_url:
+            return None
+        data = self.thumbnails.get(thumb_url)
+        if data is None:
+            data = fetch_bytes(thumb_url, timeout=10)
+            with self.lock:
+                if len(self.thumbnails) >= THUMBNAIL_CACHE_SIZE:
+                    self.thumbnails.pop(next(iter(self.thumbnails)))
+                self.thumbnails[thumb_url] = data
+        return data
+
+    # ----- Exécution -----
+    def _worker(self):
+        while True:
+            job_id = self.queue.get()
+            if job_id is None:
+                return
+            with self.lock:
+                job = self.store.get(job_id)
+                if job is None or job["state"] != jobs.QUEUED:
+                    continue
+                self.store.update(job_id, state=jobs.RUNNING, progress=0)
+            self.emit(job_id, "started", kind=job["kind"])
+            try:
+                if job["kind"] == "download":
+                    outcome = self._run_download(job)
+                else:
+                    outcome = self._run_convert(job)
+            except Exception as e:
+                outcome = None, str(e), False
+            if isinstance(outcome, concurrent.futures.Future):
+                # Transcodage MP3 en cours : le worker passe à la tâche suivante
+                outcome.add_done_callback(lambda f, job_id=job_id: self._finish(job_id, *f.result()))
+            else:
+                self._finish(job_id, *outcome)
+
+    def _finish(self, job_id, result, error, cancelled):
+        with self.lock:
+            self.tasks.pop(job_id, None)
+            # Annulée avant d'avoir une tâche : l'état et l'événement sont déjà là
+            already_cancelled = self.store.get(job_id)["state"] == jobs.CANCELLED
+        if self.stopping or already_cancelled:
+            return
+        if cancelled:
+            self.store.update(job_id, state=jobs.CANCELLED)
+            self.emit(job_id, "cancelled")
+        elif error:
+            self.store.update(job_id, state=jobs.FAILED, error=error)
+            self.emit(job_id, "error", error=error)
+        else:
+            self.store.update(job_id, state=jobs.COMPLETED, progress=100, result=result)
+            self.emit(job_id, "done", **result)
+
+    def _progress_callback(self, job_id, extra=None):
+        last_percent = [-1]
+        def on_event(kind, data):
+            if kind == events.PROGRESS and "percent" in data:
+                percent = int(data["percent"])
+                if percent != last_percent[0]:
+                    last_percent[0] = percent
+                    self.store.update(job_id, progress=data["percent"])
+                    self.emit(job_id, "progress", **data)
+            elif kind == events.TUNED:
+                self.emit(job_id, "tuned", **data)
+            elif kind == events.AGE_RESTRICTED:
+                self.emit(job_id, "age_restricted")
+                if extra is not None:
+                    extra(kind, data)
+            elif kind == events.LOG and self.verbose:
+                print(data["line"], file=sys.stderr)
+        return on_event
+
+    def _register(self, job_id, task):
+        """Enregistre la tâche ; False si la tâche a été annulée entre-temps."""
+        with self.lock:
+            self.tasks[job_id] = task
+            return self.store.get(job_id)["state"] == jobs.RUNNING
+
+    def _run_download(self, job):
+        job_id, params = job["id"], job["params"]
+        url = params["url"]
+        export_type = params.get("export_type", "mp4")
+        self.emit(job_id, "analyzing", url=url)
+        info = analyze(url, cache=self.analysis_cache, with_thumbnail=False)
+        format_id = params.get("format_id") or select_format_id(info, export_type, params.get("codecs", "all"))
+        if not format_id:
+            return None, "no_format_found", False
+        lang = params.get("lang", "Auto")
+        existing = self.library.find(url, format_id, export_type, lang) if self.library else None
+        if existing:
+            output_dir = params.get("output_dir") or self.output_dir
+            os.makedirs(output_dir, exist_ok=True)
+            ext = os.path.splitext(existing)[1].lstrip(".") or export_type
+            with self.lock:
+                if self.store.get(job_id)["state"] != jobs.RUNNING:
+                    # Annulée pendant l'analyse : aucun fichier placé, rien dans l'historique
+                    return None, None, True
+                path = self.library.place(existing, output_dir, info.get("title") or "", ext,
+                                          reserved=self.reserved_paths)
+                self.reserved_paths.discard(path)
+            return self._download_result(url, info, export_type, format_id, path, reused=existing), None, False
+        # Refusé avant le moindre octet si le volume ne peut pas contenir le fichier
+        output_dir = params.get("output_dir") or self.output_dir
+        os.makedirs(output_dir, exist_ok=True)
+        size, _ = format_size(info["formats"], format_id, info.get("duration"))
+        needed = required_space(size, format_id, export_type) if size else 0
+        if needed:
+            admitted, free = self.disk_space.admit(output_dir, needed)
+            if not admitted:
+                return None, f"insufficient_disk_space (needed {needed}, free {free})", False
+        outcome = None
+        try:
+            outcome = self._download(job, info, format_id, lang, output_dir)
+            return outcome
+        finally:
+            if needed:
+                # La piste native occupe le disque jusqu'à la fin du transcodage
+                if isinstance(outcome, concurrent.futures.Future):
+                    outcome.add_done_callback(lambda f: self.disk_space.release(output_dir, needed))
+                else:
+                    self.disk_space.release(output_dir, needed)
+
+    def _download(self, job, info, format_id, lang, output_dir):
+        job_id, params = job["id"], job["params"]
+        url = params["url"]
+        export_type = params.get("export_type", "mp4")
+        # MP3 : piste native téléchargée telle quelle, transcodée ensuite à part
+        download_type = "audio" if export_type == "mp3" else export_type
+        # Les chemins de sortie sont fixés au premier lancement : une tâche
+        # reprise après redémarrage réutilise le même fichier (.part de yt-dlp).
+        output_path = params.get("output_path")
+        mp3_path = params.get("mp3_path")
+        resumed = bool(output_path)
+        title = info.get("title") or ""
+        with self.lock:
+            if output_path:
+                self.reserved_paths.add(output_path)
+            else:
+                ext = audio_extension(info["formats"], format_id) if download_type == "audio" else export_type
+                output_path = unique_output_path(output_dir, title, ext, reserved=self.reserved_paths)
+            if export_type == "mp3" and not mp3_path:
+                mp3_path = unique_output_path(output_dir, title, "mp3", reserved=self.reserved_paths)
+        self.store.update(job_id, params=dict(params, output_path=output_path, format_id=format_id,
+                                              **({"mp3_path": mp3_path} if mp3_path else {})))
+        source_url = canonical_url(url) if parse_media_url(url) else url
+        cmd = build_download_command(source_url, download_type, format_id, output_path, lang)
+        if resumed:
+            cmd = with_continue(cmd)
+        key = job["media_key"]
+        task = DownloadTask(cmd, on_event=self._progress_callback(job_id), use_cookies=key in self.cookie_keys)
+        try:
+            if not self._register(job_id, task):
+                return None, None, True
+            retcode = task.run()
+        finally:
+            with self.lock:
+                self.reserved_paths.discard(output_path)
+                if task.returncode != 0 or task.cancelled:
+                    self.reserved_paths.discard(mp3_path)
+        if task.use_cookies:
+            self.cookie_keys.add(key)
+        if task.cancelled:
+            return None, None, True
+        if retcode != 0:
+            return None, f"download_failed ({retcode})", False
+        path = task.output_path if task.output_path and os.path.exists(task.output_path) else output_path
+        if mp3_path:
+            return self._transcode(job, info, format_id, lang, path, mp3_path)
+        if self.library is not None:
+            self.library.record(url, format_id, export_type, path, lang)
+        return self._download_result(url, info, export_type, format_id, path), None, False
+
+    def _transcode(self, job, info, format_id, lang, source, mp3_path):
+        """
+        Planifie le transcodage MP3 de la piste téléchargée. Retourne un
+        future de (résultat, erreur, annulé).
+        """
+        job_id, url = job["id"], job["params"]["url"]
+        self.emit(job_id, "transcoding", path=mp3_path)
+        outcome = concurrent.futures.Future()
+        task, future = self.transcoder.submit(source, mp3_path, on_event=self._progress_callback(job_id))
+        if not self._register(job_id, task):
+            task.cancel()
+
+        def on_done(f):
+            with self.lock:
+                self.reserved_paths.discard(mp3_path)
+            if f.cancelled() or task.cancelled:
+                outcome.set_result((None, None, True))
+            elif f.exception() is not None:
+                outcome.set_result((None, str(f.exception()), False))
+            elif f.result() != 0:
+                outcome.set_result((None, f"transcode_failed ({f.result()})", False))
+            else:
+                if self.library is not None:
+                    self.library.record(url, format_id, "mp3", mp3_path, lang)
+                outcome.set_result((self._download_result(url, info, "mp3", format_id, mp3_path), None, False))
+
+        future.add_done_callback(on_done)
+        return outcome
+
+    def _download_result(self, url, info, export_type, format_id, path, reused=None):
+        result = {
+            "path": path,
+            "title": info.get("title"),
+            "channel": info.get("channel"),
+            "video_id": info.get("video_id"),
+            "thumbnail_url": info.get("thumbnail_url"),
+            "format": format_id,
+        }
+        if reused:
+            result["reused"] = reused
+        if self.history is not None and info.get("title"):
+            self.history.add({
+                "title": info["title"],
+                "url": url,
+                "thumbnail_url": info.get("thumbnail_url"),
+                "channel": info.get("channel"),
+                "video_id": info.get("video_id"),
+                "export_type": export_type,
+                "file_path": path,
+                "download_date": datetime.datetime.now().strftime("%Y-%m-%d %H:%M"),
+            })
+        return result
+
+    def _run_convert(self, job):
+        job_id, params = job["id"], job["params"]
+        options = dict(DEFAULT_CONVERSION_OPTIONS)
+        options.update(params.get("options") or {})
+        input_path = params["input"]
+        if params.get("outputs"):
+            return self._run_convert_outputs(job)
+        output_path = params.get("output") or unique_converted_path(input_path, options["format"])
+        if os.path.exists(output_path):
+            if not params.get("started"):
+                return None, "output_exists", False
+            # Reprise après redémarrage : la sortie partielle est la nôtre
+            os.remove(output_path)
+        self.store.update(job_id, params=dict(params, output=output_path, started=True))
+        task = conversion_task(input_path, output_path, options, duration=get_file_duration(input_path),
+                               on_event=self._progress_callback(job_id))
+        if not self._register(job_id, task):
+            return None, None, True
+        retcode = task.run()
+        if task.cancelled:
+            return None, None, True
+        if retcode != 0:
+            return None, f"conversion_failed ({retcode})", False
+        return {"path": output_path}, None, False
+
+    def _run_convert_outputs(self, job):
+        """Plusieurs sorties depuis un seul décodage de la source (MultiOutputTask)."""
+        job_id, params = job["id"], job["params"]
+        input_path = params["input"]
+        paths = params.get("output_paths")
+        if not paths:
+            reserved = set()
+            paths = [unique_converted_path(input_path, dict(DEFAULT_CONVERSION_OPTIONS, **o)["format"],
+                                           reserved=reserved) for o in params["outputs"]]
+            self.store.update(job_id, params=dict(params, output_paths=paths))
+        task = MultiOutputTask(input_path, list(zip(paths, params["outputs"])),
+                               duration=get_file_duration(input_path), on_event=self._progress_callback(job_id))
+        if not self._register(job_id, task):
+            return None, None, True
+        retcode = task.run()
+        if task.cancelled:
+            return None, None, True
+        if retcode != 0:
+            return None, f"conversion_failed ({retcode})", False
+        return {"path": paths[0], "paths": paths}, None, False
+
+class DaemonHandler(BaseHTTPRequestHandler):
+    server_version = "ViDL"
+
+    @property
+    def runner(self):
+        return self.server.runner
+
+    def log_message(self, format, *args):
+        if self.runner.verbose:
+            print(format % args, file=sys.stderr)
+
+    def address_string(self):
+        # Socket Unix : pas d'adresse cliente
+        return self.client_address[0] if self.client_address else "unix"
+
+    def send_json(self, status, payload):
+        body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def read_json(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        if not length:
+            return {}
+        return json.loads(self.rfile.read(length).decode("utf-8"))
+
+    def route(self):
+        parsed = urlparse(self.path)
+        parts = [p for p in parsed.path.split("/") if p]
+        query = {k: v[-1] for k, v in parse_qs(parsed.query).items()}
+        return parts, query
+
+    def job_id(self, parts):
+        try:
+            return int(parts[1])
+        except (IndexError, ValueError):
+            return None
+
+    def check_client(self):
+        """
+        Refuse (403 / 415) ce qui ne vient pas d'un client local : Host
+        étranger (DNS rebinding), autre origine (page web), POST hors JSON.
+        Retourne True si la requête peut être traitée.
+        """
+        if not isinstance(self.server, UnixHTTPServer):
+            host = self.headers.get("Host") or ""
+            if urlparse("//" + host).hostname not in LOCAL_HOSTNAMES:
+                self.send_json(403, {"error": "forbidden_host"})
+                return False
+            origin = self.headers.get("Origin")
+            if origin and origin != f"http://{host}":
+                self.send_json(403, {"error": "forbidden_origin"})
+                return False
+        if self.command == "POST":
+            content_type = (self.headers.get("Content-Type") or "").split(";")[0].strip().lower()
+            if content_type != "application/json":
+                self.send_json(415, {"error": "json_required"})
+                return False
+        return True
+
+    def do_GET(self):
+        if not self.check_client():
+            return
+        parts, query = self.route()
+        if parts == ["health"]:
+            self.send_json(200, {"status": "ok"})
+        elif parts == ["jobs"]:
+            try:
+                limit = int(query.get("limit", 100))
+            except ValueError:
+                return self.send_json(400, {"error": "invalid_limit"})
+            self.send_json(200, {"jobs": self.runner.store.list(state=query.get("state"), limit=limit)})
+        elif len(parts) == 2 and parts[0] == "jobs":
+            job = self.runner.store.get(self.job_id(parts))
+            if job is None:
+                return self.send_json(404, {"error": "not_found"})
+            self.send_json(200, job)
+        elif len(parts) == 3 and parts[0] == "jobs" and parts[2] == "thumbnail":
+            try:
+                data = self.runner.thumbnail(self.job_id(parts))
+            except Exception as e:
+                return self.send_json(502, {"error": str(e)})
+            if not data:
+                return self.send_json(404, {"error": "not_found"})
+            self.send_response(200)
+            self.send_header("Content-Type", "image/jpeg")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+        elif parts == ["events"]:
+            self.stream_events(query.get("job"))
+        else:
+            self.send_json(404, {"error": "not_found"})
+
+    def do_POST(self):
+        if not self.check_client():
+            return
+        parts, _ = self.route()
+        if parts == ["jobs"]:
+            try:
+                payload = self.read_json()
+                params = dict(payload)
+                kind = params.pop("kind", "download")
+                job, created = self.runner.submit(kind, params)
+            except (ValueError, AttributeError, TypeError) as e:
+                return self.send_json(400, {"error": str(e) or "invalid_request"})
+            self.send_json(201 if created else 200, job)
+        elif len(parts) == 3 and parts[0] == "jobs" and parts[2] == "cancel":
+            self.cancel_job(parts)
+        else:
+            self.send_json(404, {"error": "not_found"})
+
+    def do_DELETE(self):
+        if not self.check_client():
+            return
+        parts, _ = self.route()
+        if len(parts) == 2 and parts[0] == "jobs":
+            self.cancel_job(parts)
+        else:
+            self.send_json(404, {"error": "not_found"})
+
+    def cancel_job(self, parts):
+        job = self.runner.cancel(self.job_id(parts))
+        if job is None:
+            return self.send_json(404, {"error": "not_found"})
+        self.send_json(200, job)
+
+    def stream_events(self, job_filter=None):
+        """Server-sent events : une entrée par événement, jusqu'à la déconnexion."""
+        pending = queue.Queue()
+        def on_event(kind, data):
+            if job_filter is None or str(data.get("job")) == job_filter:
+                pending.put((kind, data))
+        self.runner.bus.subscribe(on_event)
+        try:
+            self.send_response(200)
+            self.send_header("Content-Type", "text/event-stream")
+            self.send_header("Cache-Control", "no-cache")
+            self.end_headers()
+            self.wfile.flush()
+            while True:
+                try:
+                    kind, data = pending.get(timeout=SSE_KEEPALIVE_S)
+                    chunk = f"event: {kind}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+                except queue.Empty:
+                    chunk = ": keepalive\n\n"
+                self.wfile.write(chunk.encode("utf-8"))
+                self.wfile.flush()
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+        finally:
+            self.runner.bus.unsubscribe(on_event)
+
+class UnixHTTPServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+def make_server(runner, port=DEFAULT_PORT, socket_path=None):
+    """Serveur HTTP local : 127.0.0.1:port, ou socket Unix si socket_path."""
+    if socket_path:
+        if os.path.exists(socket_path):
+            os.remove(socket_path)
+        server = UnixHTTPServer(socket_path, DaemonHandler)
+    else:
+        server = ThreadingHTTPServer(("127.0.0.1", port), DaemonHandler)
+        server.daemon_threads = True
+    server.runner = runner
+    return server
+
+def _raise_interrupt(signum, frame):
+    raise KeyboardInterrupt
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="vidl serve", description="ViDL – démon avec API JSON locale")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT, help=f"port sur 127.0.0.1 (défaut : {DEFAULT_PORT})")
+    parser.add_argument("--socket", help="écoute sur un socket Unix au lieu du port TCP")
+    parser.add_argument("-o", "--output-dir", default=os.path.join(os.path.expanduser("~"), "Downloads"),
+                        help="dossier de téléchargement par défaut (défaut : ~/Downloads)")
+    parser.add_argument("-j", "--jobs", type=int, default=2, help="tâches simultanées (défaut : 2)")
+    parser.add_argument("--transcode-jobs", type=int, default=None,
+                        help="transcodages MP3 simultanés (défaut : la moitié des cœurs)")
+    parser.add_argument("--db", default=os.path.join(app_support_dir(), "jobs.db"),
+                        help="base des tâches (défaut : jobs.db du dossier de l'application)")
+    parser.add_argument("--no-history", action="store_true", help="ne pas enregistrer dans l'historique")
+    parser.add_argument("--library", default=os.path.join(app_support_dir(), "library.db"),
+                        help="index des fichiers déjà téléchargés (peut être partagé, ex. sur un volume commun)")
+    parser.add_argument("--no-library", action="store_true", help="toujours télécharger, sans consulter la bibliothèque")
+    parser.add_argument("-v", "--verbose", action="store_true", help="journal des requêtes et sortie de yt-dlp sur stderr")
+    return parser
+
+def main(argv=None):
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    if args.jobs < 1:
+        parser.error("--jobs must be >= 1")
+    if args.transcode_jobs is not None and args.transcode_jobs < 1:
+        parser.error("--transcode-jobs must be >= 1")
+    history = None if args.no_history else HistoryStore(
+        os.path.join(app_support_dir(), "history.db"),
+        legacy_json_path=os.path.join(app_support_dir(), "history.json")
+    )
+    library = None if args.no_library else MediaLibrary(args.library)
+    runner = JobRunner(JobStore(args.db), args.output_dir, workers=args.jobs,
+                       history=history, library=library, verbose=args.verbose,
+                       transcode_workers=args.transcode_jobs)
+    runner.start()
+    server = make_server(runner, port=args.port, socket_path=args.socket)
+    where = args.socket or f"http://127.0.0.1:{args.port}"
+    print(f"ViDL daemon listening on {where}", file=sys.stderr)
+    signal.signal(signal.SIGTERM, _raise_interrupt)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        runner.stop()
+        if args.socket and os.path.exists(args.socket):
+            os.remove(args.socket)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
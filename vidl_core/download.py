@@ -0,0 +1,298 @@
+"""
+Téléchargement avec yt-dlp : construction de la commande et exécution
+avec progression, annulation et nouvel essai automatique (cookies
+Firefox) pour les vidéos restreintes par âge.
+"""
+
+import os
+import re
+import shutil
+import subprocess
+import threading
+
+from . import events
+from .utils import parse_timecode, sanitize_filename
+
+def unique_output_path(output_dir, title, ext, reserved=None):
+    """
+    Chemin de sortie « titre.ext » qui n'écrase aucun fichier existant
+    (« titre (1).ext », « titre (2).ext »…). `reserved` : chemins déjà
+    attribués à des téléchargements en cours ; le chemin retourné y est ajouté.
+    """
+    base = sanitize_filename(title) if title else "video"
+    candidate = os.path.join(output_dir, f"{base}.{ext}")
+    i = 1
+    while os.path.exists(candidate) or (reserved is not None and candidate in reserved):
+        candidate = os.path.join(output_dir, f"{base} ({i}).{ext}")
+        i += 1
+    if reserved is not None:
+        reserved.add(candidate)
+    return candidate
+
+# Marge laissée libre sur le volume de destination
+DISK_SPACE_MARGIN = 200 * 1024 * 1024
+
+def required_space(size, format_id, export_type, clip_fraction=1.0):
+    """
+    Octets à prévoir pour un téléchargement de `size` octets : les flux
+    vidéo + audio sont écrits puis fusionnés (deux copies au pic),
+    l'extraction audio écrit la source puis le fichier extrait.
+    """
+    size = size * clip_fraction
+    if "+" in format_id or export_type in ("mp3", "audio"):
+        size *= 2
+    return int(size) + DISK_SPACE_MARGIN
+
+class DiskSpaceGuard:
+    """
+    Admission des téléchargements selon l'espace libre du dossier de sortie,
+    en tenant compte des téléchargements déjà admis et non terminés.
+    """
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.reserved = {}  # périphérique -> octets réservés
+
+    def admit(self, output_dir, needed):
+        """
+        Réserve `needed` octets. Retourne (admis, octets libres) ; appeler
+        release(output_dir, needed) quand le téléchargement se termine.
+        """
+        device = os.stat(output_dir).st_dev
+        with self.lock:
+            free = shutil.disk_usage(output_dir).free - self.reserved.get(device, 0)
+            if needed > free:
+                return False, free
+            self.reserved[device] = self.reserved.get(device, 0) + needed
+            return True, free
+
+    def release(self, output_dir, needed):
+        device = os.stat(output_dir).st_dev
+        with self.lock:
+            self.reserved[device] = max(self.reserved.get(device, 0) - needed, 0)
+
+def is_auto_language(lang):
+    return not lang or lang.strip().lower() in ["auto"]
+
+def build_download_command(url, export_type, format_id, output_template, audio_lang="Auto"):
+    """
+    Commande yt-dlp pour un export "mp4" (format vidéo choisi, fusionné en
+    MP4), "mp3" (extraction audio réencodée) ou "audio" (piste native,
+    m4a/opus, copiée sans réencodage), avec préférence de langue audio.
+    Un format déjà muxé dans un autre conteneur (WebM…) est remuxé en MP4.
+    """
+    if export_type == "mp4":
+        if is_auto_language(audio_lang):
+            cmd = [
+                "yt-dlp",
+                "-f", format_id,
+                "--merge-output-format", "mp4",
+                "--newline",
+                "-o", output_template,
+                url
+            ]
+        elif "+" in format_id:
+            # format_id = "VID+AUD" -> on remplace juste l'audio
+            vid_id = format_id.split("+", 1)[0].strip()
+            fmt_expr = f"{vid_id}+ba[language^={audio_lang}]/(bestvideo+bestaudio/b)"
+            cmd = [
+                "yt-dlp",
+                "-f", fmt_expr,
+                "--merge-output-format", "mp4",
+                "-S", f"lang:{audio_lang}",
+                "--newline",
+                "-o", output_template,
+                url
+            ]
+        else:
+            # format_id = un seul id (format muxé par YouTube)
+            # On ne peut pas remplacer l'audio directement : on ajoute au moins une préférence de tri
+            cmd = [
+                "yt-dlp",
+                "-f", format_id,
+                "--merge-output-format", "mp4",
+                "-S", f"lang:{audio_lang}",
+                "--newline",
+                "-o", output_template,
+                url
+            ]
+        cmd[1:1] = ["--remux-video", "mp4"]
+    else:
+        # Extraction audio : MP3 (réencodage) ou piste native copiée telle quelle
+        audio_format = "mp3" if export_type == "mp3" else "best"
+        if is_auto_language(audio_lang):
+            cmd = [
+                "yt-dlp",
+                "-f", format_id,
+                "--extract-audio",
+                "--audio-format", audio_format,
+                "--newline",
+                "-o", output_template,
+                url
+            ]
+        else:
+            # Forcer une piste audio dans la langue souhaitée, fallback sur bestaudio
+            fmt_expr = f"ba[language^={audio_lang}]/bestaudio"
+            cmd = [
+                "yt-dlp",
+                "-f", fmt_expr,
+                "--extract-audio",
+                "--audio-format", audio_format,
+                "-S", f"lang:{audio_lang}",
+                "--newline",
+                "-o", output_template,
+                url
+            ]
+    return cmd
+
+def clip_bounds(start_text, end_text, duration=None):
+    """
+    Début et fin d'un extrait (secondes) à partir des champs saisis, ou None
+    si les deux sont vides (vidéo entière). Début absent : 0 ; fin absente :
+    fin de la vidéo. Lève ValueError si l'intervalle est invalide.
+    """
+    start_text, end_text = (start_text or "").strip(), (end_text or "").strip()
+    if not start_text and not end_text:
+        return None
+    start = parse_timecode(start_text) if start_text else 0.0
+    end = parse_timecode(end_text) if end_text else (float(duration) if duration else None)
+    if end is not None and duration:
+        end = min(end, float(duration))
+    if end is not None and end <= start:
+        raise ValueError("clip end must be after start")
+    return start, end
+
+def clip_length(clip, duration=None):
+    """Durée de l'extrait (ou de la vidéo entière si clip est None)."""
+    if clip is None:
+        return duration
+    start, end = clip
+    if end is None:
+        return float(duration) - start if duration else None
+    return end - start
+
+def clip_label(clip):
+    """Suffixe de nom de fichier : "[30-60s]"."""
+    start, end = clip
+    return f"[{start:g}-{end:g}s]" if end is not None else f"[{start:g}s-]"
+
+def with_clip(cmd, clip, force_keyframes=False):
+    """
+    Ne télécharge que l'extrait (--download-sections) : seules les plages
+    nécessaires des flux sont récupérées. La coupe se fait sur l'image clé la
+    plus proche, ou exactement avec force_keyframes (réencodage aux points de
+    coupe, plus lent).
+    """
+    start, end = clip
+    section = f"*{start:g}-{end:g}" if end is not None else f"*{start:g}-inf"
+    extra = ["--download-sections", section]
+    if force_keyframes:
+        extra.append("--force-keyframes-at-cuts")
+    return [cmd[0]] + extra + cmd[1:]
+
+def with_continue(cmd):
+    """
+    Reprise d'un téléchargement interrompu : yt-dlp repart du fichier .part
+    existant (même chemin de sortie) au lieu de l'octet zéro.
+    """
+    if "--continue" in cmd:
+        return list(cmd)
+    return [cmd[0], "--continue"] + cmd[1:]
+
+def with_firefox_cookies(cmd):
+    cmd_with_cookies = cmd.copy()
+    if "--cookies-from-browser" not in cmd_with_cookies:
+        cmd_with_cookies.insert(1, "--cookies-from-browser")
+        cmd_with_cookies.insert(2, "firefox")
+    return cmd_with_cookies
+
+class DownloadTask:
+    """
+    Exécute une commande yt-dlp, détecte les erreurs de restriction d'âge
+    et réessaie automatiquement avec les cookies Firefox.
+
+    Les événements PROGRESS, OUTPUT, AGE_RESTRICTED, LOG et FINISHED sont
+    envoyés à on_event(kind, data) depuis le thread qui appelle run().
+    use_cookies=True utilise les cookies dès le premier essai (vidéo déjà
+    connue comme restreinte).
+    """
+    download_regex = re.compile(r'^\[download\].*?([\d\.]+)%')
+    destination_regex = re.compile(r'^\[download\]\s+Destination:\s+(.+)$')
+    merger_regex = re.compile(r'^\[Merger\]\s+Merging formats into\s+"(.+)"$')
+    extract_regex = re.compile(r'^\[ExtractAudio\]\s+Destination:\s+(.+)$')
+
+    def __init__(self, cmd, on_event=None, use_cookies=False):
+        self.cmd = [arg for arg in cmd if arg not in ["--cookies-from-browser", "firefox"]]
+        self.on_event = on_event or events.ignore_event
+        self.use_cookies = use_cookies
+        self.process = None
+        self.cancelled = False
+        self.output_path = None
+        self.returncode = None
+
+    def _stream_process(self, process):
+        age_restricted = False
+        skip_first_progress_value = True
+        for line in process.stdout:
+            line = line.strip()
+            self.on_event(events.LOG, {"line": line})
+            if "Sign in to confirm your age" in line or "age-restricted" in line.lower():
+                age_restricted = True
+            match = self.download_regex.search(line)
+            if match:
+                try:
+                    val_float = float(match.group(1))
+                except ValueError:
+                    val_float = 0.0
+                if skip_first_progress_value:
+                    skip_first_progress_value = False
+                    continue
+                self.on_event(events.PROGRESS, {"percent": val_float})
+            dest_match = self.destination_regex.match(line)
+            if dest_match:
+                self.output_path = dest_match.group(1).strip()
+                self.on_event(events.OUTPUT, {"path": self.output_path})
+            merger_match = self.merger_regex.match(line) or self.extract_regex.match(line)
+            if merger_match:
+                self.output_path = merger_match.group(1).strip()
+                self.on_event(events.OUTPUT, {"path": self.output_path})
+        process.wait()
+        return process.returncode, age_restricted
+
+    def _start(self, cmd):
+        self.process = subprocess.Popen(
+            cmd,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.STDOUT,
+            text=True,
+            universal_newlines=True
+        )
+        return self._stream_process(self.process)
+
+    def run(self):
+        """Exécute le téléchargement (bloquant) et retourne le code de retour."""
+        try:
+            if self.use_cookies:
+                retcode, _ = self._start(with_firefox_cookies(self.cmd))
+            else:
+                retcode, age_restricted = self._start(self.cmd)
+                if retcode != 0 and age_restricted and not self.cancelled:
+                    self.use_cookies = True
+                    self.on_event(events.AGE_RESTRICTED, {})
+                    retcode, _ = self._start(with_firefox_cookies(self.cmd))
+        except Exception as e:
+            self.on_event(events.LOG, {"line": f"Error running yt-dlp: {e}"})
+            retcode = -1
+        self.returncode = retcode
+        self.process = None
+        self.on_event(events.FINISHED, {
+            "returncode": retcode,
+            "cancelled": self.cancelled,
+            "path": self.output_path
+        })
+        return retcode
+
+    def cancel(self):
+        self.cancelled = True
+        process = self.process
+        if process and process.poll() is None:
+            process.terminate()
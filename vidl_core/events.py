@@ -0,0 +1,51 @@
+"""
+Événements émis par le moteur.
+
+Les tâches (téléchargement, conversion…) reçoivent un callback
+on_event(kind, data) ; ce callback est appelé depuis le thread de la tâche.
+L'interface Tk le redirige vers sa boucle avec after(), la CLI écrit une
+ligne JSON, le démon le diffuse à ses clients.
+"""
+
+import threading
+
+# Types d'événements
+PROGRESS = "progress"              # {"percent": float, ...}
+OUTPUT = "output"                  # {"path": str}
+AGE_RESTRICTED = "age_restricted"  # {} : nouvel essai avec les cookies Firefox
+LOG = "log"                        # {"line": str}
+FINISHED = "finished"              # {"returncode": int, "cancelled": bool, "path": str|None}
+QUEUED = "queued"                  # {"item": int, ...} : fichier ajouté à une file de conversion
+SUMMARY = "summary"                # bilan d'une file de conversion vidée (voir batch.py)
+TUNED = "tuned"                    # {"encoder", "preset", "seconds", "fits"} : encodeur "auto" choisi
+
+def ignore_event(kind, data):
+    pass
+
+class EventBus:
+    """
+    Diffuse les événements à plusieurs abonnés (thread-safe).
+    bus.emit peut être passé directement comme on_event d'une tâche.
+    """
+    def __init__(self):
+        self.subscribers = []
+        self.lock = threading.Lock()
+
+    def subscribe(self, callback):
+        with self.lock:
+            self.subscribers.append(callback)
+        return callback
+
+    def unsubscribe(self, callback):
+        with self.lock:
+            if callback in self.subscribers:
+                self.subscribers.remove(callback)
+
+    def emit(self, kind, data):
+        with self.lock:
+            subscribers = list(self.subscribers)
+        for callback in subscribers:
+            try:
+                callback(kind, data)
+            except Exception as e:
+                print("Error in event subscriber:", e)
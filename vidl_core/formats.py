@@ -0,0 +1,197 @@
+"""
+Choix des formats à partir des informations JSON de yt-dlp, tous codecs et
+conteneurs confondus (H.264, H.265, VP9, AV1…).
+
+Chaque candidat (flux vidéo + meilleur flux audio, ou format muxé) reçoit
+une qualité « équivalent H.264 » : débit divisé par l'efficacité du codec.
+Pour chaque définition, on retient le candidat le moins volumineux dont la
+qualité atteint QUALITY_TARGET de la meilleure qualité disponible ; le
+fichier est ensuite remuxé dans le conteneur demandé.
+"""
+
+# Octets nécessaires pour une qualité donnée, relatifs à H.264 / AAC
+VIDEO_CODEC_EFFICIENCY = {"h264": 1.0, "h265": 0.65, "vp9": 0.7, "av1": 0.55}
+AUDIO_CODEC_EFFICIENCY = {"aac": 1.0, "opus": 0.75, "vorbis": 0.9, "mp3": 1.2}
+QUALITY_TARGET = 0.8
+
+# "compat" : uniquement H.264 / AAC (lisible partout, QuickTime compris)
+CODEC_PREFERENCES = {
+    "all": (None, None),
+    "compat": (("h264",), ("aac",)),
+}
+
+# Extension du fichier audio natif, sans réencodage (yt-dlp -x --audio-format best)
+AUDIO_EXTENSIONS = {"aac": "m4a", "opus": "opus", "vorbis": "ogg", "mp3": "mp3"}
+
+# Champs conservés (les formats bruts contiennent URL signées et fragments)
+FORMAT_KEYS = ("format_id", "ext", "vcodec", "acodec", "width", "height", "fps", "tbr", "vbr", "abr",
+               "filesize", "filesize_approx", "format_note", "language", "protocol")
+
+def slim_formats(formats):
+    return [{k: f.get(k) for k in FORMAT_KEYS} for f in formats or []]
+
+def codec_family(codec):
+    """ "avc1.640028" -> "h264", "vp09.00.40.08" -> "vp9", "av01…" -> "av1", "mp4a.40.2" -> "aac"… """
+    codec = (codec or "").lower()
+    if not codec or codec == "none":
+        return None
+    for prefix, family in (("avc", "h264"), ("h264", "h264"), ("hev", "h265"), ("hvc", "h265"),
+                           ("h265", "h265"), ("vp09", "vp9"), ("vp9", "vp9"), ("av01", "av1"),
+                           ("av1", "av1"), ("mp4a", "aac"), ("aac", "aac"), ("opus", "opus"),
+                           ("vorbis", "vorbis"), ("mp3", "mp3")):
+        if codec.startswith(prefix):
+            return family
+    return codec.split(".")[0]
+
+def _bitrate(fmt, key, duration):
+    """Débit (kbit/s) du flux : champ dédié, sinon tbr, sinon taille / durée."""
+    value = fmt.get(key) or fmt.get("tbr")
+    if value:
+        return float(value)
+    size = fmt.get("filesize") or fmt.get("filesize_approx")
+    if size and duration:
+        return size * 8 / duration / 1000
+    return 0.0
+
+def _size(fmt, bitrate, duration):
+    """(octets, exact) : filesize exact, sinon filesize_approx, sinon débit × durée."""
+    if fmt.get("filesize"):
+        return float(fmt["filesize"]), True
+    if fmt.get("filesize_approx"):
+        return float(fmt["filesize_approx"]), False
+    if bitrate and duration:
+        return bitrate * 1000 / 8 * duration, False
+    return None, False
+
+def format_size(formats, format_id, duration=None):
+    """
+    Taille (octets, exact) d'un format ou d'une combinaison "vidéo+audio"
+    (somme des flux). (None, False) si un flux est inconnu ou sans taille.
+    """
+    by_id = {f.get("format_id"): f for f in formats}
+    total, exact = 0.0, True
+    for part in format_id.split("+"):
+        fmt = by_id.get(part.strip())
+        if fmt is None:
+            return None, False
+        key = "tbr" if codec_family(fmt.get("vcodec")) and codec_family(fmt.get("acodec")) else (
+            "vbr" if codec_family(fmt.get("vcodec")) else "abr")
+        size, part_exact = _size(fmt, _bitrate(fmt, key, duration), duration)
+        if size is None:
+            return None, False
+        total += size
+        exact = exact and part_exact
+    return total, exact
+
+def split_formats(formats):
+    """(vidéo seule, audio seul, muxés), sans storyboards ni images."""
+    videos, audios, muxed = [], [], []
+    for fmt in formats:
+        if fmt.get("ext") == "mhtml" or "storyboard" in (fmt.get("format_note") or "").lower():
+            continue
+        vcodec, acodec = codec_family(fmt.get("vcodec")), codec_family(fmt.get("acodec"))
+        if vcodec and acodec:
+            muxed.append(fmt)
+        elif vcodec:
+            videos.append(fmt)
+        elif acodec:
+            audios.append(fmt)
+    return videos, audios, muxed
+
+def audio_quality(fmt, duration=None):
+    return _bitrate(fmt, "abr", duration) / AUDIO_CODEC_EFFICIENCY.get(codec_family(fmt.get("acodec")), 1.0)
+
+def rank_audio_formats(formats, duration=None, audio_codecs=None):
+    """Flux audio du meilleur au moins bon (qualité équivalente AAC)."""
+    _, audios, _ = split_formats(formats)
+    if audio_codecs:
+        audios = [a for a in audios if codec_family(a.get("acodec")) in audio_codecs]
+    return sorted(audios, key=lambda a: audio_quality(a, duration), reverse=True)
+
+def audio_extension(formats, format_id):
+    """Extension du flux audio `format_id` une fois extrait tel quel (m4a par défaut)."""
+    for fmt in formats:
+        if fmt.get("format_id") == format_id:
+            return AUDIO_EXTENSIONS.get(codec_family(fmt.get("acodec")), "m4a")
+    return "m4a"
+
+def audio_format_list(formats, duration=None):
+    """[(id, description)] pour l'export audio, le meilleur en premier."""
+    items = []
+    for fmt in rank_audio_formats(formats, duration):
+        abr = _bitrate(fmt, "abr", duration)
+        desc = " ".join(str(part) for part in (
+            fmt.get("ext"), f"{abr:.0f}k" if abr else None, codec_family(fmt.get("acodec")),
+            fmt.get("language"), fmt.get("format_note")) if part)
+        items.append((fmt["format_id"], f"{fmt['format_id']} | {desc}"))
+    return items
+
+def _candidate(fmt_id, width, height, fps, vcodec, acodec, ext, bitrate, quality, size, exact):
+    return {
+        "id": fmt_id,
+        "width": width,
+        "height": height,
+        "fps": fps,
+        "tbr": int(round(bitrate)),
+        "vcodec": vcodec,
+        "acodec": acodec,
+        "ext": ext,
+        "quality": quality,
+        "filesize": size,
+        "filesize_exact": exact,
+    }
+
+def video_candidates(formats, duration=None, video_codecs=None, audio_codecs=None):
+    """Tous les couples (vidéo + meilleur audio) et formats muxés, avec débit, qualité et taille."""
+    videos, _, muxed = split_formats(formats)
+    audios = rank_audio_formats(formats, duration, audio_codecs)
+    best_audio = audios[0] if audios else None
+    audio_bitrate = _bitrate(best_audio, "abr", duration) if best_audio else 0.0
+    audio_size, audio_exact = _size(best_audio, audio_bitrate, duration) if best_audio else (None, False)
+    audio_q = audio_quality(best_audio, duration) if best_audio else 0.0
+    candidates = []
+    for fmt, is_muxed in [(v, False) for v in videos] + [(m, True) for m in muxed]:
+        if not fmt.get("width") or not fmt.get("height"):
+            continue
+        vcodec = codec_family(fmt.get("vcodec"))
+        if video_codecs and vcodec not in video_codecs:
+            continue
+        if is_muxed and audio_codecs and codec_family(fmt.get("acodec")) not in audio_codecs:
+            continue
+        fps = int(round(fmt.get("fps") or 30))
+        bitrate = _bitrate(fmt, "tbr" if is_muxed else "vbr", duration)
+        quality = bitrate / VIDEO_CODEC_EFFICIENCY.get(vcodec, 1.0)
+        size, exact = _size(fmt, bitrate, duration)
+        if is_muxed:
+            candidates.append(_candidate(fmt["format_id"], fmt["width"], fmt["height"], fps, vcodec,
+                                         codec_family(fmt.get("acodec")), fmt.get("ext"), bitrate, quality,
+                                         size, exact))
+        elif best_audio:
+            total_size = size + audio_size if size is not None and audio_size is not None else None
+            candidates.append(_candidate(f"{fmt['format_id']}+{best_audio['format_id']}", fmt["width"],
+                                         fmt["height"], fps, vcodec, codec_family(best_audio.get("acodec")),
+                                         fmt.get("ext"), bitrate + audio_bitrate, quality + audio_q,
+                                         total_size, exact and audio_exact))
+    return candidates
+
+def select_video_formats(formats, duration=None, codecs="all", quality_target=QUALITY_TARGET):
+    """
+    Un format par définition (largeur, hauteur, fps), de la plus petite à la
+    plus grande : le moins coûteux parmi ceux dont la qualité atteint
+    quality_target de la meilleure qualité de cette définition.
+    """
+    video_codecs, audio_codecs = CODEC_PREFERENCES.get(codecs, (None, None))
+    groups = {}
+    for cand in video_candidates(formats, duration, video_codecs, audio_codecs):
+        groups.setdefault((cand["width"], cand["height"], cand["fps"]), []).append(cand)
+    selected = []
+    for key in sorted(groups, key=lambda k: (min(k[0], k[1]), k[2])):
+        group = groups[key]
+        best_quality = max(c["quality"] for c in group)
+        eligible = [c for c in group if c["quality"] >= best_quality * quality_target]
+        # Coût : taille estimée (octets) si connue pour tous, sinon le débit
+        if all(c["filesize"] is not None for c in eligible):
+            selected.append(min(eligible, key=lambda c: (c["filesize"], -c["quality"])))
+        else:
+            selected.append(min(eligible, key=lambda c: (c["tbr"], -c["quality"])))
+    return selected
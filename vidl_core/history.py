@@ -0,0 +1,372 @@
+"""
+Historique des téléchargements : stockage SQLite et index de recherche.
+"""
+
+import heapq
+import json
+import os
+import re
+import sqlite3
+import sys
+import threading
+
+from .urls import media_key
+from .utils import normalize_search_text
+
+# ---------------------------------------------------------
+# History search index
+# ---------------------------------------------------------
+# Filtres reconnus dans la recherche : "channel:xyz format:mp3 after:2025-01-01"
+HISTORY_FILTER_ALIASES = {
+    "channel": "channel", "chaine": "channel",
+    "format": "format",
+    "after": "after", "from": "after", "depuis": "after",
+    "before": "before", "to": "before", "avant": "before",
+}
+_history_filter_regex = re.compile(r'(\w+):("[^"]*"|\S+)')
+
+def parse_history_query(query):
+    """
+    Sépare une requête de recherche en termes libres et filtres.
+    Retourne (liste de termes normalisés, dict de filtres).
+    """
+    filters = {}
+    def take_filter(match):
+        key = HISTORY_FILTER_ALIASES.get(normalize_search_text(match.group(1)))
+        if not key:
+            return match.group(0)
+        filters[key] = normalize_search_text(match.group(2).strip('"'))
+        return " "
+    rest = _history_filter_regex.sub(take_filter, query or "")
+    terms = normalize_search_text(rest).split()
+    return terms, filters
+
+class HistorySearchIndex:
+    """
+    Index de recherche de l'historique : trigrammes pour les termes de 3
+    caractères ou plus ; les termes plus courts sont cherchés en sous-chaîne
+    parmi les candidats des autres termes (ou tout l'historique).
+    Mis à jour incrémentalement (add/remove), aucune reconstruction complète
+    n'est nécessaire après un ajout ou une suppression.
+    """
+    def __init__(self):
+        self.docs = {}        # doc_id -> (titre, url, chaîne, format, jour)
+        self.trigrams = {}    # trigramme -> {doc_id}
+
+    def __len__(self):
+        return len(self.docs)
+
+    @staticmethod
+    def _keys(doc):
+        grams = set()
+        for text in doc[:3]:
+            grams.update(text[i:i + 3] for i in range(len(text) - 2))
+        return grams
+
+    def add(self, doc_id, entry):
+        if doc_id in self.docs:
+            self.remove(doc_id)
+        date = entry.get("download_date", "") or ""
+        doc = (
+            normalize_search_text(entry.get("title", "")),
+            normalize_search_text(entry.get("url", "")),
+            normalize_search_text(entry.get("channel", "")),
+            (entry.get("export_type") or "").lower(),
+            date.split()[0] if date else "",
+        )
+        self.docs[doc_id] = doc
+        for g in self._keys(doc):
+            self.trigrams.setdefault(g, set()).add(doc_id)
+
+    def remove(self, doc_id):
+        doc = self.docs.pop(doc_id, None)
+        if doc is None:
+            return
+        for g in self._keys(doc):
+            ids = self.trigrams.get(g)
+            if ids is not None:
+                ids.discard(doc_id)
+                if not ids:
+                    del self.trigrams[g]
+
+    def clear(self):
+        self.docs.clear()
+        self.trigrams.clear()
+
+    def _candidates(self, term):
+        postings = []
+        for i in range(len(term) - 2):
+            ids = self.trigrams.get(term[i:i + 3])
+            if not ids:
+                return set()
+            postings.append(ids)
+        postings.sort(key=len)
+        result = postings[0]
+        for ids in postings[1:]:
+            result = result & ids
+            if not result:
+                break
+        return result
+
+    @staticmethod
+    def _matches_filters(doc, filters):
+        if "channel" in filters and filters["channel"] not in doc[2]:
+            return False
+        if "format" in filters and filters["format"] != doc[3]:
+            return False
+        if "after" in filters and doc[4] < filters["after"]:
+            return False
+        if "before" in filters and (not doc[4] or doc[4] > filters["before"]):
+            return False
+        return True
+
+    @staticmethod
+    def _score(doc, terms):
+        title = doc[0]
+        score = 0
+        for term in terms:
+            pos = title.find(term)
+            if pos == 0:
+                score += 4
+            elif pos > 0:
+                score += 3 if not title[pos - 1].isalnum() else 2
+            elif term in doc[2]:
+                score += 1
+        return score
+
+    def search(self, query, limit=None):
+        """
+        Retourne les doc_id correspondant à la requête, classés par
+        pertinence puis du plus récent au plus ancien.
+        """
+        terms, filters = parse_history_query(query)
+        # Seuls les termes de 3 caractères ou plus passent par les trigrammes ;
+        # les plus courts sont vérifiés en sous-chaîne ci-dessous, comme les autres
+        candidates = None
+        for term in sorted((t for t in terms if len(t) >= 3), key=len, reverse=True):
+            ids = self._candidates(term)
+            candidates = ids if candidates is None else candidates & ids
+            if not candidates:
+                return []
+        if candidates is None:
+            candidates = self.docs.keys()
+        docs = self.docs
+        results = []
+        for doc_id in candidates:
+            doc = docs[doc_id]
+            # Vérifie la sous-chaîne : les trigrammes seuls peuvent donner des faux positifs
+            if all(t in doc[0] or t in doc[1] or t in doc[2] for t in terms) \
+                    and (not filters or self._matches_filters(doc, filters)):
+                results.append((self._score(doc, terms), doc_id))
+        if limit is not None:
+            return [doc_id for _, doc_id in heapq.nlargest(limit, results)]
+        results.sort(reverse=True)
+        return [doc_id for _, doc_id in results]
+
+# ---------------------------------------------------------
+# History store (SQLite, WAL)
+# ---------------------------------------------------------
+HISTORY_COLUMNS = ("title", "url", "video_id", "thumbnail_url", "channel",
+                   "export_type", "file_path", "download_date")
+HISTORY_PAGE_SIZE = 50
+
+class HistoryStore:
+    """
+    Historique des téléchargements dans une base SQLite en mode WAL.
+    Chaque ajout/suppression est une petite transaction : plus de réécriture
+    complète du fichier, et un crash ne peut pas tronquer l'historique.
+    L'ancien history.json est importé une seule fois (il n'est pas supprimé).
+    Plusieurs processus (interface, CLI, démon) peuvent écrire dans la même
+    base : les ajouts prennent le verrou d'écriture SQLite (BEGIN IMMEDIATE).
+    """
+    SCHEMA_VERSION = 2
+
+    def __init__(self, db_path, legacy_json_path=None):
+        self.db_path = db_path
+        self.lock = threading.RLock()
+        # Index de dédoublonnage : (type, clé, jour) -> {id}, construit au premier besoin
+        self.dedupe = None
+        self.dedupe_last_id = 0
+        self.conn = sqlite3.connect(db_path, timeout=10, check_same_thread=False)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self._init_schema(legacy_json_path)
+
+    def _init_schema(self, legacy_json_path):
+        with self.lock, self.conn:
+            version = self.conn.execute("PRAGMA user_version").fetchone()[0]
+            if version >= self.SCHEMA_VERSION:
+                return
+            if version < 1:
+                self.conn.execute(
+                    "CREATE TABLE IF NOT EXISTS history ("
+                    " id INTEGER PRIMARY KEY AUTOINCREMENT,"
+                    " title TEXT, url TEXT, video_id TEXT, thumbnail_url TEXT,"
+                    " channel TEXT, export_type TEXT, file_path TEXT,"
+                    " download_date TEXT, day TEXT)"
+                )
+                self.conn.execute("CREATE INDEX IF NOT EXISTS idx_history_url ON history(url)")
+                self.conn.execute("CREATE INDEX IF NOT EXISTS idx_history_video_id ON history(video_id)")
+                self.conn.execute("CREATE INDEX IF NOT EXISTS idx_history_day ON history(day)")
+            if version < 2:
+                # v2 : clé canonique de la vidéo (voir media_key)
+                self.conn.execute("ALTER TABLE history ADD COLUMN media_key TEXT")
+                rows = self.conn.execute("SELECT id, url FROM history").fetchall()
+                self.conn.executemany(
+                    "UPDATE history SET media_key = ? WHERE id = ?",
+                    [(media_key(r["url"] or ""), r["id"]) for r in rows]
+                )
+                self.conn.execute("CREATE INDEX IF NOT EXISTS idx_history_media_key ON history(media_key)")
+            if version < 1 and legacy_json_path and os.path.exists(legacy_json_path):
+                try:
+                    with open(legacy_json_path, "r", encoding="utf-8") as f:
+                        legacy = json.load(f)
+                    self.conn.executemany(self._insert_sql(), [self._row_values(e) for e in legacy])
+                except Exception as e:
+                    print("Error migrating history.json:", e, file=sys.stderr)
+            self.conn.execute(f"PRAGMA user_version = {self.SCHEMA_VERSION}")
+
+    @staticmethod
+    def _insert_sql():
+        columns = ", ".join(HISTORY_COLUMNS + ("day", "media_key"))
+        placeholders = ", ".join("?" * (len(HISTORY_COLUMNS) + 2))
+        return f"INSERT INTO history ({columns}) VALUES ({placeholders})"
+
+    @staticmethod
+    def _row_values(entry):
+        date = entry.get("download_date") or ""
+        return tuple(entry.get(col) for col in HISTORY_COLUMNS) + (
+            date.split()[0] if date else "", media_key(entry.get("url") or ""))
+
+    @staticmethod
+    def _row_to_entry(row):
+        entry = {col: row[col] for col in HISTORY_COLUMNS if row[col] is not None}
+        entry["id"] = row["id"]
+        return entry
+
+    @staticmethod
+    def _dedupe_keys(entry):
+        """
+        Clés de dédoublonnage : une même vidéo (clé canonique) ou un même titre
+        n'est enregistré qu'une fois par jour.
+        """
+        date = entry.get("download_date") or ""
+        day = date.split()[0] if date else ""
+        key = entry.get("media_key") or media_key(entry.get("url") or "")
+        return [("media", key, day), ("title", entry.get("title") or "", day)]
+
+    def _index_dedupe(self, doc_id, entry):
+        for key in self._dedupe_keys(entry):
+            self.dedupe.setdefault(key, set()).add(doc_id)
+        self.dedupe_last_id = max(self.dedupe_last_id, doc_id)
+
+    def rebuild_dedupe_index(self):
+        with self.lock:
+            self.dedupe = {}
+            self.dedupe_last_id = 0
+            self._catch_up_dedupe()
+
+    def _catch_up_dedupe(self):
+        """Indexe les entrées ajoutées depuis (par ce processus ou un autre)."""
+        rows = self.conn.execute(
+            "SELECT id, title, media_key, download_date FROM history WHERE id > ?", (self.dedupe_last_id,)
+        )
+        for r in rows:
+            self._index_dedupe(r["id"], dict(r))
+
+    def has_duplicate(self, entry):
+        """Même vidéo ou même titre déjà enregistré le même jour ?"""
+        with self.lock:
+            if self.dedupe is None:
+                self.rebuild_dedupe_index()
+            return any(key in self.dedupe for key in self._dedupe_keys(entry))
+
+    def add(self, entry):
+        """
+        Ajoute une entrée et retourne son identifiant, ou None si c'est un
+        doublon du même jour.
+        """
+        added = self.add_many([entry])
+        return added[0][0] if added else None
+
+    def add_many(self, entries):
+        """
+        Ajoute plusieurs entrées en une seule transaction (import de playlist,
+        lot de téléchargements). Les doublons, y compris à l'intérieur du lot,
+        sont ignorés. Retourne la liste des (id, entrée) ajoutées.
+        """
+        added = []
+        with self.lock, self.conn:
+            # Verrou d'écriture pris avant la vérification des doublons : un
+            # autre processus ne peut pas insérer la même vidéo entre les deux
+            self.conn.execute("BEGIN IMMEDIATE")
+            if self.dedupe is not None:
+                self._catch_up_dedupe()
+            for entry in entries:
+                if self.has_duplicate(entry):
+                    continue
+                cur = self.conn.execute(self._insert_sql(), self._row_values(entry))
+                self._index_dedupe(cur.lastrowid, entry)
+                added.append((cur.lastrowid, entry))
+        return added
+
+    def delete_url(self, url):
+        """
+        Supprime toutes les entrées de la vidéo désignée par l'URL (quelle que
+        soit la forme de l'URL enregistrée) et retourne leurs identifiants.
+        """
+        key = media_key(url)
+        with self.lock, self.conn:
+            rows = self.conn.execute(
+                "SELECT id, title, media_key, download_date FROM history WHERE media_key = ?", (key,)
+            ).fetchall()
+            self.conn.execute("DELETE FROM history WHERE media_key = ?", (key,))
+            for r in rows if self.dedupe is not None else ():
+                for key in self._dedupe_keys(dict(r)):
+                    ids = self.dedupe.get(key)
+                    if ids is not None:
+                        ids.discard(r["id"])
+                        if not ids:
+                            del self.dedupe[key]
+        return [r["id"] for r in rows]
+
+    def clear(self):
+        with self.lock, self.conn:
+            self.conn.execute("DELETE FROM history")
+            self.dedupe = {}
+
+    def count(self):
+        with self.lock:
+            return self.conn.execute("SELECT COUNT(*) FROM history").fetchone()[0]
+
+    def page(self, offset=0, limit=HISTORY_PAGE_SIZE):
+        """Entrées de la plus récente à la plus ancienne, par pages."""
+        with self.lock:
+            rows = self.conn.execute(
+                "SELECT * FROM history ORDER BY id DESC LIMIT ? OFFSET ?", (limit, offset)
+            ).fetchall()
+        return [self._row_to_entry(r) for r in rows]
+
+    def get_many(self, ids):
+        """Entrées pour une liste d'identifiants, dans l'ordre demandé."""
+        if not ids:
+            return []
+        with self.lock:
+            rows = self.conn.execute(
+                f"SELECT * FROM history WHERE id IN ({', '.join('?' * len(ids))})", list(ids)
+            ).fetchall()
+        by_id = {r["id"]: self._row_to_entry(r) for r in rows}
+        return [by_id[i] for i in ids if i in by_id]
+
+    def rows_after(self, last_id, limit):
+        """Entrées d'identifiant > last_id, par ordre croissant (hydratation par lots)."""
+        with self.lock:
+            rows = self.conn.execute(
+                "SELECT * FROM history WHERE id > ? ORDER BY id LIMIT ?", (last_id, limit)
+            ).fetchall()
+        return [self._row_to_entry(r) for r in rows]
+
+    def close(self):
+        with self.lock:
+            self.conn.close()
@@ -0,0 +1,107 @@
+"""
+Instance unique de l'application : un fichier verrou désigne l'instance
+principale, qui écoute sur un socket Unix local. Un second lancement lui
+transmet ses URL et se termine au lieu de démarrer une nouvelle fenêtre.
+"""
+
+import json
+import os
+import socket
+import sys
+import threading
+import time
+
+from .utils import app_support_dir
+
+try:
+    import fcntl
+except ImportError:  # Windows : pas de détection d'instance unique
+    fcntl = None
+
+FORWARD_TIMEOUT_S = 2
+FORWARD_RETRY_S = 1.0
+
+class SingleInstance:
+    """
+    acquire() -> True pour l'instance principale (verrou obtenu).
+    serve(on_urls) : l'instance principale reçoit les URL transmises.
+    forward(urls) : un second lancement les envoie à l'instance principale.
+    """
+    def __init__(self, name="vidl", directory=None):
+        directory = directory or app_support_dir()
+        self.lock_path = os.path.join(directory, f"{name}.lock")
+        self.socket_path = os.path.join(directory, f"{name}.sock")
+        self.lock_file = None
+        self.server = None
+
+    def acquire(self):
+        if fcntl is None:
+            return True
+        self.lock_file = open(self.lock_path, "a")
+        try:
+            fcntl.flock(self.lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            self.lock_file.close()
+            self.lock_file = None
+            return False
+        return True
+
+    def serve(self, on_urls):
+        """
+        Écoute les URL transmises (thread en arrière-plan) ; on_urls(urls) est
+        appelé depuis ce thread, même avec une liste vide (« afficher la fenêtre »).
+        """
+        if fcntl is None:
+            return
+        if os.path.exists(self.socket_path):
+            os.remove(self.socket_path)
+        self.server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.server.bind(self.socket_path)
+        self.server.listen(8)
+        threading.Thread(target=self._accept_loop, args=(on_urls,), daemon=True).start()
+
+    def _accept_loop(self, on_urls):
+        while True:
+            try:
+                conn, _ = self.server.accept()
+            except OSError:
+                return  # socket fermé
+            try:
+                with conn, conn.makefile("rw", encoding="utf-8") as stream:
+                    message = json.loads(stream.readline() or "{}")
+                    on_urls([u for u in message.get("urls", []) if isinstance(u, str)])
+                    stream.write("ok\n")
+                    stream.flush()
+            except (OSError, ValueError) as e:
+                print("Error receiving forwarded URLs:", e, file=sys.stderr)
+
+    def forward(self, urls):
+        """
+        Transmet les URL à l'instance principale. Retourne False si elle ne
+        répond pas (elle peut être en train de démarrer : on réessaie
+        pendant FORWARD_RETRY_S).
+        """
+        deadline = time.monotonic() + FORWARD_RETRY_S
+        while True:
+            try:
+                with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as client:
+                    client.settimeout(FORWARD_TIMEOUT_S)
+                    client.connect(self.socket_path)
+                    with client.makefile("rw", encoding="utf-8") as stream:
+                        stream.write(json.dumps({"urls": list(urls)}) + "\n")
+                        stream.flush()
+                        return stream.readline().strip() == "ok"
+            except OSError:
+                if time.monotonic() >= deadline:
+                    return False
+                time.sleep(0.05)
+
+    def close(self):
+        if self.server is not None:
+            self.server.close()
+            self.server = None
+            if os.path.exists(self.socket_path):
+                os.remove(self.socket_path)
+        if self.lock_file is not None:
+            self.lock_file.close()
+            self.lock_file = None
@@ -0,0 +1,179 @@
+"""
+File d'attente persistante des tâches (téléchargements, conversions),
+stockée dans SQLite (mode WAL) : un redémarrage reprend les tâches en
+attente. Chaque changement d'état est aussi ajouté au journal job_events
+(jamais modifié ensuite).
+"""
+
+import datetime
+import json
+import sqlite3
+import threading
+
+QUEUED = "queued"
+RUNNING = "running"
+COMPLETED = "completed"
+FAILED = "failed"
+CANCELLED = "cancelled"
+ACTIVE_STATES = (QUEUED, RUNNING)
+
+def _now():
+    return datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+
+class JobStore:
+    """
+    Tâches persistantes. Chaque tâche a un type ("download", "convert"),
+    des paramètres (JSON), un état et un résultat.
+    """
+    SCHEMA_VERSION = 2
+
+    def __init__(self, db_path):
+        self.lock = threading.RLock()
+        self.conn = sqlite3.connect(db_path, timeout=10, check_same_thread=False)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self._init_schema()
+
+    def _init_schema(self):
+        with self.lock, self.conn:
+            version = self.conn.execute("PRAGMA user_version").fetchone()[0]
+            if version >= self.SCHEMA_VERSION:
+                return
+            if version < 1:
+                self.conn.execute(
+                    "CREATE TABLE IF NOT EXISTS jobs ("
+                    " id INTEGER PRIMARY KEY AUTOINCREMENT,"
+                    " kind TEXT, params TEXT, state TEXT, progress REAL DEFAULT 0,"
+                    " result TEXT, error TEXT, media_key TEXT,"
+                    " created TEXT, updated TEXT)"
+                )
+                self.conn.execute("CREATE INDEX IF NOT EXISTS idx_jobs_state ON jobs(state)")
+                self.conn.execute("CREATE INDEX IF NOT EXISTS idx_jobs_media_key ON jobs(media_key)")
+            if version < 2:
+                # v2 : journal des changements d'état
+                self.conn.execute(
+                    "CREATE TABLE IF NOT EXISTS job_events ("
+                    " id INTEGER PRIMARY KEY AUTOINCREMENT,"
+                    " job_id INTEGER, state TEXT, time TEXT, detail TEXT)"
+                )
+                self.conn.execute("CREATE INDEX IF NOT EXISTS idx_job_events_job ON job_events(job_id)")
+            self.conn.execute(f"PRAGMA user_version = {self.SCHEMA_VERSION}")
+
+    @staticmethod
+    def _row_to_job(row):
+        return {
+            "id": row["id"],
+            "kind": row["kind"],
+            "params": json.loads(row["params"] or "{}"),
+            "state": row["state"],
+            "progress": row["progress"],
+            "result": json.loads(row["result"]) if row["result"] else None,
+            "error": row["error"],
+            "media_key": row["media_key"],
+            "created": row["created"],
+            "updated": row["updated"],
+        }
+
+    def _log_event(self, job_id, state, now, detail=None):
+        self.conn.execute(
+            "INSERT INTO job_events (job_id, state, time, detail) VALUES (?, ?, ?, ?)",
+            (job_id, state, now, detail)
+        )
+
+    def submit(self, kind, params, key=None, state=QUEUED):
+        """Ajoute une tâche (en attente par défaut) et la retourne."""
+        with self.lock, self.conn:
+            now = _now()
+            cur = self.conn.execute(
+                "INSERT INTO jobs (kind, params, state, media_key, created, updated) VALUES (?, ?, ?, ?, ?, ?)",
+                (kind, json.dumps(params), state, key, now, now)
+            )
+            self._log_event(cur.lastrowid, state, now)
+            return self.get(cur.lastrowid)
+
+    def get(self, job_id):
+        with self.lock:
+            row = self.conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return self._row_to_job(row) if row else None
+
+    def find_active(self, key):
+        """Tâche en attente ou en cours pour la même vidéo (clé media_key)."""
+        if not key:
+            return None
+        with self.lock:
+            row = self.conn.execute(
+                "SELECT * FROM jobs WHERE media_key = ? AND state IN (?, ?) ORDER BY id LIMIT 1",
+                (key,) + ACTIVE_STATES
+            ).fetchone()
+        return self._row_to_job(row) if row else None
+
+    def list(self, state=None, limit=100, offset=0):
+        with self.lock:
+            if state:
+                rows = self.conn.execute(
+                    "SELECT * FROM jobs WHERE state = ? ORDER BY id DESC LIMIT ? OFFSET ?", (state, limit, offset)
+                ).fetchall()
+            else:
+                rows = self.conn.execute(
+                    "SELECT * FROM jobs ORDER BY id DESC LIMIT ? OFFSET ?", (limit, offset)
+                ).fetchall()
+        return [self._row_to_job(r) for r in rows]
+
+    def incomplete(self, kind=None):
+        """Tâches en attente ou interrompues en cours d'exécution, les plus anciennes d'abord."""
+        sql = "SELECT * FROM jobs WHERE state IN (?, ?)"
+        values = list(ACTIVE_STATES)
+        if kind:
+            sql += " AND kind = ?"
+            values.append(kind)
+        with self.lock:
+            rows = self.conn.execute(sql + " ORDER BY id", values).fetchall()
+        return [self._row_to_job(r) for r in rows]
+
+    def pending_ids(self):
+        """
+        Identifiants à (re)lancer au démarrage : tâches en attente et tâches
+        interrompues en cours d'exécution (remises en attente).
+        """
+        with self.lock, self.conn:
+            now = _now()
+            for r in self.conn.execute("SELECT id FROM jobs WHERE state = ?", (RUNNING,)).fetchall():
+                self._log_event(r[0], QUEUED, now, "interrupted")
+            self.conn.execute("UPDATE jobs SET state = ?, updated = ? WHERE state = ?", (QUEUED, now, RUNNING))
+            return [r[0] for r in self.conn.execute("SELECT id FROM jobs WHERE state = ? ORDER BY id", (QUEUED,))]
+
+    def history(self, job_id):
+        """Journal d'une tâche : [(état, date, détail)], dans l'ordre."""
+        with self.lock:
+            rows = self.conn.execute(
+                "SELECT state, time, detail FROM job_events WHERE job_id = ? ORDER BY id", (job_id,)
+            ).fetchall()
+        return [tuple(r) for r in rows]
+
+    def update(self, job_id, state=None, progress=None, result=None, error=None, params=None):
+        now = _now()
+        fields, values = ["updated = ?"], [now]
+        if state is not None:
+            fields.append("state = ?")
+            values.append(state)
+        if progress is not None:
+            fields.append("progress = ?")
+            values.append(progress)
+        if result is not None:
+            fields.append("result = ?")
+            values.append(json.dumps(result))
+        if error is not None:
+            fields.append("error = ?")
+            values.append(error)
+        if params is not None:
+            fields.append("params = ?")
+            values.append(json.dumps(params))
+        with self.lock, self.conn:
+            self.conn.execute(f"UPDATE jobs SET {', '.join(fields)} WHERE id = ?", values + [job_id])
+            if state is not None:
+                self._log_event(job_id, state, now, error)
+
+    def close(self):
+        with self.lock:
+            self.conn.close()
@@ -0,0 +1,150 @@
+"""
+Index de la bibliothèque locale : fichiers déjà téléchargés, par
+(vidéo, format, type d'export), avec taille et empreinte SHA-256.
+Un téléchargement déjà présent est évité, ou le fichier est lié (lien dur)
+dans le nouveau dossier de sortie.
+"""
+
+import datetime
+import hashlib
+import os
+import shutil
+import sqlite3
+import sys
+import threading
+
+from .download import is_auto_language, unique_output_path
+from .probe import probe
+from .urls import media_key
+
+CHECKSUM_CHUNK = 1024 * 1024
+
+def file_checksum(path):
+    """SHA-256 du fichier, lu par blocs."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(CHECKSUM_CHUNK), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def format_key(format_id, lang="Auto"):
+    """Le même format avec une autre langue audio est un autre fichier."""
+    return format_id if is_auto_language(lang) else f"{format_id}@{lang.strip()}"
+
+class MediaLibrary:
+    """
+    Fichiers téléchargés, indexés par (media_key, format, export_type).
+    Vérification : taille identique et date de modification inchangée, sinon
+    l'empreinte est recalculée et comparée.
+    """
+    SCHEMA_VERSION = 1
+
+    def __init__(self, db_path):
+        self.lock = threading.RLock()
+        self.conn = sqlite3.connect(db_path, timeout=10, check_same_thread=False)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self._init_schema()
+
+    def _init_schema(self):
+        with self.lock, self.conn:
+            version = self.conn.execute("PRAGMA user_version").fetchone()[0]
+            if version >= self.SCHEMA_VERSION:
+                return
+            self.conn.execute(
+                "CREATE TABLE IF NOT EXISTS library ("
+                " id INTEGER PRIMARY KEY AUTOINCREMENT,"
+                " media_key TEXT, format TEXT, export_type TEXT,"
+                " path TEXT UNIQUE, size INTEGER, mtime REAL, checksum TEXT, added TEXT)"
+            )
+            self.conn.execute("CREATE INDEX IF NOT EXISTS idx_library_key ON library(media_key, format, export_type)")
+            self.conn.execute(f"PRAGMA user_version = {self.SCHEMA_VERSION}")
+
+    def record(self, url, format_id, export_type, path, lang="Auto"):
+        """
+        Enregistre un fichier terminé (calcule son empreinte et l'analyse
+        ffprobe : à appeler hors du thread de l'interface).
+        """
+        path = os.path.abspath(path)
+        try:
+            stat = os.stat(path)
+            checksum = file_checksum(path)
+        except OSError as e:
+            print("Error indexing downloaded file:", e, file=sys.stderr)
+            return
+        with self.lock, self.conn:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO library (media_key, format, export_type, path, size, mtime, checksum, added)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (media_key(url), format_key(format_id, lang), export_type, path, stat.st_size, stat.st_mtime,
+                 checksum, datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S"))
+            )
+        # Analyse ffprobe mise en cache dès maintenant : remux et conversion la retrouvent
+        probe(path)
+
+    def _verify(self, row):
+        try:
+            stat = os.stat(row["path"])
+        except OSError:
+            return False
+        if stat.st_size != row["size"]:
+            return False
+        if stat.st_mtime == row["mtime"]:
+            return True
+        try:
+            if file_checksum(row["path"]) != row["checksum"]:
+                return False
+        except OSError:
+            return False
+        with self.lock, self.conn:
+            self.conn.execute("UPDATE library SET mtime = ? WHERE id = ?", (stat.st_mtime, row["id"]))
+        return True
+
+    def find(self, url, format_id, export_type, lang="Auto"):
+        """
+        Chemin d'un fichier déjà téléchargé et intact pour cette vidéo et ce
+        format, ou None. Les entrées dont le fichier a disparu ou changé sont
+        retirées de l'index.
+        """
+        with self.lock:
+            rows = self.conn.execute(
+                "SELECT * FROM library WHERE media_key = ? AND format = ? AND export_type = ? ORDER BY id DESC",
+                (media_key(url), format_key(format_id, lang), export_type)
+            ).fetchall()
+        for row in rows:
+            if self._verify(row):
+                return row["path"]
+            with self.lock, self.conn:
+                self.conn.execute("DELETE FROM library WHERE id = ?", (row["id"],))
+        return None
+
+    def place(self, existing_path, output_dir, title, ext, reserved=None):
+        """
+        Rend le fichier disponible dans output_dir : tel quel s'il y est déjà,
+        sinon par lien dur (copie si le lien est impossible, autre volume).
+        Retourne le chemin obtenu.
+        """
+        if os.path.dirname(os.path.abspath(existing_path)) == os.path.abspath(output_dir):
+            return existing_path
+        target = unique_output_path(output_dir, title, ext, reserved=reserved)
+        try:
+            os.link(existing_path, target)
+        except OSError:
+            shutil.copy2(existing_path, target)
+        # La nouvelle copie est indexée à son tour (même empreinte)
+        with self.lock, self.conn:
+            row = self.conn.execute("SELECT * FROM library WHERE path = ?",
+                                    (os.path.abspath(existing_path),)).fetchone()
+            if row is not None:
+                self.conn.execute(
+                    "INSERT OR REPLACE INTO library (media_key, format, export_type, path, size, mtime, checksum, added)"
+                    " VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                    (row["media_key"], row["format"], row["export_type"], os.path.abspath(target), row["size"],
+                     os.stat(target).st_mtime, row["checksum"], datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S"))
+                )
+        return target
+
+    def close(self):
+        with self.lock:
+            self.conn.close()
@@ -0,0 +1,35 @@
+"""
+Images d'aperçu des fichiers locaux (onglet Conversion) : extraites une
+fois par version de fichier, gardées en mémoire et sur disque.
+"""
+
+import os
+import threading
+
+from .conversion import extract_frame_jpeg
+from .probe import FileVersionCache
+from .utils import app_support_dir
+
+POSTER_MEMORY_SIZE = 64
+POSTER_DISK_SIZE = 1000
+
+class PosterService(FileVersionCache):
+    """get(path) / submit(path) : image d'aperçu en octets JPEG, ou None."""
+    table = "posters"
+    label = "poster frame"
+
+    def __init__(self, db_path=None, max_size=POSTER_MEMORY_SIZE, disk_size=POSTER_DISK_SIZE):
+        super().__init__(db_path, max_size=max_size, disk_size=disk_size)
+
+    def compute(self, path, variant):
+        return extract_frame_jpeg(path)
+
+_shared = None
+_shared_lock = threading.Lock()
+
+def shared_poster_service():
+    global _shared
+    with _shared_lock:
+        if _shared is None:
+            _shared = PosterService(os.path.join(app_support_dir(), "posters.db"))
+        return _shared
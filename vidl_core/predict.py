@@ -0,0 +1,120 @@
+"""
+Prévision de la taille et de la durée d'une conversion avant de la lancer :
+quelques courts extraits répartis dans le fichier sont encodés avec les
+réglages choisis, puis le résultat est extrapolé à la durée totale.
+"""
+
+import json
+import os
+import shutil
+import tempfile
+import threading
+import time
+
+from .autotune import resolve_auto_options
+from .conversion import DEFAULT_CONVERSION_OPTIONS, VIDEO_OUTPUT_FORMATS, FFmpegTask, conversion_output_args
+from .probe import FileVersionCache, probe, probe_duration, streams_of
+from .twopass import MIN_VIDEO_KBPS, parse_kbps, target_video_kbps
+from .utils import app_support_dir
+
+SAMPLE_COUNT = 3
+SAMPLE_S = 4.0
+
+def sample_windows(duration, count=SAMPLE_COUNT, length=SAMPLE_S):
+    """
+    [(début, durée)] : `count` extraits centrés dans des parts égales du
+    fichier (générique et fin exclus d'office). Un fichier trop court est
+    encodé en entier.
+    """
+    if duration <= count * length * 2:
+        return [(0.0, duration)]
+    return [(duration * (i + 0.5) / count - length / 2, length) for i in range(count)]
+
+def sample_command(input_path, output_path, options, start, length):
+    """Commande de conversion limitée à un extrait (recherche côté entrée)."""
+    return ["ffmpeg", "-y", "-ss", f"{start:.3f}", "-t", f"{length:.3f}", "-i", input_path] + \
+        conversion_output_args(options) + [output_path]
+
+def predict_conversion(input_path, options, count=SAMPLE_COUNT, length=SAMPLE_S):
+    """
+    Encode les extraits et extrapole : {"size" (octets), "seconds" (temps
+    d'encodage), "speed" (× temps réel), "samples", "sampled"}. None si la
+    durée est inconnue ou si un extrait échoue.
+    """
+    # Encodeur "auto" : la prévision porte sur le couple qui serait choisi
+    opts, _ = resolve_auto_options(input_path, dict(DEFAULT_CONVERSION_OPTIONS, **options))
+    info = probe(input_path)
+    duration = probe_duration(info)
+    if not duration:
+        return None
+    two_pass = bool(opts.get("target_size_mb")) and opts["format"].lower() in VIDEO_OUTPUT_FORMATS
+    if two_pass:
+        # Taille visée : les extraits sont encodés au débit que calculera TwoPassEncodeTask
+        audio_kbps = parse_kbps(opts["audio_bitrate"]) if streams_of(info, "audio") else 0.0
+        target = int(float(opts["target_size_mb"]) * 1024 * 1024)
+        video_kbps = max(target_video_kbps(target, duration, audio_kbps), MIN_VIDEO_KBPS)
+        opts["video_bitrate"] = f"{video_kbps:.0f}k"
+    windows = sample_windows(duration, count, length)
+    ext = opts["format"].lower()
+    work_dir = tempfile.mkdtemp(prefix="vidl-predict-")
+    try:
+        size, seconds, sampled = 0, 0.0, 0.0
+        for i, (start, span) in enumerate(windows):
+            output_path = os.path.join(work_dir, f"sample{i}.{ext}")
+            task = FFmpegTask(sample_command(input_path, output_path, opts, start, span), duration=span)
+            started = time.monotonic()
+            if task.run() != 0 or not os.path.exists(output_path):
+                return None
+            seconds += time.monotonic() - started
+            size += os.path.getsize(output_path)
+            sampled += span
+        scale = duration / sampled
+        if two_pass:
+            # Deux passes : au plus deux fois le temps d'une passe (la première est plus rapide)
+            size, seconds = target / scale, seconds * 2
+        return {
+            "size": int(size * scale),
+            "seconds": seconds * scale,
+            "speed": sampled / seconds if seconds else None,
+            "samples": len(windows),
+            "sampled": sampled,
+        }
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+def settings_key(options):
+    """Variante de cache : les réglages complets, dans un ordre stable."""
+    return json.dumps(dict(DEFAULT_CONVERSION_OPTIONS, **options), sort_keys=True)
+
+class PredictionService(FileVersionCache):
+    """
+    estimate(path, options) / submit_estimate(path, options) : prévision en
+    cache par (version du fichier, réglages).
+    """
+    table = "predictions"
+    label = "conversion estimate"
+
+    def compute(self, path, variant):
+        return predict_conversion(path, json.loads(variant))
+
+    def dumps(self, value):
+        return json.dumps(value)
+
+    def loads(self, data):
+        return json.loads(data)
+
+    def estimate(self, path, options):
+        return self.get(path, settings_key(options))
+
+    def submit_estimate(self, path, options):
+        return self.submit(path, settings_key(options))
+
+_shared = None
+_shared_lock = threading.Lock()
+
+def shared_prediction_service():
+    global _shared
+    with _shared_lock:
+        if _shared is None:
+            _shared = PredictionService(os.path.join(app_support_dir(), "predictions.db"))
+        return _shared
@@ -0,0 +1,241 @@
+"""
+Analyse ffprobe des fichiers locaux, une seule fois par version de
+fichier : le résultat est mis en cache en mémoire et sur disque (SQLite),
+indexé par (chemin, taille, date de modification). Durée, informations
+affichées, décisions de remux et bibliothèque lisent toutes ce cache.
+"""
+
+import collections
+import concurrent.futures
+import datetime
+import json
+import os
+import sqlite3
+import subprocess
+import sys
+import threading
+
+from .utils import app_support_dir
+
+PROBE_MEMORY_SIZE = 256
+# Analyses conservées sur disque (les plus anciennes sont purgées)
+PROBE_DISK_SIZE = 5000
+
+def file_version(path):
+    """(chemin absolu, taille, mtime en ns), ou None si le fichier est introuvable."""
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return os.path.abspath(path), stat.st_size, stat.st_mtime_ns
+
+def run_ffprobe(path):
+    """Sortie JSON complète de ffprobe (format et flux)."""
+    cmd = ["ffprobe", "-v", "error", "-show_format", "-show_streams", "-of", "json", path]
+    result = subprocess.run(cmd, capture_output=True, text=True, check=True)
+    return json.loads(result.stdout)
+
+class FileVersionCache:
+    """
+    Résultats calculés une fois par version de fichier (chemin, taille,
+    date de modification) et par variante (chaîne libre, par exemple des
+    réglages), en mémoire (LRU) et sur disque (table `table` d'une base
+    SQLite ; db_path None : mémoire seulement). Deux demandes simultanées
+    pour le même fichier partagent le même calcul ; submit() calcule sur un
+    thread à part et retourne un Future. Les sous-classes définissent
+    compute(path, variant) et, si besoin, dumps / loads.
+    """
+    SCHEMA_VERSION = 2
+    table = "results"
+    label = "file"
+
+    def __init__(self, db_path=None, max_size=PROBE_MEMORY_SIZE, disk_size=PROBE_DISK_SIZE):
+        self.max_size = max_size
+        self.disk_size = disk_size
+        self.items = collections.OrderedDict()
+        self.pending = {}
+        self.lock = threading.Lock()
+        self.executor = concurrent.futures.ThreadPoolExecutor(max_workers=2)
+        self.conn = None
+        if db_path:
+            try:
+                self.conn = sqlite3.connect(db_path, timeout=10, check_same_thread=False)
+                self.conn.execute("PRAGMA journal_mode=WAL")
+                self.conn.execute("PRAGMA synchronous=NORMAL")
+                self._init_schema()
+            except sqlite3.Error as e:
+                print(f"Error opening {self.label} cache:", e, file=sys.stderr)
+                self.conn = None
+
+    def _init_schema(self):
+        with self.lock, self.conn:
+            version = self.conn.execute("PRAGMA user_version").fetchone()[0]
+            if version >= self.SCHEMA_VERSION:
+                return
+            # Version 2 : colonne variant (le cache est simplement vidé)
+            self.conn.execute(f"DROP TABLE IF EXISTS {self.table}")
+            self.conn.execute(
+                f"CREATE TABLE {self.table} ("
+                " path TEXT, variant TEXT, size INTEGER, mtime_ns INTEGER, data BLOB, probed TEXT,"
+                " PRIMARY KEY (path, variant))"
+            )
+            self.conn.execute(f"CREATE INDEX IF NOT EXISTS idx_{self.table}_probed ON {self.table}(probed)")
+            self.conn.execute(f"PRAGMA user_version = {self.SCHEMA_VERSION}")
+
+    def compute(self, path, variant):
+        raise NotImplementedError
+
+    def dumps(self, value):
+        return value
+
+    def loads(self, data):
+        return data
+
+    def _key(self, path, variant):
+        version = file_version(path)
+        return None if version is None else version + (variant,)
+
+    def cached(self, path, variant=""):
+        """Résultat en cache pour la version actuelle du fichier, sans le recalculer."""
+        version = self._key(path, variant)
+        if version is None:
+            return None
+        with self.lock:
+            value = self.items.get(version)
+            if value is not None:
+                self.items.move_to_end(version)
+                return value
+        value = self._load(version)
+        if value is not None:
+            self._remember(version, value)
+        return value
+
+    def get(self, path, variant=""):
+        """Résultat pour le fichier (cache, sinon calcul) ; None en cas d'échec."""
+        value = self.cached(path, variant)
+        if value is not None:
+            return value
+        version = self._key(path, variant)
+        if version is None:
+            print(f"Error reading {self.label}: file not found:", path, file=sys.stderr)
+            return None
+        with self.lock:
+            future = self.pending.get(version)
+            owner = future is None
+            if owner:
+                future = self.pending[version] = concurrent.futures.Future()
+        if not owner:
+            return future.result()
+        value = None
+        try:
+            value = self.compute(path, variant)
+        except Exception as e:
+            print(f"Error reading {self.label}:", e, file=sys.stderr)
+        if value is not None:
+            self._remember(version, value)
+            self._store(version, value)
+        with self.lock:
+            self.pending.pop(version, None)
+        future.set_result(value)
+        return value
+
+    def submit(self, path, variant=""):
+        """Calcul en arrière-plan ; Future dont le résultat est celui de get()."""
+        return self.executor.submit(self.get, path, variant)
+
+    def _remember(self, version, value):
+        with self.lock:
+            self.items[version] = value
+            self.items.move_to_end(version)
+            while len(self.items) > self.max_size:
+                self.items.popitem(last=False)
+
+    def _load(self, version):
+        if self.conn is None:
+            return None
+        path, size, mtime_ns, variant = version
+        try:
+            with self.lock:
+                row = self.conn.execute(f"SELECT size, mtime_ns, data FROM {self.table} WHERE path = ? AND variant = ?",
+                                        (path, variant)).fetchone()
+        except sqlite3.Error as e:
+            print(f"Error reading {self.label} cache:", e, file=sys.stderr)
+            return None
+        if row is None or (row[0], row[1]) != (size, mtime_ns):
+            return None
+        try:
+            return self.loads(row[2])
+        except ValueError:
+            return None
+
+    def _store(self, version, value):
+        if self.conn is None:
+            return
+        path, size, mtime_ns, variant = version
+        try:
+            with self.lock, self.conn:
+                self.conn.execute(
+                    f"INSERT OR REPLACE INTO {self.table} (path, variant, size, mtime_ns, data, probed)"
+                    " VALUES (?, ?, ?, ?, ?, ?)",
+                    (path, variant, size, mtime_ns, self.dumps(value),
+                     datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S"))
+                )
+                self.conn.execute(
+                    f"DELETE FROM {self.table} WHERE rowid NOT IN"
+                    f" (SELECT rowid FROM {self.table} ORDER BY probed DESC LIMIT ?)",
+                    (self.disk_size,)
+                )
+        except sqlite3.Error as e:
+            print(f"Error writing {self.label} cache:", e, file=sys.stderr)
+
+    def close(self):
+        self.executor.shutdown(wait=False)
+        if self.conn is not None:
+            with self.lock:
+                self.conn.close()
+                self.conn = None
+
+class ProbeService(FileVersionCache):
+    """
+    probe(path) : dict ffprobe {"format": ..., "streams": [...]} ou None.
+    Un fichier modifié (taille ou date) est réanalysé.
+    """
+    table = "probes"
+    label = "media file probe"
+
+    def compute(self, path, variant):
+        return run_ffprobe(path)
+
+    def dumps(self, value):
+        return json.dumps(value)
+
+    def loads(self, data):
+        return json.loads(data)
+
+    def probe(self, path):
+        return self.get(path)
+
+_shared = None
+_shared_lock = threading.Lock()
+
+def shared_probe_service():
+    """Service partagé par tout le processus, cache disque dans le dossier de l'application."""
+    global _shared
+    with _shared_lock:
+        if _shared is None:
+            _shared = ProbeService(os.path.join(app_support_dir(), "probes.db"))
+        return _shared
+
+def probe(path):
+    return shared_probe_service().get(path)
+
+def streams_of(info, codec_type):
+    """Flux d'un type ("video", "audio"), sans les pochettes (attached_pic)."""
+    return [st for st in (info or {}).get("streams", []) if st.get("codec_type") == codec_type
+            and not (st.get("disposition") or {}).get("attached_pic")]
+
+def probe_duration(info):
+    try:
+        return float(info["format"]["duration"])
+    except (KeyError, TypeError, ValueError):
+        return None
@@ -0,0 +1,30 @@
+"""
+Choix de la tâche de conversion d'un fichier selon ses options : chaque
+mode (encodeur automatique, taille visée, segments, commande simple) vit
+dans son module ; ce module ne fait que les aiguiller.
+"""
+
+from .autotune import AutoEncodeTask
+from .chunked import ChunkedEncodeTask
+from .conversion import (AUTO_ENCODER, DEFAULT_CONVERSION_OPTIONS, VIDEO_OUTPUT_FORMATS, FFmpegTask, audio_encode_args,
+                         build_conversion_command, container_args, video_encode_args)
+from .twopass import TwoPassEncodeTask
+
+def conversion_task(input_path, output_path, options, duration=None, on_event=None):
+    """
+    Tâche de conversion selon les options : AutoEncodeTask si l'encodeur
+    est "auto" (il choisit l'encodeur puis rappelle conversion_task),
+    TwoPassEncodeTask si une taille est visée, ChunkedEncodeTask si
+    options["chunked"] (sortie vidéo toutes trois), sinon FFmpegTask.
+    """
+    opts = dict(DEFAULT_CONVERSION_OPTIONS, **options)
+    if opts["video_encoder"] == AUTO_ENCODER and opts["format"].lower() in VIDEO_OUTPUT_FORMATS:
+        return AutoEncodeTask(input_path, output_path, opts, conversion_task, duration=duration, on_event=on_event)
+    if opts.get("target_size_mb") and opts["format"].lower() in VIDEO_OUTPUT_FORMATS:
+        return TwoPassEncodeTask(input_path, output_path, opts, duration=duration, on_event=on_event)
+    if opts.get("chunked") and opts["format"].lower() in VIDEO_OUTPUT_FORMATS:
+        return ChunkedEncodeTask(input_path, output_path, video_encode_args(opts), audio_encode_args(opts),
+                                 container_args(opts), duration=duration, threads=opts.get("threads"),
+                                 on_event=on_event)
+    return FFmpegTask(build_conversion_command(input_path, output_path, opts), duration=duration,
+                      output_path=output_path, on_event=on_event)
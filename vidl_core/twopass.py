@@ -0,0 +1,175 @@
+"""
+Encodage à taille visée : le débit vidéo est déduit de la durée analysée et
+du débit audio, puis la vidéo est encodée en deux passes. L'audio est
+encodé une seule fois, en parallèle de la première passe, et simplement
+copié à la seconde.
+"""
+
+import os
+import shutil
+import tempfile
+import threading
+
+from . import events
+from .conversion import FFmpegTask, audio_encode_args, container_args, video_encode_args
+from .probe import probe, probe_duration, streams_of
+
+# Marge pour l'en-tête et l'entrelacement du conteneur (MP4 / MKV : moins de 1 %)
+MUXING_OVERHEAD = 0.02
+# En dessous, l'image n'est plus regardable : la taille visée est irréaliste
+MIN_VIDEO_KBPS = 32
+# Écart admis entre taille obtenue et taille visée (vidl bench target-size, tests)
+TARGET_SIZE_TOLERANCE_PCT = 10.0
+# Part de la progression réservée à la première passe (plus rapide que la seconde)
+FIRST_PASS_SHARE = 40.0
+
+def parse_kbps(bitrate):
+    """ "128k" -> 128.0, "1.5M" -> 1500.0, "192000" -> 192.0 """
+    text = str(bitrate).strip().lower()
+    if text.endswith("k"):
+        return float(text[:-1])
+    if text.endswith("m"):
+        return float(text[:-1]) * 1000
+    return float(text) / 1000
+
+def target_video_kbps(target_bytes, duration, audio_kbps=0.0, overhead=MUXING_OVERHEAD):
+    """Débit vidéo (kbit/s) pour que vidéo + audio tiennent dans target_bytes."""
+    total_kbps = target_bytes * 8 / 1000 / duration * (1 - overhead)
+    return total_kbps - audio_kbps
+
+def pass_args(encoder, number, log_prefix):
+    """Options de passe : x265 passe par -x265-params, les autres encodeurs par -pass."""
+    if encoder == "libx265":
+        return ["-x265-params", f"pass={number}:stats={log_prefix}.log"]
+    return ["-pass", str(number), "-passlogfile", log_prefix]
+
+class TwoPassEncodeTask:
+    """
+    Même interface que FFmpegTask (run, cancel, returncode ; événements
+    PROGRESS, LOG et FINISHED). FINISHED porte en plus "target_size" et
+    "size" (octets) pour comparer la taille obtenue à la taille visée.
+    """
+    def __init__(self, input_path, output_path, options, duration=None, on_event=None):
+        self.input_path = input_path
+        self.output_path = output_path
+        self.options = options
+        self.duration = duration
+        self.target_size = int(float(options["target_size_mb"]) * 1024 * 1024)
+        self.video_kbps = None
+        self.on_event = on_event or events.ignore_event
+        self.lock = threading.Lock()
+        self.tasks = []
+        self.cancelled = False
+        self.returncode = None
+
+    def run(self):
+        """Encode (bloquant) et retourne le code de retour."""
+        try:
+            retcode = self._run()
+        except Exception as e:
+            self.on_event(events.LOG, {"line": f"Error in two-pass encode: {e}"})
+            retcode = -1
+        if self.cancelled:
+            retcode = retcode or -1
+            if os.path.exists(self.output_path):
+                os.remove(self.output_path)
+        self.returncode = retcode
+        size = os.path.getsize(self.output_path) if retcode == 0 and os.path.exists(self.output_path) else None
+        self.on_event(events.FINISHED, {
+            "returncode": retcode,
+            "cancelled": self.cancelled,
+            "path": self.output_path,
+            "target_size": self.target_size,
+            "size": size,
+        })
+        return retcode
+
+    def _run(self):
+        info = probe(self.input_path)
+        self.duration = probe_duration(info) or self.duration
+        if not self.duration:
+            self.on_event(events.LOG, {"line": "Two-pass encode: unknown duration"})
+            return -1
+        has_audio = bool(streams_of(info, "audio"))
+        audio_kbps = parse_kbps(self.options["audio_bitrate"]) if has_audio else 0.0
+        self.video_kbps = target_video_kbps(self.target_size, self.duration, audio_kbps)
+        if self.video_kbps < MIN_VIDEO_KBPS:
+            self.on_event(events.LOG, {"line": f"Target size too small: {self.video_kbps:.0f} kbit/s for video"})
+            self.video_kbps = MIN_VIDEO_KBPS
+        opts = dict(self.options, video_bitrate=f"{self.video_kbps:.0f}k")
+        encoder = opts["video_encoder"]
+        threads = ["-threads", str(opts["threads"])] if opts.get("threads") else []
+
+        work_dir = tempfile.mkdtemp(prefix=".vidl-2pass-", dir=os.path.dirname(os.path.abspath(self.output_path)))
+        try:
+            log_prefix = os.path.join(work_dir, "pass")
+            first = ["ffmpeg", "-y", "-i", self.input_path, "-map", "0:v:0"] + video_encode_args(opts) + \
+                pass_args(encoder, 1, log_prefix) + threads + ["-an", "-f", "null", os.devnull]
+            audio_path = os.path.join(work_dir, "audio.mka") if has_audio else None
+            jobs = [(first, FIRST_PASS_SHARE, 0.0)]
+            if audio_path:
+                audio = ["ffmpeg", "-y", "-i", self.input_path, "-map", "0:a:0", "-vn"] + \
+                    audio_encode_args(opts) + [audio_path]
+                jobs.append((audio, None, None))
+            retcode = self._run_parallel(jobs)
+            if retcode != 0 or self.cancelled:
+                return retcode
+
+            second = ["ffmpeg", "-y", "-i", self.input_path]
+            if audio_path:
+                second += ["-i", audio_path, "-map", "0:v:0", "-map", "1:a:0", "-c:a", "copy"]
+            else:
+                second += ["-map", "0:v:0"]
+            second += video_encode_args(opts) + pass_args(encoder, 2, log_prefix) + container_args(opts) + \
+                threads + [self.output_path]
+            return self._run_parallel([(second, 100.0 - FIRST_PASS_SHARE, FIRST_PASS_SHARE)])
+        finally:
+            shutil.rmtree(work_dir, ignore_errors=True)
+
+    def _run_parallel(self, jobs):
+        """
+        Exécute les commandes [(cmd, part, début)] en même temps ; seules
+        celles qui ont une part (part non None) font avancer la progression.
+        Retourne le premier code d'erreur, ou 0.
+        """
+        codes = [None] * len(jobs)
+
+        def run_job(i):
+            cmd, share, offset = jobs[i]
+            def on_event(kind, data):
+                if kind == events.PROGRESS and share is not None and "percent" in data:
+                    self.on_event(events.PROGRESS, dict(data, percent=offset + data["percent"] * share / 100))
+                elif kind == events.LOG:
+                    self.on_event(kind, data)
+            task = FFmpegTask(cmd, duration=self.duration, output_path=cmd[-1], on_event=on_event)
+            if cmd[-1] == os.devnull:
+                # Première passe : aucune sortie à supprimer en cas d'annulation
+                task.output_paths = []
+            with self.lock:
+                if self.cancelled:
+                    codes[i] = -1
+                    return
+                self.tasks.append(task)
+            codes[i] = task.run()
+            with self.lock:
+                self.tasks.remove(task)
+            if codes[i] != 0 and not self.cancelled:
+                self.cancel_tasks()
+
+        threads = [threading.Thread(target=run_job, args=(i,), daemon=True) for i in range(1, len(jobs))]
+        for thread in threads:
+            thread.start()
+        run_job(0)
+        for thread in threads:
+            thread.join()
+        return next((code for code in codes if code != 0), 0)
+
+    def cancel_tasks(self):
+        with self.lock:
+            tasks = list(self.tasks)
+        for task in tasks:
+            task.cancel()
+
+    def cancel(self):
+        self.cancelled = True
+        self.cancel_tasks()
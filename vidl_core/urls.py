@@ -0,0 +1,113 @@
+"""
+URL canonique et identifiant de vidéo, sans appel à yt-dlp.
+
+media_key() est la clé utilisée partout (historique, caches, files
+d'attente) pour reconnaître une même vidéo quelle que soit la forme de
+son URL.
+"""
+
+import functools
+import re
+import urllib.parse
+
+# Paramètres de suivi / de lecture qui ne changent pas la vidéo désignée
+TRACKING_PARAMS = {
+    "si", "feature", "pp", "t", "start", "ab_channel", "app",
+    "fbclid", "gclid", "igshid", "ref", "ref_src", "share", "embeds_referring_euri",
+}
+_youtube_id_regex = re.compile(r"^[A-Za-z0-9_-]{11}$")
+_youtube_path_regex = re.compile(r"^/(?:shorts|embed|live|v|e)/([A-Za-z0-9_-]{11})")
+_numeric_id_regex = re.compile(r"^\d+$")
+
+def _strip_host(netloc):
+    host = netloc.lower().rsplit("@", 1)[-1].split(":", 1)[0]
+    for prefix in ("www.", "m.", "music."):
+        if host.startswith(prefix):
+            host = host[len(prefix):]
+    return host
+
+@functools.lru_cache(maxsize=4096)
+def parse_media_url(url):
+    """
+    Reconnaît les formes d'URL courantes (YouTube watch/youtu.be/shorts/embed,
+    Vimeo, Dailymotion, TikTok, X/Twitter) sans appeler yt-dlp.
+    Retourne (extracteur, id vidéo) ou None si l'URL n'est pas reconnue.
+    """
+    try:
+        parts = urllib.parse.urlsplit(url.strip())
+    except ValueError:
+        return None
+    host = _strip_host(parts.netloc)
+    path = parts.path
+    segments = [seg for seg in path.split("/") if seg]
+    if host in ("youtube.com", "youtube-nocookie.com"):
+        if path == "/watch":
+            vid = urllib.parse.parse_qs(parts.query).get("v", [""])[0]
+            if _youtube_id_regex.match(vid):
+                return "youtube", vid
+        match = _youtube_path_regex.match(path)
+        if match:
+            return "youtube", match.group(1)
+    elif host == "youtu.be":
+        if segments and _youtube_id_regex.match(segments[0]):
+            return "youtube", segments[0]
+    elif host in ("vimeo.com", "player.vimeo.com"):
+        for seg in segments:
+            if _numeric_id_regex.match(seg):
+                return "vimeo", seg
+    elif host == "dailymotion.com":
+        if len(segments) >= 2 and segments[0] == "video":
+            return "dailymotion", segments[1].split("_", 1)[0]
+    elif host == "dai.ly":
+        if segments:
+            return "dailymotion", segments[0]
+    elif host == "tiktok.com":
+        if len(segments) >= 3 and segments[1] == "video" and _numeric_id_regex.match(segments[2]):
+            return "tiktok", segments[2]
+    elif host in ("twitter.com", "x.com"):
+        if len(segments) >= 3 and segments[1] == "status" and _numeric_id_regex.match(segments[2]):
+            return "twitter", segments[2]
+    return None
+
+CANONICAL_URL_TEMPLATES = {
+    "youtube": "https://www.youtube.com/watch?v={}",
+    "vimeo": "https://vimeo.com/{}",
+    "dailymotion": "https://www.dailymotion.com/video/{}",
+    "twitter": "https://x.com/i/status/{}",
+}
+
+@functools.lru_cache(maxsize=4096)
+def canonical_url(url):
+    """
+    URL canonique d'une vidéo : forme de référence pour les sites connus,
+    sinon l'URL sans fragment ni paramètres de suivi (paramètres triés).
+    """
+    url = url.strip()
+    parsed = parse_media_url(url)
+    if parsed and parsed[0] in CANONICAL_URL_TEMPLATES:
+        return CANONICAL_URL_TEMPLATES[parsed[0]].format(parsed[1])
+    try:
+        parts = urllib.parse.urlsplit(url)
+    except ValueError:
+        return url
+    query = sorted(
+        (k, v) for k, v in urllib.parse.parse_qsl(parts.query, keep_blank_values=True)
+        if k.lower() not in TRACKING_PARAMS and not k.lower().startswith("utm_")
+    )
+    return urllib.parse.urlunsplit((
+        parts.scheme.lower(), parts.netloc.lower(), parts.path or "/",
+        urllib.parse.urlencode(query), ""
+    ))
+
+def media_key(url):
+    """
+    Clé unique d'une vidéo ("youtube:dQw4w9WgXcQ"), utilisée pour l'historique,
+    les caches et le dédoublonnage. Les URL non reconnues ont pour clé leur
+    URL canonique.
+    """
+    if not url:
+        return ""
+    parsed = parse_media_url(url)
+    if parsed:
+        return f"{parsed[0]}:{parsed[1]}"
+    return "url:" + canonical_url(url)
@@ -0,0 +1,75 @@
+"""
+Fonctions utilitaires sans dépendance à l'interface graphique.
+"""
+
+import os
+import re
+import unicodedata
+import urllib.parse
+
+def sanitize_filename(filename):
+    """
+    Supprime les caractères interdits pour les noms de fichiers sur la plupart des OS.
+    """
+    return re.sub(r'[\\/*?:"<>|]', "", filename)
+
+def validate_url(url):
+    """
+    Vérifie que l'URL commence par http:// ou https:// et désigne un hôte.
+    """
+    if not (url.startswith("http://") or url.startswith("https://")):
+        return False
+    return bool(urllib.parse.urlsplit(url).netloc)
+
+def format_duration(duration):
+    """
+    Convertit une durée (en secondes) en format mm:ss ou hh:mm:ss.
+    """
+    try:
+        duration = int(float(duration))
+    except Exception:
+        return str(duration)
+    hours = duration // 3600
+    minutes = (duration % 3600) // 60
+    seconds = duration % 60
+    if hours > 0:
+        return f"{hours:02d}:{minutes:02d}:{seconds:02d}"
+    else:
+        return f"{minutes:02d}:{seconds:02d}"
+
+def format_bytes(size):
+    """Taille lisible : "850.0 MB", "1.25 GB"."""
+    if size >= 1024 ** 3:
+        return f"{size / 1024 ** 3:.2f} GB"
+    return f"{size / 1024 ** 2:.1f} MB"
+
+def parse_timecode(text):
+    """
+    Convertit "90", "1:30", "01:02:03.5" en secondes (float).
+    Lève ValueError si le format est invalide.
+    """
+    parts = text.strip().split(":")
+    if not 1 <= len(parts) <= 3 or not all(parts):
+        raise ValueError(f"invalid timecode: {text!r}")
+    seconds = 0.0
+    for part in parts:
+        value = float(part)
+        if value < 0:
+            raise ValueError(f"invalid timecode: {text!r}")
+        seconds = seconds * 60 + value
+    return seconds
+
+def normalize_search_text(text):
+    """
+    Met un texte en minuscules et retire les accents (« Écoute » -> « ecoute »).
+    """
+    text = unicodedata.normalize("NFKD", text or "")
+    return "".join(c for c in text if not unicodedata.combining(c)).lower()
+
+def app_support_dir():
+    """
+    Dossier de données de ViDL (historique, journal des tâches, caches).
+    """
+    path = os.path.join(os.path.expanduser("~"), "Library", "Application Support", "ViDL")
+    os.makedirs(path, exist_ok=True)
+    return path